@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+import harness
+from typing import Any, Dict, List
+
+# Import time of the simulation modules, each in a fresh interpreter -> paid by every
+# sweep worker and CLI run. numpy is imported first and timed apart, so the import
+# time is the overhead of the module itself. Core modules only need numpy: scipy /
+# scikit-learn are loaded by the empirical models and pandas by the frame outputs,
+# on first use -> a core module that loads them at import is a regression.
+# Usage (from the repo root):
+#   python benchmarks/bench_startup.py --save-baseline  -> startup_baselines.json
+#   python benchmarks/bench_startup.py --compare        -> exit code 1 on regressions
+
+CORE_MODULES = {
+    # -> kernels and frontier are shared with v1 (model_v1 package), timed there
+    "v0": ["rollup", "swap", "liquidity", "extraction"],
+    "v1": [
+        "rollup",
+        "bundle",
+        "cost",
+        "kernels",
+        "profit_models",
+        "expectation",
+        "extraction",
+        "timeseries",
+        "variance",
+        "sweep",
+        "service",
+        "frontier",
+        "cli",
+    ],
+}
+# Both suites run in src -> the v1 modules are imported from the model_v1 package
+SUITE_PACKAGES = {"v0": "", "v1": "model_v1."}
+HEAVY_MODULES = ["pandas", "pyarrow", "scipy", "sklearn", "matplotlib"]
+
+N_REPEAT = 5
+# Import times are a few ms -> relative tolerance plus absolute slack for the noise
+IMPORT_TIME_TOL = 0.5
+IMPORT_TIME_SLACK_S = 0.01
+DEFAULT_BASELINE_PATH = os.path.join(harness.BENCH_DIR, "startup_baselines.json")
+
+IMPORT_SCRIPT = """
+import sys
+import json
+import time
+
+start = time.perf_counter()
+import numpy
+
+numpy_time = time.perf_counter() - start
+start = time.perf_counter()
+import {module}
+
+import_time = time.perf_counter() - start
+print(json.dumps({{"numpy_time": numpy_time, "import_time": import_time,
+                  "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure_import(suite: str, module: str, n_repeat: int = N_REPEAT) -> Dict[str, Any]:
+    # Best of n_repeat fresh interpreters (the first one also compiles the .pyc)
+    runs = []
+    for _ in range(n_repeat):
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                IMPORT_SCRIPT.format(module=SUITE_PACKAGES[suite] + module),
+            ],
+            cwd=harness.SRC_DIR,
+            stdout=subprocess.PIPE,
+            check=True,
+            text=True,
+        )
+        runs.append(json.loads(completed.stdout))
+    loaded = {name.split(".")[0] for name in runs[-1]["modules"]}
+    return {
+        "suite": suite,
+        "module": module,
+        "import_time": min(run["import_time"] for run in runs),
+        "numpy_time": min(run["numpy_time"] for run in runs),
+        "heavy_modules": [name for name in HEAVY_MODULES if name in loaded],
+    }
+
+
+def run_startup_suite(
+    suites: List[str], n_repeat: int = N_REPEAT
+) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for suite in suites:
+        for module in CORE_MODULES[suite]:
+            result = measure_import(suite, module, n_repeat)
+            results[f"startup/{suite}/{module}"] = result
+            print(
+                f"startup/{suite}/{module:<60} {1e3 * result['import_time']:>8.1f} ms "
+                f"(numpy {1e3 * result['numpy_time']:.1f} ms) "
+                + " ".join(result["heavy_modules"]),
+                file=sys.stderr,
+                flush=True,
+            )
+    return results
+
+
+def compare_to_baselines(
+    results: Dict[str, Dict[str, Any]],
+    baselines: Dict[str, Any],
+    import_time_tol: float = IMPORT_TIME_TOL,
+) -> List[Dict[str, Any]]:
+    comparisons = []
+    for key, result in results.items():
+        baseline = baselines["results"].get(key)
+        if baseline is None:
+            continue
+        time_ratio = (result["import_time"] + IMPORT_TIME_SLACK_S) / (
+            baseline["import_time"] + IMPORT_TIME_SLACK_S
+        )
+        comparisons.append(
+            {
+                "key": key,
+                "time_ratio": time_ratio,
+                "regression": time_ratio > 1 + import_time_tol,
+            }
+        )
+    return comparisons
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Time the imports of the simulation modules in fresh interpreters"
+    )
+    parser.add_argument("--suites", default=",".join(CORE_MODULES))
+    parser.add_argument("--n-repeat", type=int, default=N_REPEAT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store this run as the baseline"
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="compare against the baseline, exit code 1 on regressions",
+    )
+    parser.add_argument("--import-time-tol", type=float, default=IMPORT_TIME_TOL)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    suites = args.suites.split(",")
+    for suite in suites:
+        if suite not in CORE_MODULES:
+            raise AttributeError(f"suite should be one of {list(CORE_MODULES)}")
+    results = run_startup_suite(suites, args.n_repeat)
+    # Heavy imports are regressions whatever the timings
+    n_regressions = 0
+    for key, result in results.items():
+        if result["heavy_modules"]:
+            print(f"{key} loads {', '.join(result['heavy_modules'])} at import")
+            n_regressions += 1
+    if args.compare:
+        baselines = harness.load_baselines(args.baseline)
+        if baselines.get("machine") != harness.get_machine_info():
+            print(
+                "WARNING: baseline was recorded on another machine / stack -> "
+                + json.dumps(baselines.get("machine"))
+            )
+        comparisons = compare_to_baselines(results, baselines, args.import_time_tol)
+        for comparison in comparisons:
+            flag = "SLOWER" if comparison["regression"] else ""
+            print(
+                f"{comparison['key']:<70} import time "
+                f"x{comparison['time_ratio']:.2f} {flag}"
+            )
+        n_regressions += sum(comparison["regression"] for comparison in comparisons)
+    print(f"{n_regressions} startup regression(s) in {len(results)} module(s)")
+    if args.save_baseline:
+        harness.save_baselines(args.baseline, results)
+        print(f"Saved {len(results)} baseline(s) to {args.baseline}")
+    return 1 if n_regressions > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
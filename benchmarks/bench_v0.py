@@ -0,0 +1,133 @@
+import sys
+import warnings
+import numpy as np
+from harness import SRC_DIR, Benchmark
+
+sys.path.insert(0, SRC_DIR)
+
+import swap  # noqa: E402
+import extraction  # noqa: E402
+from rollup import RollupSpec  # noqa: E402
+from liquidity import compute_liquidity_diffs  # noqa: E402
+
+# The end price check of v0 warns for any non-zero pool fee -> not printed per call
+warnings.filterwarnings("ignore", message="There is a problem with the code")
+
+# The v0 model has no price models (fixed external price) -> constant only
+V0_PRICE_MODELS = ["constant"]
+
+# arb target pool settings (as in 2.1-profit-diff-param-sweep)
+ARB_POOL_FEE = 0.0005
+ARB_POOL_RESERVE_Y = 100_000.0
+PRICE_A = 1.01
+PRICE_B = 1.0
+EXTERNAL_PRICE = 1.005
+
+
+def make_rollup_specs():
+    rollup_A = RollupSpec(
+        fail_rate=0.1,
+        arb_pool_reserve_x=ARB_POOL_RESERVE_Y / PRICE_A,
+        arb_pool_reserve_y=ARB_POOL_RESERVE_Y,
+        arb_pool_fee=ARB_POOL_FEE,
+    )
+    rollup_B = RollupSpec(
+        fail_rate=0.1,
+        arb_pool_reserve_x=ARB_POOL_RESERVE_Y / PRICE_B,
+        arb_pool_reserve_y=ARB_POOL_RESERVE_Y,
+        arb_pool_fee=ARB_POOL_FEE,
+    )
+    return rollup_A, rollup_B
+
+
+def setup_pool_states(compute_from_reserves):
+    def setup(n_iter, price_model, rng):
+        # One pool state per iteration (e.g. grid of pools)
+        x_A = ARB_POOL_RESERVE_Y / PRICE_A * rng.uniform(0.9, 1.1, n_iter)
+        x_B = ARB_POOL_RESERVE_Y / PRICE_B * rng.uniform(1.1, 1.3, n_iter)
+        y_A = np.full(n_iter, ARB_POOL_RESERVE_Y)
+        y_B = np.full(n_iter, ARB_POOL_RESERVE_Y)
+        return lambda: compute_from_reserves(x_A, y_A, x_B, y_B, ARB_POOL_FEE)
+
+    return setup
+
+
+def setup_arb_trade_sizes(n_iter, price_model, rng):
+    # Scalar calls on the same specs -> measures the pool state cache hit path
+    rollup_A, rollup_B = make_rollup_specs()
+
+    def run():
+        for _ in range(n_iter):
+            swap.compute_arb_trade_sizes(rollup_A, rollup_B)
+
+    return run
+
+
+def setup_liquidity_diffs(atomic):
+    def setup(n_iter, price_model, rng):
+        rollup_A, rollup_B = make_rollup_specs()
+        trade_sizes = swap.compute_arb_trade_sizes(rollup_A, rollup_B)
+        fail_outcomes_A = rollup_A.generate_fail_outcomes(n_iter, rng=rng)
+        fail_outcomes_B = rollup_B.generate_fail_outcomes(n_iter, rng=rng)
+        return lambda: compute_liquidity_diffs(
+            *trade_sizes, fail_outcomes_A, fail_outcomes_B, atomic=atomic
+        )
+
+    return setup
+
+
+def setup_run_arb_profit_simulation(batch):
+    def setup(n_iter, price_model, rng):
+        rollup_A, rollup_B = make_rollup_specs()
+        return lambda: extraction.run_arb_profit_simulation(
+            n_iter, rollup_A, rollup_B, EXTERNAL_PRICE, batch=batch, rng=rng
+        )
+
+    return setup
+
+
+BENCHMARKS = [
+    Benchmark(
+        "swap.compute_arb_trade_sizes_from_reserves",
+        setup_pool_states(swap.compute_arb_trade_sizes_from_reserves),
+        V0_PRICE_MODELS,
+    ),
+    Benchmark(
+        "swap.compute_prices_after_arb_from_reserves",
+        setup_pool_states(swap.compute_prices_after_arb_from_reserves),
+        V0_PRICE_MODELS,
+    ),
+    Benchmark(
+        "swap.compute_arb_opportunity_threshold_from_reserves",
+        setup_pool_states(swap.compute_arb_opportunity_threshold_from_reserves),
+        V0_PRICE_MODELS,
+    ),
+    Benchmark(
+        "swap.compute_arb_trade_sizes",
+        setup_arb_trade_sizes,
+        V0_PRICE_MODELS,
+        max_n_iter=100_000,
+    ),
+    Benchmark(
+        "liquidity.compute_liquidity_diffs[atomic]",
+        setup_liquidity_diffs(atomic=True),
+        V0_PRICE_MODELS,
+    ),
+    Benchmark(
+        "liquidity.compute_liquidity_diffs[non_atomic]",
+        setup_liquidity_diffs(atomic=False),
+        V0_PRICE_MODELS,
+    ),
+    Benchmark(
+        "extraction.run_arb_profit_simulation[batch]",
+        setup_run_arb_profit_simulation(batch=True),
+        V0_PRICE_MODELS,
+    ),
+    # -> per-iter python loop, too slow for the larger sizes
+    Benchmark(
+        "extraction.run_arb_profit_simulation[loop]",
+        setup_run_arb_profit_simulation(batch=False),
+        V0_PRICE_MODELS,
+        max_n_iter=100_000,
+    ),
+]
@@ -0,0 +1,167 @@
+import sys
+import numpy as np
+from harness import SRC_DIR, Benchmark
+
+sys.path.insert(0, SRC_DIR)
+
+from model_v1 import cost  # noqa: E402
+from model_v1 import bundle  # noqa: E402
+from model_v1 import extraction  # noqa: E402
+from model_v1 import profit_models  # noqa: E402
+from model_v1.rollup import RollupSpec  # noqa: E402
+from model_v1.gas import GasPriceModel  # noqa: E402
+from model_v1.asset import AssetPriceModel  # noqa: E402
+
+# Rollup settings (as in 3.1-source-code-run-example-v1)
+ARB_POOL_FEE = 0.005
+PRICE_A = 101.0
+PRICE_B = 100.0
+ARB_POOL_RESERVE_X = 1000.0
+GAS_PRICE_MEAN = 0.01
+GAS_PRICE_STD = 0.0001
+Y_PRICE_MEAN = 50.0
+Y_PRICE_STD = 0.5
+
+
+def make_histogram(mean: float, std: float, n_buckets: int = 100):
+    # Synthetic (val, count) buckets for the empirical models -> bell shaped
+    vals = np.linspace(mean - 4 * std, mean + 4 * std, n_buckets)
+    counts = np.round(1e4 * np.exp(-0.5 * ((vals - mean) / std) ** 2)) + 1
+    return list(zip(vals, counts))
+
+
+def make_gas_price_model(price_model: str) -> GasPriceModel:
+    return GasPriceModel(
+        model_type=price_model,
+        gas_price_mean=GAS_PRICE_MEAN,
+        gas_price_std=GAS_PRICE_STD,
+        gas_price_histogram=make_histogram(GAS_PRICE_MEAN, GAS_PRICE_STD),
+    )
+
+
+def make_y_price_model(price_model: str) -> AssetPriceModel:
+    return AssetPriceModel(
+        asset_label="Y",
+        fee=0.005,
+        model_type=price_model,
+        asset_price_mean=Y_PRICE_MEAN,
+        asset_price_std=Y_PRICE_STD,
+        asset_price_histogram=make_histogram(Y_PRICE_MEAN, Y_PRICE_STD),
+    )
+
+
+def make_rollup_specs(price_model: str):
+    rollup_A, rollup_B = [
+        RollupSpec(
+            fail_rate=0.5,
+            gas_price_model=make_gas_price_model(price_model),
+            gas_units_swap=10.0,
+            gas_units_fail=1.0,
+            arb_pool_reserve_x=ARB_POOL_RESERVE_X,
+            arb_pool_reserve_y=ARB_POOL_RESERVE_X * price,
+            arb_pool_fee=ARB_POOL_FEE,
+        )
+        for price in [PRICE_A, PRICE_B]
+    ]
+    return rollup_A, rollup_B
+
+
+def setup_pure_bundle_profits(n_iter, price_model, rng):
+    rollup_A, rollup_B = make_rollup_specs(price_model)
+    y_price_model = make_y_price_model(price_model)
+    fail_outcomes_A = rollup_A.generate_fail_outcomes(n_iter, rng=rng)
+    fail_outcomes_B = rollup_B.generate_fail_outcomes(n_iter, rng=rng)
+    y_prices = y_price_model.generate_asset_prices(n_iter, rng=rng)
+    return lambda: bundle.compute_pure_bundle_profits(
+        rollup_A, rollup_B, fail_outcomes_A, fail_outcomes_B, y_price_model, y_prices
+    )
+
+
+def setup_profit_model_bundle_profits(profit_model_name):
+    # Same seed for every model -> all variants run on the same draws
+    def setup(n_iter, price_model, rng):
+        rollup_A, rollup_B = make_rollup_specs(price_model)
+        y_price_model = make_y_price_model(price_model)
+        fail_outcomes_A = rollup_A.generate_fail_outcomes(n_iter, rng=rng)
+        fail_outcomes_B = rollup_B.generate_fail_outcomes(n_iter, rng=rng)
+        y_prices = y_price_model.generate_asset_prices(n_iter, rng=rng)
+        return lambda: profit_models.compute_pure_bundle_profits(
+            profit_model_name,
+            rollup_A,
+            rollup_B,
+            fail_outcomes_A,
+            fail_outcomes_B,
+            y_price_model,
+            y_prices,
+        )
+
+    return setup
+
+
+def setup_arb_cost(compute_arb_cost):
+    def setup(n_iter, price_model, rng):
+        rollup_A, rollup_B = make_rollup_specs(price_model)
+        fail_outcomes_A = rollup_A.generate_fail_outcomes(n_iter, rng=rng)
+        fail_outcomes_B = rollup_B.generate_fail_outcomes(n_iter, rng=rng)
+        gas_prices_A = rollup_A.generate_gas_prices(n_iter, rng=rng)
+        gas_prices_B = rollup_B.generate_gas_prices(n_iter, rng=rng)
+        return lambda: compute_arb_cost(
+            fail_outcomes_A,
+            fail_outcomes_B,
+            rollup_A,
+            rollup_B,
+            gas_prices_A,
+            gas_prices_B,
+        )
+
+    return setup
+
+
+def setup_generate_gas_prices(n_iter, price_model, rng):
+    gas_price_model = make_gas_price_model(price_model)
+    return lambda: gas_price_model.generate_gas_prices(n_iter, rng=rng)
+
+
+def setup_generate_asset_prices(n_iter, price_model, rng):
+    y_price_model = make_y_price_model(price_model)
+    return lambda: y_price_model.generate_asset_prices(n_iter, rng=rng)
+
+
+def setup_run_arb_profit_simulation(as_records):
+    def setup(n_iter, price_model, rng):
+        rollup_A, rollup_B = make_rollup_specs(price_model)
+        y_price_model = make_y_price_model(price_model)
+        return lambda: extraction.run_arb_profit_simulation(
+            n_iter, rollup_A, rollup_B, y_price_model, rng=rng, as_records=as_records
+        )
+
+    return setup
+
+
+BENCHMARKS = [
+    Benchmark("bundle.compute_pure_bundle_profits", setup_pure_bundle_profits),
+    *[
+        Benchmark(
+            f"profit_models.compute_pure_bundle_profits[{profit_model_name}]",
+            setup_profit_model_bundle_profits(profit_model_name),
+        )
+        for profit_model_name in profit_models.get_profit_model_names()
+    ],
+    Benchmark(
+        "cost.compute_atomic_arb_cost", setup_arb_cost(cost.compute_atomic_arb_cost)
+    ),
+    Benchmark(
+        "cost.compute_non_atomic_arb_cost",
+        setup_arb_cost(cost.compute_non_atomic_arb_cost),
+    ),
+    Benchmark("gas.generate_gas_prices", setup_generate_gas_prices),
+    Benchmark("asset.generate_asset_prices", setup_generate_asset_prices),
+    Benchmark(
+        "extraction.run_arb_profit_simulation",
+        setup_run_arb_profit_simulation(as_records=False),
+    ),
+    Benchmark(
+        "extraction.run_arb_profit_simulation[records]",
+        setup_run_arb_profit_simulation(as_records=True),
+    ),
+]
@@ -0,0 +1,185 @@
+import gc
+import os
+import sys
+import json
+import time
+import platform
+import tracemalloc
+import numpy as np
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+# Sizes (n_iter) every benchmark is timed at, unless it sets its own max_n_iter
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+PRICE_MODELS = ["constant", "gaussian", "empirical"]
+
+# Repeats stop once min_time seconds have been spent -> the best time is kept, as
+# it is the least disturbed by other processes
+MIN_TIME = 0.5
+MAX_REPEAT = 20
+
+# A run is flagged when throughput drops, or peak memory grows, by more than these
+# relative tolerances. Peak memory of tiny runs is mostly noise -> absolute slack
+THROUGHPUT_TOL = 0.25
+PEAK_MEM_TOL = 0.1
+PEAK_MEM_SLACK_MB = 0.25
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+SRC_DIR = os.path.realpath(os.path.join(BENCH_DIR, "..", "src"))
+DEFAULT_BASELINE_PATH = os.path.join(BENCH_DIR, "baselines.json")
+
+
+class Benchmark(NamedTuple):
+    # setup(n_iter, price_model, rng) -> zero-arg callable doing n_iter iterations.
+    # Anything in setup (specs, pre-drawn inputs) is neither timed nor traced
+    name: str
+    setup: Callable[[int, str, np.random.Generator], Callable[[], Any]]
+    price_models: List[str] = PRICE_MODELS
+    max_n_iter: Optional[int] = None  # e.g. python loops over iterations
+
+
+def get_result_key(suite: str, name: str, price_model: str, n_iter: int) -> str:
+    return f"{suite}/{name}/{price_model}/{n_iter}"
+
+
+def get_machine_info() -> Dict[str, Any]:
+    # Stored with the baselines -> timings only compare on the same machine / stack
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def time_run(
+    run: Callable[[], Any], min_time: float = MIN_TIME, max_repeat: int = MAX_REPEAT
+) -> Dict[str, float]:
+    # Warm-up call first (caches, lazy imports, page faults)
+    run()
+    times = []
+    while len(times) < max_repeat and sum(times) < min_time:
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {"best_time": min(times), "median_time": float(np.median(times))}
+
+
+def trace_peak_memory(run: Callable[[], Any]) -> float:
+    # Peak of the memory allocated during one call, in MB (numpy buffers included).
+    # Traced separately from the timing -> tracing overhead does not skew throughput
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        result = run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak / 2**20
+
+
+def run_suite(
+    suite: str,
+    benchmarks: List[Benchmark],
+    sizes: List[int] = DEFAULT_SIZES,
+    price_models: List[str] = PRICE_MODELS,
+    name_filter: Optional[str] = None,
+    seed: int = 0,
+    min_time: float = MIN_TIME,
+) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for benchmark in benchmarks:
+        for price_model in benchmark.price_models:
+            if price_model not in price_models:
+                continue
+            for n_iter in sizes:
+                if benchmark.max_n_iter is not None and n_iter > benchmark.max_n_iter:
+                    continue
+                key = get_result_key(suite, benchmark.name, price_model, n_iter)
+                if name_filter is not None and name_filter not in key:
+                    continue
+                # -> same inputs on every run, so runs differ only by the code
+                run = benchmark.setup(n_iter, price_model, np.random.default_rng(seed))
+                timing = time_run(run, min_time=min_time)
+                peak_mem_mb = trace_peak_memory(run)
+                del run
+                results[key] = {
+                    "suite": suite,
+                    "name": benchmark.name,
+                    "price_model": price_model,
+                    "n_iter": n_iter,
+                    "iters_per_s": n_iter / timing["best_time"],
+                    "best_time": timing["best_time"],
+                    "median_time": timing["median_time"],
+                    "peak_mem_mb": peak_mem_mb,
+                }
+                print(format_result(key, results[key]), file=sys.stderr, flush=True)
+    return results
+
+
+def format_result(key: str, result: Dict[str, Any]) -> str:
+    return (
+        f"{key:<70} {result['iters_per_s']:>14,.0f} iter/s "
+        f"{result['peak_mem_mb']:>10.2f} MB"
+    )
+
+
+def save_baselines(path: str, results: Dict[str, Dict[str, Any]]) -> None:
+    # Merges into an existing file -> a partial run only updates its own entries
+    baselines = load_baselines(path) if os.path.exists(path) else {"results": {}}
+    baselines["machine"] = get_machine_info()
+    baselines["results"].update(results)
+    with open(path + ".tmp", "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def load_baselines(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_to_baselines(
+    results: Dict[str, Dict[str, Any]],
+    baselines: Dict[str, Any],
+    throughput_tol: float = THROUGHPUT_TOL,
+    peak_mem_tol: float = PEAK_MEM_TOL,
+) -> List[Dict[str, Any]]:
+    # One row per result with a baseline; regression=True when either metric is out
+    # of tolerance (ratios > 1 are better for throughput, worse for memory)
+    comparisons = []
+    for key, result in results.items():
+        baseline = baselines["results"].get(key)
+        if baseline is None:
+            continue
+        throughput_ratio = result["iters_per_s"] / baseline["iters_per_s"]
+        peak_mem_ratio = (result["peak_mem_mb"] + PEAK_MEM_SLACK_MB) / (
+            baseline["peak_mem_mb"] + PEAK_MEM_SLACK_MB
+        )
+        slower = throughput_ratio < 1 - throughput_tol
+        more_mem = peak_mem_ratio > 1 + peak_mem_tol
+        comparisons.append(
+            {
+                "key": key,
+                "throughput_ratio": throughput_ratio,
+                "peak_mem_ratio": peak_mem_ratio,
+                "slower": slower,
+                "more_mem": more_mem,
+                "regression": slower or more_mem,
+            }
+        )
+    return comparisons
+
+
+def format_comparison(comparison: Dict[str, Any]) -> str:
+    flags = []
+    if comparison["slower"]:
+        flags.append("SLOWER")
+    if comparison["more_mem"]:
+        flags.append("MORE MEMORY")
+    return (
+        f"{comparison['key']:<70} throughput x{comparison['throughput_ratio']:.2f} "
+        f"peak mem x{comparison['peak_mem_ratio']:.2f} " + " ".join(flags)
+    )
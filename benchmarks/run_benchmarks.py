@@ -0,0 +1,122 @@
+import os
+import sys
+import json
+import argparse
+import importlib
+import subprocess
+import harness
+
+# Usage (from the repo root):
+#   python benchmarks/run_benchmarks.py --save-baseline  -> benchmarks/baselines.json
+#   python benchmarks/run_benchmarks.py --compare        -> exit code 1 on regressions
+#   python benchmarks/run_benchmarks.py --suites v1 --sizes 1000 --filter extraction
+
+# Each suite runs in its own process -> the imports and the memory peaks of one
+# suite do not leak into the other
+SUITES = ["v0", "v1"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Time the simulation hot paths and compare against baselines"
+    )
+    parser.add_argument("--suites", default=",".join(SUITES))
+    parser.add_argument(
+        "--sizes", default=",".join(str(size) for size in harness.DEFAULT_SIZES)
+    )
+    parser.add_argument("--price-models", default=",".join(harness.PRICE_MODELS))
+    parser.add_argument("--filter", default=None, help="substring of the result keys")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=harness.MIN_TIME)
+    parser.add_argument("--baseline", default=harness.DEFAULT_BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store this run as the baseline"
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="compare against the baseline, exit code 1 on regressions",
+    )
+    parser.add_argument("--throughput-tol", type=float, default=harness.THROUGHPUT_TOL)
+    parser.add_argument("--peak-mem-tol", type=float, default=harness.PEAK_MEM_TOL)
+    parser.add_argument("--output", default=None, help="write this run's results")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    # Runs one suite in this process and prints its results as JSON on stdout
+    suite_module = importlib.import_module(f"bench_{args.worker}")
+    results = harness.run_suite(
+        args.worker,
+        suite_module.BENCHMARKS,
+        sizes=[int(float(size)) for size in args.sizes.split(",")],
+        price_models=args.price_models.split(","),
+        name_filter=args.filter,
+        seed=args.seed,
+        min_time=args.min_time,
+    )
+    json.dump(results, sys.stdout)
+
+
+def run_suite_process(suite: str, args: argparse.Namespace) -> dict:
+    cmd = [
+        sys.executable,
+        os.path.realpath(__file__),
+        "--worker",
+        suite,
+        "--sizes",
+        args.sizes,
+        "--price-models",
+        args.price_models,
+        "--seed",
+        str(args.seed),
+        "--min-time",
+        str(args.min_time),
+    ]
+    if args.filter is not None:
+        cmd += ["--filter", args.filter]
+    # -> progress lines go to stderr, which is passed through
+    completed = subprocess.run(cmd, stdout=subprocess.PIPE, check=True, text=True)
+    return json.loads(completed.stdout)
+
+
+def main() -> int:
+    args = parse_args()
+    if args.worker is not None:
+        run_worker(args)
+        return 0
+    results = {}
+    for suite in args.suites.split(","):
+        if suite not in SUITES:
+            raise AttributeError(f"suite should be one of {SUITES}")
+        results.update(run_suite_process(suite, args))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    n_regressions = 0
+    if args.compare:
+        baselines = harness.load_baselines(args.baseline)
+        if baselines.get("machine") != harness.get_machine_info():
+            print(
+                "WARNING: baseline was recorded on another machine / stack -> "
+                + json.dumps(baselines.get("machine"))
+            )
+        comparisons = harness.compare_to_baselines(
+            results, baselines, args.throughput_tol, args.peak_mem_tol
+        )
+        for comparison in comparisons:
+            print(harness.format_comparison(comparison))
+        n_regressions = sum(comparison["regression"] for comparison in comparisons)
+        print(
+            f"{n_regressions} regression(s) in {len(comparisons)} benchmark(s) "
+            f"compared ({len(results) - len(comparisons)} without baseline)"
+        )
+    if args.save_baseline:
+        harness.save_baselines(args.baseline, results)
+        print(f"Saved {len(results)} baseline(s) to {args.baseline}")
+    return 1 if n_regressions > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
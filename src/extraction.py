@@ -1,26 +1,92 @@
 import warnings
 import numpy as np
-import pandas as pd
 import swap
+from typing import TYPE_CHECKING, Optional, Union, Dict, Tuple
+from numpy.typing import NDArray
 from rollup import RollupSpec
 from liquidity import compute_liquidity_diffs
 
+# Modules shared with the v1 model are imported from the model_v1 package
+from model_v1.sink import (
+    ArbSimSink,
+    get_record_dtype,
+    build_arb_sim_records,
+    arb_sim_records_to_frame,
+)
+from model_v1.summary import ArbSimSummary
+from model_v1.evalgraph import EvalGraph
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Column types of the simulation output when written to disk
+ARB_SIM_SCHEMA = {
+    "iter": "int64",
+    "fail_outcome_A": "int8",
+    "fail_outcome_B": "int8",
+    "contains_arb": "bool",
+    "price_diff": "float64",
+    "delta_x_A": "float64",
+    "delta_y_A": "float64",
+    "delta_x_B": "float64",
+    "delta_y_B": "float64",
+    "liq_diff_x_atomic": "float64",
+    "liq_diff_y_atomic": "float64",
+    "total_liq_diff_atomic": "float64",
+    "liq_diff_x_non_atomic": "float64",
+    "liq_diff_y_non_atomic": "float64",
+    "total_liq_diff_non_atomic": "float64",
+    "shared_sequencing_diff_x": "float64",
+    "shared_sequencing_diff_y": "float64",
+    "price_end": "float64",
+    "total_shared_sequencing_diff": "float64",
+}
+
+# Fixed dtype of the in-memory per-iter records -> fail outcomes are RECORD_INT_NULL
+# (NaN in the DataFrame) for iters without arbitrage
+ARB_SIM_RECORD_DTYPE = get_record_dtype(ARB_SIM_SCHEMA)
+
+# Profit, cost and gain columns tracked when only a summary of the runs is kept
+ARB_SIM_SUMMARY_COLUMNS = [
+    "total_liq_diff_atomic",
+    "total_liq_diff_non_atomic",
+    "total_shared_sequencing_diff",
+]
+
 
 def compute_expected_profit_diff(
     rollup_A: RollupSpec, rollup_B: RollupSpec, external_price: float
 ) -> float:
-    if not swap.contains_arb_opportunity(rollup_A, rollup_B):
-        warnings.warn("Current pool specs do not contain a profitable arbitrage")
-    # Compute optimal arbitrage trade sizes
-    delta_x_A, delta_y_A, delta_x_B, delta_y_B = swap.compute_arb_trade_sizes(
-        rollup_A, rollup_B
+    # Compute optimal arbitrage trade sizes (warns if there is no arbitrage)
+    trade_sizes = compute_checked_arb_trade_sizes_for_pool_state(
+        swap.PoolState.from_rollups(rollup_A, rollup_B)
     )
+    return compute_expected_profit_diff_from_trades(
+        trade_sizes,
+        rollup_A.get_fail_rate(),
+        rollup_B.get_fail_rate(),
+        external_price,
+    )
+
+
+def compute_checked_arb_trade_sizes_for_pool_state(
+    pool_state: swap.PoolState,
+) -> Tuple[float, float, float, float]:
+    if swap.compute_arb_opportunity_threshold_for_pool_state(pool_state) <= 1:
+        warnings.warn("Current pool specs do not contain a profitable arbitrage")
+    return swap.compute_arb_trade_sizes_for_pool_state(pool_state)
+
+
+def compute_expected_profit_diff_from_trades(
+    trade_sizes: Tuple[float, float, float, float],
+    fail_rate_A: float,
+    fail_rate_B: float,
+    external_price: float,
+) -> float:
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = trade_sizes
     # Compute prices experienced by arbitrageur
     arb_price_A = delta_y_A / delta_x_A
     arb_price_B = delta_y_B / delta_x_B
-    # Get failure rates
-    fail_rate_A = rollup_A.get_fail_rate()
-    fail_rate_B = rollup_B.get_fail_rate()
     # compute expected profit diff -> check paper for full derivation
     profit_diff = delta_x_B * (
         fail_rate_A * (arb_price_B - external_price)
@@ -30,54 +96,320 @@ def compute_expected_profit_diff(
     return profit_diff
 
 
+def build_expected_profit_diff_graph() -> EvalGraph:
+    # compute_expected_profit_diff as an evaluation graph -> set the rollup_A,
+    # rollup_B and external_price inputs, then get("expected_profit_diff"). A new
+    # external price or fail rate does not recompute the pool math
+    graph = EvalGraph()
+    for input_name in ["rollup_A", "rollup_B", "external_price"]:
+        graph.add_input(input_name)
+    # Spec params -> cheap, and an unchanged param stops the recomputation
+    graph.add_node("pool_state", swap.PoolState.from_rollups, ["rollup_A", "rollup_B"])
+    graph.add_node("fail_rate_A", RollupSpec.get_fail_rate, ["rollup_A"])
+    graph.add_node("fail_rate_B", RollupSpec.get_fail_rate, ["rollup_B"])
+    # Pool math
+    graph.add_node(
+        "trade_sizes", compute_checked_arb_trade_sizes_for_pool_state, ["pool_state"]
+    )
+    # Profit aggregation
+    graph.add_node(
+        "expected_profit_diff",
+        compute_expected_profit_diff_from_trades,
+        ["trade_sizes", "fail_rate_A", "fail_rate_B", "external_price"],
+    )
+    return graph
+
+
+def compute_expected_profit_diff_grid(
+    fail_rate_A: Union[float, NDArray],
+    fail_rate_B: Union[float, NDArray],
+    arb_pool_reserve_x_A: Union[float, NDArray],
+    arb_pool_reserve_y_A: Union[float, NDArray],
+    arb_pool_reserve_x_B: Union[float, NDArray],
+    arb_pool_reserve_y_B: Union[float, NDArray],
+    arb_pool_fee: Union[float, NDArray],
+    external_price: Union[float, NDArray],
+) -> NDArray:
+    # Same as compute_expected_profit_diff, but all inputs can be broadcastable
+    # arrays, e.g. fail_rate_A[:, None, None], fail_rate_B[None, :, None] and
+    # external_price[None, None, :] -> returns the full 3D grid of profit diffs
+    price_A = np.asarray(arb_pool_reserve_y_A / arb_pool_reserve_x_A)
+    price_B = np.asarray(arb_pool_reserve_y_B / arb_pool_reserve_x_B)
+    if np.any(price_A <= price_B):
+        raise Exception(
+            "The pool on rollup A must have a higher price than the pool on rollup B"
+        )
+    threshold = swap.compute_arb_opportunity_threshold_from_reserves(
+        arb_pool_reserve_x_A,
+        arb_pool_reserve_y_A,
+        arb_pool_reserve_x_B,
+        arb_pool_reserve_y_B,
+        arb_pool_fee,
+    )
+    if np.any(threshold <= 1):
+        warnings.warn("Some pool specs do not contain a profitable arbitrage")
+    # Compute optimal arbitrage trade sizes -> only depend on the pool specs
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = (
+        swap.compute_arb_trade_sizes_from_reserves(
+            arb_pool_reserve_x_A,
+            arb_pool_reserve_y_A,
+            arb_pool_reserve_x_B,
+            arb_pool_reserve_y_B,
+            arb_pool_fee,
+        )
+    )
+    # Compute prices experienced by arbitrageur
+    arb_price_A = delta_y_A / delta_x_A
+    arb_price_B = delta_y_B / delta_x_B
+    # compute expected profit diff -> check paper for full derivation
+    # (each term is built on its own lower-dimensional grid before summing)
+    profit_diff_A = delta_x_B * fail_rate_A * (arb_price_B - external_price)
+    profit_diff_B = delta_x_B * fail_rate_B * (external_price - arb_price_A)
+    profit_diff_AB = delta_x_B * fail_rate_A * fail_rate_B * (arb_price_A - arb_price_B)
+    profit_diff = profit_diff_A + profit_diff_B + profit_diff_AB
+    return profit_diff
+
+
 def run_arb_profit_simulation(
-    n_iter: int, rollup_A: RollupSpec, rollup_B: RollupSpec, external_price: float
-) -> pd.DataFrame:
-    # Compute profit under each regime - atomic vs. non-atomic transactions
-    arb_sim_df = pd.DataFrame()
-    for i in range(n_iter):
-        if swap.contains_arb_opportunity(rollup_A, rollup_B):
-            iter_df = compute_arb_profit_for_iter(i, rollup_A, rollup_B, external_price)
-        else:
-            iter_df = pd.DataFrame(
-                {
-                    "iter": [i],
-                    "fail_outcome_A": [np.nan],
-                    "fail_outcome_B": [np.nan],
-                    "contains_arb": [False],
-                    "price_diff": [
-                        rollup_A.get_arb_pool_price_in_y_units()
-                        / rollup_B.get_arb_pool_price_in_y_units()
-                    ],
-                    "delta_x_A": [np.nan],
-                    "delta_y_A": [np.nan],
-                    "delta_x_B": [np.nan],
-                    "delta_y_B": [np.nan],
-                    "liq_diff_x_atomic": [0.0],
-                    "liq_diff_y_atomic": [0.0],
-                    "total_liq_diff_atomic": [0.0],
-                    "liq_diff_x_non_atomic": [0.0],
-                    "liq_diff_y_non_atomic": [0.0],
-                    "total_liq_diff_non_atomic": [0.0],
-                    "shared_sequencing_diff_x": [0.0],
-                    "shared_sequencing_diff_y": [0.0],
-                    "price_end": [np.nan],
-                    "total_shared_sequencing_diff": [0.0],
-                }
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    external_price: float,
+    batch: bool = False,
+    rng: Optional[np.random.Generator] = None,
+    summary_only: bool = False,
+    target_std_error: Optional[float] = None,
+    as_records: bool = False,
+) -> Union["pd.DataFrame", NDArray, ArbSimSummary]:
+    if summary_only:
+        return run_arb_profit_simulation_summary(
+            n_iter,
+            rollup_A,
+            rollup_B,
+            external_price,
+            target_std_error=target_std_error,
+            rng=rng,
+        )
+    if batch or not swap.contains_arb_opportunity(rollup_A, rollup_B):
+        # -> without an arbitrage opportunity no randomness is used, all iters match
+        arb_sim_records = build_arb_sim_records(
+            compute_arb_sim_columns(
+                n_iter, rollup_A, rollup_B, external_price, rng=rng
+            ),
+            ARB_SIM_SCHEMA,
+        )
+    else:
+        if rng is None:
+            rng = np.random.default_rng()
+        # Compute profit under each regime - atomic vs. non-atomic transactions
+        arb_sim_records = np.empty(n_iter, dtype=ARB_SIM_RECORD_DTYPE)
+        for i in range(n_iter):
+            iter_row = compute_arb_profit_row_for_iter(
+                i, rollup_A, rollup_B, external_price, rng=rng
+            )
+            arb_sim_records[i] = tuple(
+                iter_row[col] for col in ARB_SIM_RECORD_DTYPE.names
             )
-        arb_sim_df = pd.concat([arb_sim_df, iter_df], ignore_index=True)
-    return arb_sim_df
+    if as_records:
+        return arb_sim_records
+    return arb_sim_records_to_frame(arb_sim_records)
+
+
+def run_arb_profit_simulation_to_file(
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    external_price: float,
+    path: str,
+    file_format: str = "parquet",
+    batch_size: int = 1_000_000,
+    rng: Optional[np.random.Generator] = None,
+) -> None:
+    # Streams the batch simulation to disk -> peak memory is bounded by batch_size
+    if rng is None:
+        rng = np.random.default_rng()
+    with ArbSimSink(path, ARB_SIM_SCHEMA, file_format=file_format) as sink:
+        for iter_offset in range(0, n_iter, batch_size):
+            arb_sim_columns = compute_arb_sim_columns(
+                min(batch_size, n_iter - iter_offset),
+                rollup_A,
+                rollup_B,
+                external_price,
+                rng=rng,
+                iter_offset=iter_offset,
+            )
+            sink.write_batch(arb_sim_columns)
+
+
+def run_arb_profit_simulation_summary(
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    external_price: float,
+    batch_size: int = 100_000,
+    target_std_error: Optional[float] = None,
+    target_column: str = "total_shared_sequencing_diff",
+    rng: Optional[np.random.Generator] = None,
+) -> ArbSimSummary:
+    # Keeps running aggregates only -> no per-iteration rows are stored
+    if rng is None:
+        rng = np.random.default_rng()
+    arb_sim_summary = ArbSimSummary(ARB_SIM_SUMMARY_COLUMNS, seed=rng.integers(2**32))
+    for iter_offset in range(0, n_iter, batch_size):
+        arb_sim_columns = compute_arb_sim_columns(
+            min(batch_size, n_iter - iter_offset),
+            rollup_A,
+            rollup_B,
+            external_price,
+            rng=rng,
+            iter_offset=iter_offset,
+        )
+        arb_sim_summary.update(arb_sim_columns)
+        # Stop early once the mean of the target column is precise enough
+        if (target_std_error is not None) and (
+            arb_sim_summary.get_std_error(target_column) <= target_std_error
+        ):
+            arb_sim_summary.converged = True
+            break
+    return arb_sim_summary
+
+
+def compute_arb_sim_columns(
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    external_price: float,
+    rng: Optional[np.random.Generator] = None,
+    iter_offset: int = 0,
+) -> Dict[str, NDArray]:
+    iters = np.arange(iter_offset, iter_offset + n_iter)
+    if not swap.contains_arb_opportunity(rollup_A, rollup_B):
+        # -> without an arbitrage opportunity, every iteration has the same outcome
+        nan_col = np.full(n_iter, np.nan)
+        zero_col = np.zeros(n_iter)
+        price_diff = (
+            rollup_A.get_arb_pool_price_in_y_units()
+            / rollup_B.get_arb_pool_price_in_y_units()
+        )
+        arb_sim_columns = {
+            "iter": iters,
+            "fail_outcome_A": nan_col,
+            "fail_outcome_B": nan_col,
+            "contains_arb": np.zeros(n_iter, dtype=bool),
+            "price_diff": np.full(n_iter, price_diff),
+            "delta_x_A": nan_col,
+            "delta_y_A": nan_col,
+            "delta_x_B": nan_col,
+            "delta_y_B": nan_col,
+            "liq_diff_x_atomic": zero_col,
+            "liq_diff_y_atomic": zero_col,
+            "total_liq_diff_atomic": zero_col,
+            "liq_diff_x_non_atomic": zero_col,
+            "liq_diff_y_non_atomic": zero_col,
+            "total_liq_diff_non_atomic": zero_col,
+            "shared_sequencing_diff_x": zero_col,
+            "shared_sequencing_diff_y": zero_col,
+            "price_end": nan_col,
+            "total_shared_sequencing_diff": zero_col,
+        }
+        return arb_sim_columns
+    # Generate failure outcomes for all iters in one draw
+    if rng is None:
+        rng = np.random.default_rng()
+    fail_outcomes_A = rollup_A.generate_fail_outcomes(n_iter, rng=rng)
+    fail_outcomes_B = rollup_B.generate_fail_outcomes(n_iter, rng=rng)
+    # Compute optimal arbitrage trade sizes -> same for all iters
+    pool_state = swap.PoolState.from_rollups(rollup_A, rollup_B)
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = (
+        swap.compute_arb_trade_sizes_for_pool_state(pool_state)
+    )
+    # Compute liquidity changes after arbitrage for all iters
+    liq_diff_x_atomic, liq_diff_y_atomic = compute_liquidity_diffs(
+        delta_x_A,
+        delta_y_A,
+        delta_x_B,
+        delta_y_B,
+        fail_outcomes_A,
+        fail_outcomes_B,
+        atomic=True,
+    )
+    liq_diff_x_non_atomic, liq_diff_y_non_atomic = compute_liquidity_diffs(
+        delta_x_A,
+        delta_y_A,
+        delta_x_B,
+        delta_y_B,
+        fail_outcomes_A,
+        fail_outcomes_B,
+        atomic=False,
+    )
+    # Compute prices after arbitrage -> should be the same (and same for all iters)
+    price_end_A, price_end_B = swap.compute_prices_after_arb_for_pool_state(pool_state)
+    if np.round(price_end_A, 9) != np.round(price_end_B, 9):
+        warnings.warn(
+            "There is a problem with the code: \n"
+            + f"P_end_B={np.round(price_end_B, 9)} != P_end_A={np.round(price_end_A, 9)}"
+        )
+    # store results in columns
+    price_A = rollup_A.get_arb_pool_price_in_y_units()
+    price_B = rollup_B.get_arb_pool_price_in_y_units()
+    shared_sequencing_diff_x = liq_diff_x_atomic - liq_diff_x_non_atomic
+    shared_sequencing_diff_y = liq_diff_y_atomic - liq_diff_y_non_atomic
+    arb_sim_columns = {
+        "iter": iters,
+        "fail_outcome_A": fail_outcomes_A,
+        "fail_outcome_B": fail_outcomes_B,
+        "contains_arb": np.ones(n_iter, dtype=bool),
+        "price_diff": np.full(n_iter, (price_A - price_B) / price_B),
+        "delta_x_A": np.full(n_iter, delta_x_A),
+        "delta_y_A": np.full(n_iter, delta_y_A),
+        "delta_x_B": np.full(n_iter, delta_x_B),
+        "delta_y_B": np.full(n_iter, delta_y_B),
+        "liq_diff_x_atomic": liq_diff_x_atomic,
+        "liq_diff_y_atomic": liq_diff_y_atomic,
+        "total_liq_diff_atomic": liq_diff_y_atomic + liq_diff_x_atomic * external_price,
+        "liq_diff_x_non_atomic": liq_diff_x_non_atomic,
+        "liq_diff_y_non_atomic": liq_diff_y_non_atomic,
+        "total_liq_diff_non_atomic": liq_diff_y_non_atomic
+        + liq_diff_x_non_atomic * external_price,
+        "shared_sequencing_diff_x": shared_sequencing_diff_x,
+        "shared_sequencing_diff_y": shared_sequencing_diff_y,
+        "price_end": np.full(n_iter, price_end_A),
+        "total_shared_sequencing_diff": shared_sequencing_diff_x * external_price
+        + shared_sequencing_diff_y,
+    }
+    return arb_sim_columns
 
 
 def compute_arb_profit_for_iter(
-    iter: int, rollup_A: RollupSpec, rollup_B: RollupSpec, external_price: float
-) -> pd.DataFrame:
+    iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    external_price: float,
+    rng: Optional[np.random.Generator] = None,
+) -> "pd.DataFrame":
+    # One-row DataFrame of iter -> run_arb_profit_simulation uses the row directly
+    import pandas as pd
+
+    iter_row = compute_arb_profit_row_for_iter(
+        iter, rollup_A, rollup_B, external_price, rng=rng
+    )
+    return pd.DataFrame({col: [value] for col, value in iter_row.items()})
+
+
+def compute_arb_profit_row_for_iter(
+    iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    external_price: float,
+    rng: Optional[np.random.Generator] = None,
+) -> Dict[str, Union[int, float]]:
     # Generate failure outcomes for iter
-    i_fail_outcome_A = rollup_A.generate_fail_outcome()
-    i_fail_outcome_B = rollup_B.generate_fail_outcome()
+    i_fail_outcome_A = rollup_A.generate_fail_outcome(rng=rng)
+    i_fail_outcome_B = rollup_B.generate_fail_outcome(rng=rng)
     # Compute optimal arbitrage trade sizes
-    delta_x_A, delta_y_A, delta_x_B, delta_y_B = swap.compute_arb_trade_sizes(
-        rollup_A, rollup_B
+    pool_state = swap.PoolState.from_rollups(rollup_A, rollup_B)
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = (
+        swap.compute_arb_trade_sizes_for_pool_state(pool_state)
     )
     # Compute liquidity chnages after arbitrage
     liq_diff_x_atomic, liq_diff_y_atomic = compute_liquidity_diffs(
@@ -99,54 +431,41 @@ def compute_arb_profit_for_iter(
         atomic=False,
     )
     # Compute prices after arbitrage -> should be the same
-    price_end_A, price_end_B = swap.compute_prices_after_arb(
-        rollup_A,
-        rollup_B,
-        delta_x_A,
-        delta_y_A,
-        delta_x_B,
-        delta_y_B,
-    )
+    price_end_A, price_end_B = swap.compute_prices_after_arb_for_pool_state(pool_state)
     if np.round(price_end_A, 9) != np.round(price_end_B, 9):
         warnings.warn(
             "There is a problem with the code: \n"
             + f"P_end_B={np.round(price_end_B, 9)} != P_end_A={np.round(price_end_A, 9)}"
         )
-    # store results in DataFrame
+    # store results in a row -> written into the records by the caller
     price_A = rollup_A.get_arb_pool_price_in_y_units()
     price_B = rollup_B.get_arb_pool_price_in_y_units()
-    iter_df = pd.DataFrame(
-        {
-            "iter": [iter],
-            "fail_outcome_A": [i_fail_outcome_A],
-            "fail_outcome_B": [i_fail_outcome_B],
-            "contains_arb": [True],
-            "price_diff": [(price_A - price_B) / price_B],
-            "delta_x_A": [delta_x_A],
-            "delta_y_A": [delta_y_A],
-            "delta_x_B": [delta_x_B],
-            "delta_y_B": [delta_y_B],
-            "liq_diff_x_atomic": [liq_diff_x_atomic],
-            "liq_diff_y_atomic": [liq_diff_y_atomic],
-            "total_liq_diff_atomic": [
-                liq_diff_y_atomic + liq_diff_x_atomic * external_price
-            ],
-            "liq_diff_x_non_atomic": [liq_diff_x_non_atomic],
-            "liq_diff_y_non_atomic": [liq_diff_y_non_atomic],
-            "total_liq_diff_non_atomic": [
-                liq_diff_y_non_atomic + liq_diff_x_non_atomic * external_price
-            ],
-            "shared_sequencing_diff_x": [liq_diff_x_atomic - liq_diff_x_non_atomic],
-            "shared_sequencing_diff_y": [liq_diff_y_atomic - liq_diff_y_non_atomic],
-            "price_end": [price_end_A],
-            "total_shared_sequencing_diff": [
-                (liq_diff_x_atomic - liq_diff_x_non_atomic) * external_price
-                + liq_diff_y_atomic
-                - liq_diff_y_non_atomic
-            ],
-        }
-    )
-    return iter_df
+    iter_row = {
+        "iter": iter,
+        "fail_outcome_A": i_fail_outcome_A,
+        "fail_outcome_B": i_fail_outcome_B,
+        "contains_arb": True,
+        "price_diff": (price_A - price_B) / price_B,
+        "delta_x_A": delta_x_A,
+        "delta_y_A": delta_y_A,
+        "delta_x_B": delta_x_B,
+        "delta_y_B": delta_y_B,
+        "liq_diff_x_atomic": liq_diff_x_atomic,
+        "liq_diff_y_atomic": liq_diff_y_atomic,
+        "total_liq_diff_atomic": liq_diff_y_atomic + liq_diff_x_atomic * external_price,
+        "liq_diff_x_non_atomic": liq_diff_x_non_atomic,
+        "liq_diff_y_non_atomic": liq_diff_y_non_atomic,
+        "total_liq_diff_non_atomic": liq_diff_y_non_atomic
+        + liq_diff_x_non_atomic * external_price,
+        "shared_sequencing_diff_x": liq_diff_x_atomic - liq_diff_x_non_atomic,
+        "shared_sequencing_diff_y": liq_diff_y_atomic - liq_diff_y_non_atomic,
+        "price_end": price_end_A,
+        "total_shared_sequencing_diff": (liq_diff_x_atomic - liq_diff_x_non_atomic)
+        * external_price
+        + liq_diff_y_atomic
+        - liq_diff_y_non_atomic,
+    }
+    return iter_row
 
 
 if __name__ == "__main__":
@@ -166,5 +485,6 @@ if __name__ == "__main__":
     external_price = 1.0
     # Run simulation
     n_iter = 10
-    arb_sim_df = run_arb_profit_simulation(n_iter, rollup_A, rollup_B, external_price)
-    arb_sim_df.to_csv("./data/test_arb_sim_df.csv", index=False)
+    run_arb_profit_simulation_to_file(
+        n_iter, rollup_A, rollup_B, external_price, "./data/test_arb_sim.parquet"
+    )
@@ -1,4 +1,5 @@
-from typing import Tuple
+from typing import Tuple, Union
+from numpy.typing import NDArray
 
 
 def compute_liquidity_diffs(
@@ -6,17 +7,16 @@ def compute_liquidity_diffs(
     delta_y_A: float,
     delta_x_B: float,
     delta_y_B: float,
-    i_fail_outcome_A: int,
-    i_fail_outcome_B: int,
+    i_fail_outcome_A: Union[int, NDArray],
+    i_fail_outcome_B: Union[int, NDArray],
     atomic: True,
-) -> Tuple[float, float]:
+) -> Tuple[Union[float, NDArray], Union[float, NDArray]]:
+    # Failure outcomes can be scalars or arrays (i.e. batch of iterations)
     if atomic:
-        if (i_fail_outcome_A == 0) and (i_fail_outcome_B == 0):
-            liq_diff_x = delta_x_B - delta_x_A
-            liq_diff_y = delta_y_A - delta_y_B
-        else:
-            liq_diff_x = 0.0
-            liq_diff_y = 0.0
+        # -> bundle only executes if both transactions succeed
+        both_succeed = (1 - i_fail_outcome_A) * (1 - i_fail_outcome_B)
+        liq_diff_x = (delta_x_B - delta_x_A) * both_succeed
+        liq_diff_y = (delta_y_A - delta_y_B) * both_succeed
 
     else:  # i.e non-atomic
         liq_diff_x = delta_x_B * (1 - i_fail_outcome_B) - delta_x_A * (
@@ -0,0 +1,4 @@
+# The v1 model. Installed as the shared_sequencer_arb package (see pyproject.toml);
+# from a checkout, put src on sys.path and import model_v1 (e.g. "from model_v1
+# import extraction"). The modules import each other package-relative, so nothing
+# is added to sys.path
@@ -1,11 +1,12 @@
 import numpy as np
-from scipy.stats import norm
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 from numpy.typing import NDArray
-from sklearn.neighbors import KernelDensity
+from . import sampling
 
 
-class AssetPriceModel:
+class AssetPriceModel(sampling.SamplingTableMixin):
+    histogram_attr = "asset_price_histogram"
+
     def __init__(
         self,
         asset_label: str,
@@ -16,6 +17,7 @@ class AssetPriceModel:
         asset_price_histogram: List[Tuple[float, float]] = [
             (1, 1)
         ],  # used for empirical model; shape: (val, count)
+        sampling_table_path: Optional[str] = None,  # empirical model, saved table
     ) -> None:
         if model_type not in ["gaussian", "empirical", "constant"]:
             raise AttributeError(
@@ -27,13 +29,7 @@ class AssetPriceModel:
         self.asset_price_mean = asset_price_mean
         self.asset_price_std = asset_price_std
         self.asset_price_histogram = asset_price_histogram
-        if model_type == "empirical":
-            vals = np.array([t[0] for t in self.asset_price_histogram]).reshape(-1, 1)
-            counts = np.array([t[1] for t in self.asset_price_histogram])
-            bandwidth = np.diff(vals).mean()
-            self.kde_model = KernelDensity(kernel="gaussian", bandwidth=bandwidth).fit(
-                vals, sample_weight=counts
-            )
+        self.init_sampler(model_type, asset_price_histogram, sampling_table_path)
 
     def get_model_type(self) -> str:
         return self.model_type
@@ -41,14 +37,58 @@ class AssetPriceModel:
     def get_trading_fee(self) -> str:
         return self.fee
 
-    def generate_asset_prices(self, n_samples: int) -> NDArray:
+    def generate_asset_prices(
+        self, n_samples: int, rng: Optional[np.random.Generator] = None
+    ) -> NDArray:
+        if rng is None:
+            rng = np.random.default_rng()
         if self.model_type == "gaussian":
-            asset_price = norm.rvs(
+            asset_price = rng.normal(
                 loc=self.asset_price_mean, scale=self.asset_price_std, size=n_samples
             )
         elif self.model_type == "constant":
             asset_price = np.ones(n_samples) * self.asset_price_mean
 
         elif self.model_type == "empirical":
-            asset_price = self.kde_model.sample(n_samples).reshape(-1)
+            asset_price = sampling.sample_from_alias_table(
+                self.hist_vals,
+                self.alias_prob,
+                self.alias_vals,
+                self.bandwidth,
+                rng.random(n_samples),
+                rng.standard_normal(n_samples),
+            )
+        return asset_price
+
+    def asset_prices_from_uniforms(self, u: NDArray, v: NDArray) -> NDArray:
+        # Inverse-CDF transform of uniforms (see GasPriceModel.gas_prices_from_uniforms)
+        from scipy.special import ndtri
+
+        if self.model_type == "gaussian":
+            asset_price = self.asset_price_mean + self.asset_price_std * ndtri(u)
+        elif self.model_type == "constant":
+            asset_price = np.ones(len(u)) * self.asset_price_mean
+        elif self.model_type == "empirical":
+            asset_price = sampling.sample_from_table(
+                self.hist_vals, self.hist_cdf, self.bandwidth, u, ndtri(v)
+            )
         return asset_price
+
+    def get_asset_price_quadrature(self, n_nodes: int = 10) -> Tuple[NDArray, NDArray]:
+        # Nodes and weights such that E[f(price)] ~= sum(weights * f(nodes)); exact for
+        # polynomials of degree < 2 * n_nodes (Gauss-Hermite)
+        hermite_nodes, hermite_weights = sampling.get_hermite_quadrature(n_nodes)
+        if self.model_type == "gaussian":
+            nodes = self.asset_price_mean + self.asset_price_std * hermite_nodes
+            weights = hermite_weights
+        elif self.model_type == "constant":
+            nodes = np.array([self.asset_price_mean])
+            weights = np.array([1.0])
+        elif self.model_type == "empirical":
+            # -> mixture of gaussians centered on the histogram buckets
+            bucket_probs = np.diff(self.hist_cdf, prepend=0.0)
+            nodes = (
+                self.hist_vals[:, None] + self.bandwidth * hermite_nodes[None, :]
+            ).reshape(-1)
+            weights = (bucket_probs[:, None] * hermite_weights[None, :]).reshape(-1)
+        return nodes, weights
@@ -1,25 +1,27 @@
-import math
-from rollup import RollupSpec
-from asset import AssetPriceModel
-from typing import Tuple, Dict
+from . import kernels
+from .rollup import RollupSpec
+from .asset import AssetPriceModel
+from .pool import PoolState, check_rollup_specs, compute_for_pool_state
+from typing import Tuple, Dict, Union
+from numpy.typing import NDArray
 
 
 def compute_atomic_bundle_profit(
-    pure_bundle_A_profit: float,
-    pure_bundle_B_profit: float,
-    failure_outcome_A: int,
-    failure_outcome_B: int,
-) -> float:
-    if failure_outcome_A == 0 and failure_outcome_B == 0:
-        bundle_profit = pure_bundle_A_profit + pure_bundle_B_profit
-    else:
-        bundle_profit = 0.0
+    pure_bundle_A_profit: Union[float, NDArray],
+    pure_bundle_B_profit: Union[float, NDArray],
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
+) -> Union[float, NDArray]:
+    # -> bundle only executes if both transactions succeed
+    both_succeed = (1 - failure_outcome_A) * (1 - failure_outcome_B)
+    bundle_profit = (pure_bundle_A_profit + pure_bundle_B_profit) * both_succeed
     return bundle_profit
 
 
 def compute_non_atomic_bundle_profit(
-    pure_bundle_A_profit: float, pure_bundle_B_profit: float
-) -> float:
+    pure_bundle_A_profit: Union[float, NDArray],
+    pure_bundle_B_profit: Union[float, NDArray],
+) -> Union[float, NDArray]:
     bundle_profit = pure_bundle_A_profit + pure_bundle_B_profit
     return bundle_profit
 
@@ -27,23 +29,47 @@ def compute_non_atomic_bundle_profit(
 def compute_pure_bundle_profits(
     rollup_A: RollupSpec,
     rollup_B: RollupSpec,
-    failure_outcome_A: int,
-    failure_outcome_B: int,
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
     y_price_model: AssetPriceModel,
-) -> Tuple[float, float]:
-    # Raise exceptions if some specs are not correct
-    check_rollup_specs(rollup_A, rollup_B)
-    # Get optimal trade sizes
-    trade_sizes_dict = compute_arb_trade_sizes(rollup_A, rollup_B)
-    delta_x_A = trade_sizes_dict["delta_x_A"]
-    delta_y_A = trade_sizes_dict["delta_y_A"]
-    delta_x_B = trade_sizes_dict["delta_x_B"]
-    delta_y_B = trade_sizes_dict["delta_y_B"]
-    # Generate asset prices and get fee
-    y_price = y_price_model.generate_asset_prices(n_samples=1)[0]
-    x_price_A = rollup_A.get_arb_pool_price_in_y_units() * y_price
-    x_price_B = rollup_B.get_arb_pool_price_in_y_units() * y_price
+    y_price: Union[float, NDArray],
+) -> Tuple[Union[float, NDArray], Union[float, NDArray]]:
+    # Get optimal trade sizes (raises exceptions if some specs are not correct)
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = compute_arb_trade_sizes_for_pool_state(
+        PoolState.from_rollups(rollup_A, rollup_B)
+    )
     fee_stable = y_price_model.get_trading_fee()  # same for both X and Y tokens
+    return compute_pure_bundle_profits_from_trades(
+        delta_x_A,
+        delta_y_A,
+        delta_x_B,
+        delta_y_B,
+        rollup_A.get_arb_pool_price_in_y_units(),
+        rollup_B.get_arb_pool_price_in_y_units(),
+        failure_outcome_A,
+        failure_outcome_B,
+        fee_stable,
+        y_price,
+    )
+
+
+def compute_pure_bundle_profits_from_trades(
+    delta_x_A: Union[float, NDArray],
+    delta_y_A: Union[float, NDArray],
+    delta_x_B: Union[float, NDArray],
+    delta_y_B: Union[float, NDArray],
+    price_A: Union[float, NDArray],  # pool prices in y units
+    price_B: Union[float, NDArray],
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
+    fee_stable: float,
+    y_price: Union[float, NDArray],
+) -> Tuple[Union[float, NDArray], Union[float, NDArray]]:
+    # Same as compute_pure_bundle_profits, but trade sizes and pool prices can be
+    # arrays (e.g. one per path of the time-series simulation)
+    # Get asset prices (pre-drawn, one per iter)
+    x_price_A = price_A * y_price
+    x_price_B = price_B * y_price
     # Compute pure profit for bundle B
     stable_tokens_paid_B = delta_y_B * (1 - fee_stable) * y_price
     stable_tokens_received_B = delta_x_B * (1 - fee_stable) * (x_price_B)
@@ -59,36 +85,12 @@ def compute_pure_bundle_profits(
     return pure_bundle_profit_A, pure_bundle_profit_B
 
 
-def check_rollup_specs(
-    rollup_A: RollupSpec,
-    rollup_B: RollupSpec,
-) -> None:
-    price_A = rollup_A.get_arb_pool_price_in_y_units()
-    price_B = rollup_B.get_arb_pool_price_in_y_units()
-    if price_A <= price_B:
-        raise Exception(
-            "The pool on rollup A must have a higher price than the pool on rollup B"
-        )
-    if rollup_A.get_arb_pool_fee() != rollup_B.get_arb_pool_fee():
-        raise Exception(
-            "The pools on both rollups must have the same fee. The bundle profit formulae makes this assumption!"
-        )
-
-
 def compute_arb_trade_sizes(
     rollup_A: RollupSpec, rollup_B: RollupSpec
 ) -> Dict[str, float]:
-    # Get pool reserves and fee
-    x_A, y_A = rollup_A.get_arb_pool_reserves()
-    x_B, y_B = rollup_B.get_arb_pool_reserves()
-    fee = rollup_A.get_arb_pool_fee()  # should be the same in both rollups!
-    # Compute optimal arbitrage trade sizes -> check paper for full derivation!
-    delta_y_B = (math.sqrt(x_A * y_A * x_B * y_B) - x_A * y_B) / (
-        (1 - fee) * x_A + ((1 - fee) ** 2) * x_B
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = compute_arb_trade_sizes_for_pool_state(
+        PoolState.from_rollups(rollup_A, rollup_B)
     )
-    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
-    delta_x_A = delta_x_B
-    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
     # Store trade sizes in dict
     trade_sizes_dict = {
         "delta_x_A": delta_x_A,
@@ -97,3 +99,22 @@ def compute_arb_trade_sizes(
         "delta_y_B": delta_y_B,
     }
     return trade_sizes_dict
+
+
+def compute_arb_trade_sizes_for_pool_state(
+    pool_state: PoolState,
+) -> Tuple[float, float, float, float]:
+    # Cached per pool state (raises exceptions if some specs are not correct)
+    return compute_for_pool_state(kernels.compute_arb_trade_sizes_v1, pool_state)
+
+
+def compute_arb_trade_sizes_from_reserves(
+    x_A: Union[float, NDArray],
+    y_A: Union[float, NDArray],
+    x_B: Union[float, NDArray],
+    y_B: Union[float, NDArray],
+    fee: Union[float, NDArray],
+) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+    # Reserves and fee can be scalars or broadcastable arrays (e.g. one pool per path)
+    # Compute optimal arbitrage trade sizes -> check paper for full derivation!
+    return kernels.compute_arb_trade_sizes_v1(x_A, y_A, x_B, y_B, fee)
@@ -1,25 +1,26 @@
-import math
-from rollup import RollupSpec
-from asset import AssetPriceModel
-from typing import Tuple, Dict
+from . import kernels
+from .rollup import RollupSpec
+from .asset import AssetPriceModel
+from typing import Tuple, Dict, Union
+from numpy.typing import NDArray
 
 
 def compute_atomic_bundle_profit(
-    pure_bundle_A_profit: float,
-    pure_bundle_B_profit: float,
-    failure_outcome_A: int,
-    failure_outcome_B: int,
-) -> float:
-    if failure_outcome_A == 0 and failure_outcome_B == 0:
-        bundle_profit = pure_bundle_A_profit + pure_bundle_B_profit
-    else:
-        bundle_profit = 0.0
+    pure_bundle_A_profit: Union[float, NDArray],
+    pure_bundle_B_profit: Union[float, NDArray],
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
+) -> Union[float, NDArray]:
+    # -> bundle only executes if both transactions succeed
+    both_succeed = (1 - failure_outcome_A) * (1 - failure_outcome_B)
+    bundle_profit = (pure_bundle_A_profit + pure_bundle_B_profit) * both_succeed
     return bundle_profit
 
 
 def compute_non_atomic_bundle_profit(
-    pure_bundle_A_profit: float, pure_bundle_B_profit: float
-) -> float:
+    pure_bundle_A_profit: Union[float, NDArray],
+    pure_bundle_B_profit: Union[float, NDArray],
+) -> Union[float, NDArray]:
     bundle_profit = pure_bundle_A_profit + pure_bundle_B_profit
     return bundle_profit
 
@@ -27,24 +28,48 @@ def compute_non_atomic_bundle_profit(
 def compute_pure_bundle_profits(
     rollup_A: RollupSpec,
     rollup_B: RollupSpec,
-    failure_outcome_A: int,
-    failure_outcome_B: int,
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
     y_price_model: AssetPriceModel,
-) -> Tuple[float, float]:
+    y_price: Union[float, NDArray],
+) -> Tuple[Union[float, NDArray], Union[float, NDArray]]:
     # Raise exceptions if some specs are not correct
     check_rollup_specs(rollup_A, rollup_B)
-    # Generate asset prices and get fee
-    y_price = y_price_model.generate_asset_prices(n_samples=1)[0]
-    single_price = rollup_A.get_arb_pool_price_in_y_units()
-    x_price_A = single_price * y_price
-    x_price_B = single_price * y_price
     fee_stable = y_price_model.get_trading_fee()  # same for both X and Y tokens
     # Get optimal trade sizes
     trade_sizes_dict = compute_arb_trade_sizes(rollup_A, rollup_B, fee_stable)
-    delta_x_A = trade_sizes_dict["delta_x_A"]
-    delta_y_A = trade_sizes_dict["delta_y_A"]
-    delta_x_B = trade_sizes_dict["delta_x_B"]
-    delta_y_B = trade_sizes_dict["delta_y_B"]
+    return compute_pure_bundle_profits_from_trades(
+        trade_sizes_dict["delta_x_A"],
+        trade_sizes_dict["delta_y_A"],
+        trade_sizes_dict["delta_x_B"],
+        trade_sizes_dict["delta_y_B"],
+        rollup_A.get_arb_pool_price_in_y_units(),
+        rollup_B.get_arb_pool_price_in_y_units(),
+        failure_outcome_A,
+        failure_outcome_B,
+        fee_stable,
+        y_price,
+    )
+
+
+def compute_pure_bundle_profits_from_trades(
+    delta_x_A: Union[float, NDArray],
+    delta_y_A: Union[float, NDArray],
+    delta_x_B: Union[float, NDArray],
+    delta_y_B: Union[float, NDArray],
+    price_A: Union[float, NDArray],  # pool prices in y units
+    price_B: Union[float, NDArray],
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
+    fee_stable: float,
+    y_price: Union[float, NDArray],
+) -> Tuple[Union[float, NDArray], Union[float, NDArray]]:
+    # Same signature as bundle.compute_pure_bundle_profits_from_trades. X is valued
+    # at the price of pool A on both legs and the stable fee is paid on top of the
+    # amount paid (1 + fee_stable)
+    # Get asset prices (pre-drawn, one per iter)
+    x_price_A = price_A * y_price
+    x_price_B = price_A * y_price
     # Compute pure profit for bundle B
     stable_tokens_paid_B = delta_y_B * (1 + fee_stable) * y_price
     stable_tokens_received_B = delta_x_B * (1 - fee_stable) * (x_price_B)
@@ -81,16 +106,9 @@ def compute_arb_trade_sizes(
     x_B, y_B = rollup_B.get_arb_pool_reserves()
     fee = rollup_A.get_arb_pool_fee()  # should be the same in both rollups!
     # Compute optimal arbitrage trade sizes -> check paper for full derivation!
-    delta_y_B_num = -x_A * y_B * (1 + fee_stable) + (1 - fee) * (
-        1 - fee_stable
-    ) * math.sqrt(x_A * y_A * x_B * y_B)
-    delta_y_B_denum = x_A * (1 + fee_stable) * (1 - fee) + x_B * (1 - fee) * (
-        1 - fee
-    ) * (1 - fee_stable)
-    delta_y_B = delta_y_B_num / delta_y_B_denum
-    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
-    delta_x_A = delta_x_B * ((1 - fee_stable) / (1 + fee_stable))
-    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = (
+        kernels.compute_stable_fee_arb_trade_sizes(x_A, y_A, x_B, y_B, fee, fee_stable)
+    )
     # Store trade sizes in dict
     trade_sizes_dict = {
         "delta_x_A": delta_x_A,
@@ -104,10 +122,11 @@ def compute_arb_trade_sizes(
 def compute_pure_bundle_profits_v1(
     rollup_A: RollupSpec,
     rollup_B: RollupSpec,
-    failure_outcome_A: int,
-    failure_outcome_B: int,
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
     y_price_model: AssetPriceModel,
-) -> Tuple[float, float]:
+    y_price: Union[float, NDArray],
+) -> Tuple[Union[float, NDArray], Union[float, NDArray]]:
     # Raise exceptions if some specs are not correct
     check_rollup_specs(rollup_A, rollup_B)
     # Get optimal trade sizes
@@ -116,8 +135,7 @@ def compute_pure_bundle_profits_v1(
     delta_y_A = trade_sizes_dict["delta_y_A"]
     delta_x_B = trade_sizes_dict["delta_x_B"]
     delta_y_B = trade_sizes_dict["delta_y_B"]
-    # Generate asset prices and get fee
-    y_price = y_price_model.generate_asset_prices(n_samples=1)[0]
+    # Get asset prices (pre-drawn, one per iter) and fee
     x_price_A = rollup_A.get_arb_pool_price_in_y_units() * y_price
     x_price_B = rollup_B.get_arb_pool_price_in_y_units() * y_price
     fee_stable = y_price_model.get_trading_fee()  # same for both X and Y tokens
@@ -144,12 +162,9 @@ def compute_arb_trade_sizes_v1(
     x_B, y_B = rollup_B.get_arb_pool_reserves()
     fee = rollup_A.get_arb_pool_fee()  # should be the same in both rollups!
     # Compute optimal arbitrage trade sizes -> check paper for full derivation!
-    delta_y_B = (math.sqrt(x_A * y_A * x_B * y_B) - x_A * y_B) / (
-        (1 - fee) * x_A + ((1 - fee) ** 2) * x_B
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = kernels.compute_arb_trade_sizes_v1(
+        x_A, y_A, x_B, y_B, fee
     )
-    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
-    delta_x_A = delta_x_B
-    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
     # Store trade sizes in dict
     trade_sizes_dict = {
         "delta_x_A": delta_x_A,
@@ -167,16 +182,11 @@ def compute_arb_trade_sizes_v2(
     x_A, y_A = rollup_A.get_arb_pool_reserves()
     x_B, y_B = rollup_B.get_arb_pool_reserves()
     fee = rollup_A.get_arb_pool_fee()  # should be the same in both rollups!
-    # Get pool prices
-    price_A = rollup_A.get_arb_pool_price_in_y_units()
-    price_B = rollup_B.get_arb_pool_price_in_y_units()
-    # Compute optimal arbitrage trade sizes -> check paper for full derivation!
-    delta_y_B = (math.sqrt(x_A * y_A * x_B * y_B) * (price_A / price_B) - x_A * y_B) / (
-        (1 - fee) * x_A + ((1 - fee) ** 2) * x_B
+    # Compute optimal arbitrage trade sizes (pool prices are y / x of the reserves)
+    # -> check paper for full derivation!
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = kernels.compute_arb_trade_sizes_v2(
+        x_A, y_A, x_B, y_B, fee
     )
-    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
-    delta_x_A = delta_x_B * (price_B / price_A)
-    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
     # Store trade sizes in dict
     trade_sizes_dict = {
         "delta_x_A": delta_x_A,
@@ -0,0 +1,395 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import numpy as np
+from . import sweep
+from .profit_models import DEFAULT_PROFIT_MODEL, get_profit_model
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Headless runner for sweeps: reads a scenario file (TOML, YAML or JSON), runs it
+# with one of the engines on N workers and writes the results as a columnar file
+# plus a run manifest to an output directory. Installed as the shared-sequencer-arb
+# command (pip install .), or run from a checkout (in src) as python -m model_v1.cli
+# Usage:
+#   shared-sequencer-arb run scenarios/example.toml --output runs/example
+#   shared-sequencer-arb run scenarios/example.toml --output runs/x --n-workers 32
+#   shared-sequencer-arb validate scenarios/example.toml
+# A scenario is a sweep config (see sweep.py) plus an optional [run] section
+# (RUN_DEFAULTS) and an optional [grid] of dotted params, e.g.
+#   [run]
+#   engine = "batch"
+#   n_iter = 1_000_000
+#   seed = 1
+#   [grid]
+#   "rollup_A.fail_rate" = [0.1, 0.5, 0.9]
+# Engines:
+#   batch    -> one row per iter (sweep.run_param_sweep_to_file), vectorized chunks
+#               on workers, each chunk written to the results file once done
+#   summary  -> aggregates per cell and column (sweep.run_summary_sweep), memory
+#               does not grow with n_iter, cells on workers
+#   expected -> exact expectations per cell (sweep.run_expected_profits_sweep), no
+#               sampling, single process
+
+ENGINES = ["batch", "summary", "expected"]
+FILE_FORMATS = ["parquet", "arrow", "csv"]
+RUN_DEFAULTS = {
+    "engine": "batch",
+    "n_iter": 10_000,
+    "seed": None,  # drawn at random and stored in the manifest if None
+    "n_workers": None,  # all CPUs if None
+    "chunk_size": 100_000,  # batch engine
+    "common_random_numbers": False,
+    "target_std_error": None,  # summary engine
+    "n_nodes": 10,  # expected engine
+    "profile": False,  # batch engine
+    "file_format": "parquet",
+}
+SPEC_SECTIONS = ["rollup_A", "rollup_B", "y_price_model"]
+MANIFEST_NAME = "manifest.json"
+RESULTS_NAME = "results"
+
+
+def load_scenario(path: str) -> Dict[str, Any]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError("tomli is required to read TOML on python < 3.11")
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    elif extension in [".yaml", ".yml"]:
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML is required to read YAML scenarios")
+        with open(path) as f:
+            return yaml.safe_load(f)
+    elif extension == ".json":
+        with open(path) as f:
+            return json.load(f)
+    raise AttributeError('scenario file should be ".toml", ".yaml", ".yml" or ".json"')
+
+
+def resolve_scenario(
+    scenario: Dict[str, Any], overrides: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]], Dict[str, List[Any]]]:
+    # Splits a scenario into (run_config, base_config, param_grid). overrides (e.g.
+    # command line args) take precedence over the [run] section, None is ignored
+    base_config = dict(scenario)
+    run_config = dict(RUN_DEFAULTS)
+    run_config.update(base_config.pop("run", {}))
+    if overrides is not None:
+        run_config.update(
+            {key: value for key, value in overrides.items() if value is not None}
+        )
+    unknown_settings = set(run_config) - set(RUN_DEFAULTS)
+    if unknown_settings:
+        raise AttributeError(f"Unknown run settings: {sorted(unknown_settings)}")
+    if run_config["engine"] not in ENGINES:
+        raise AttributeError(f"engine should be one of {ENGINES}")
+    if run_config["file_format"] not in FILE_FORMATS:
+        raise AttributeError(f"file_format should be one of {FILE_FORMATS}")
+    check_file_format(run_config["file_format"])
+    param_grid = base_config.pop("grid", {})
+    for section in SPEC_SECTIONS:
+        if section not in base_config:
+            raise KeyError(f"Scenario has no {section} section")
+    # -> the seed of every run is known, so any run can be repeated from its manifest
+    if run_config["seed"] is None:
+        run_config["seed"] = np.random.SeedSequence().entropy
+    return run_config, base_config, param_grid
+
+
+def check_file_format(file_format: str) -> None:
+    # -> a missing writer shows up before the run, not after it
+    if file_format in ["parquet", "arrow"]:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                f"pyarrow is required to write {file_format} output -> install the "
+                'arrow extra (pip install ".[arrow]") or use file_format = "csv"'
+            )
+
+
+def validate_scenario(
+    base_config: Dict[str, Dict[str, Any]], param_grid: Dict[str, List[Any]]
+) -> int:
+    # Builds the specs of every cell -> config errors show up before any work is
+    # scheduled. Returns the number of cells
+    grid_cells = sweep.build_param_grid(base_config, param_grid)
+    for _, cell_config in grid_cells:
+        sweep.build_simulation_specs(cell_config)
+        get_profit_model(cell_config.get("profit_model", DEFAULT_PROFIT_MODEL))
+    return len(grid_cells)
+
+
+def run_scenario(
+    run_config: Dict[str, Any],
+    base_config: Dict[str, Dict[str, Any]],
+    param_grid: Dict[str, List[Any]],
+) -> "pd.DataFrame":
+    if run_config["engine"] == "batch":
+        return sweep.run_param_sweep(
+            run_config["n_iter"],
+            base_config,
+            param_grid,
+            n_workers=run_config["n_workers"],
+            chunk_size=run_config["chunk_size"],
+            seed=run_config["seed"],
+            common_random_numbers=run_config["common_random_numbers"],
+            profile=run_config["profile"],
+        )
+    elif run_config["engine"] == "summary":
+        return sweep.run_summary_sweep(
+            run_config["n_iter"],
+            base_config,
+            param_grid,
+            n_workers=run_config["n_workers"],
+            seed=run_config["seed"],
+            common_random_numbers=run_config["common_random_numbers"],
+            target_std_error=run_config["target_std_error"],
+        )
+    return sweep.run_expected_profits_sweep(
+        base_config, param_grid, n_nodes=run_config["n_nodes"]
+    )
+
+
+def run_scenario_to_file(
+    run_config: Dict[str, Any],
+    base_config: Dict[str, Dict[str, Any]],
+    param_grid: Dict[str, List[Any]],
+    output_dir: str,
+) -> Dict[str, Any]:
+    # Runs the scenario and writes its results to output_dir. Returns
+    # {"results_path", "n_rows", "columns", "attrs"}. The batch engine streams its
+    # chunks to the file as they are done -> its output is never held in memory
+    file_format = run_config["file_format"]
+    if run_config["engine"] == "batch":
+        path = os.path.join(output_dir, f"{RESULTS_NAME}.{file_format}")
+        sweep_info = sweep.run_param_sweep_to_file(
+            run_config["n_iter"],
+            base_config,
+            param_grid,
+            path,
+            file_format=file_format,
+            n_workers=run_config["n_workers"],
+            chunk_size=run_config["chunk_size"],
+            seed=run_config["seed"],
+            common_random_numbers=run_config["common_random_numbers"],
+            profile=run_config["profile"],
+        )
+        return {"results_path": path, **sweep_info}
+    results_df = run_scenario(run_config, base_config, param_grid)
+    return {
+        "results_path": write_results(results_df, output_dir, file_format),
+        "n_rows": len(results_df),
+        "columns": list(results_df.columns),
+        "attrs": dict(results_df.attrs),
+    }
+
+
+def write_results(results_df: "pd.DataFrame", output_dir: str, file_format: str) -> str:
+    # parquet / arrow files can be read back with sink.open_arb_sim_output
+    path = os.path.join(output_dir, f"{RESULTS_NAME}.{file_format}")
+    if file_format == "csv":
+        results_df.to_csv(path, index=False)
+        return path
+    check_file_format(file_format)
+    import pyarrow as pa
+
+    # attrs (profile, graph stats, ...) go to the manifest instead
+    table = pa.Table.from_pandas(results_df, preserve_index=False)
+    table = table.replace_schema_metadata(None)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path)
+    else:
+        with pa.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+    return path
+
+
+def get_package_version() -> Optional[str]:
+    from importlib import metadata
+
+    try:
+        return metadata.version("shared-sequencer-arb")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def get_git_commit() -> Optional[str]:
+    # Commit of the checkout the code runs from, if any (not for wheel installs)
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.realpath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip()
+
+
+def to_json_value(value: Any) -> Any:
+    # json.dump fallback for numpy scalars / arrays in configs and attrs
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def write_manifest(output_dir: str, manifest: Dict[str, Any]) -> str:
+    # Written to a temp file first -> a manifest on disk is always complete
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, default=to_json_value)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def run_command(args: argparse.Namespace) -> int:
+    scenario = load_scenario(args.scenario)
+    run_config, base_config, param_grid = resolve_scenario(
+        scenario,
+        {
+            "engine": args.engine,
+            "n_iter": args.n_iter,
+            "seed": args.seed,
+            "n_workers": args.n_workers,
+            "chunk_size": args.chunk_size,
+            "common_random_numbers": args.common_random_numbers,
+            "target_std_error": args.target_std_error,
+            "profile": args.profile,
+            "file_format": args.file_format,
+        },
+    )
+    n_cells = validate_scenario(base_config, param_grid)
+    if os.path.exists(os.path.join(args.output, MANIFEST_NAME)) and not args.overwrite:
+        raise FileExistsError(
+            f"{args.output} already holds a run, use --overwrite to replace it"
+        )
+    os.makedirs(args.output, exist_ok=True)
+    manifest = {
+        "status": "running",
+        "scenario_path": os.path.realpath(args.scenario),
+        "run": run_config,
+        "config": base_config,
+        "grid": param_grid,
+        "n_cells": n_cells,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "argv": sys.argv,
+        "version": get_package_version(),
+        "git_commit": get_git_commit(),
+        "machine": {
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+    }
+    write_manifest(args.output, manifest)
+    print(
+        f"Running {n_cells} cell(s) with the {run_config['engine']} engine "
+        f"-> {args.output}",
+        file=sys.stderr,
+    )
+    start = time.perf_counter()
+    try:
+        results_info = run_scenario_to_file(
+            run_config, base_config, param_grid, args.output
+        )
+    except BaseException as e:
+        # -> failed runs are told apart from running ones on the batch cluster
+        manifest.update(
+            {
+                "status": "failed",
+                "error": repr(e),
+                "elapsed": time.perf_counter() - start,
+            }
+        )
+        write_manifest(args.output, manifest)
+        raise
+    manifest.update(
+        {
+            "status": "complete",
+            "elapsed": time.perf_counter() - start,
+            "results_path": os.path.basename(results_info["results_path"]),
+            "n_rows": results_info["n_rows"],
+            "columns": results_info["columns"],
+            "attrs": results_info["attrs"],
+        }
+    )
+    write_manifest(args.output, manifest)
+    print(
+        f"Wrote {results_info['n_rows']} row(s) to {results_info['results_path']} "
+        f"in {manifest['elapsed']:.1f}s",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def validate_command(args: argparse.Namespace) -> int:
+    run_config, base_config, param_grid = resolve_scenario(load_scenario(args.scenario))
+    n_cells = validate_scenario(base_config, param_grid)
+    print(json.dumps({"engine": run_config["engine"], "n_cells": n_cells}))
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="shared-sequencer-arb",
+        description="Run arbitrage profit sweeps from scenario files",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run a scenario")
+    run_parser.add_argument("scenario", help="TOML, YAML or JSON scenario file")
+    run_parser.add_argument("--output", required=True, help="output directory")
+    run_parser.add_argument(
+        "--overwrite", action="store_true", help="replace a run in --output"
+    )
+    # Overrides of the [run] section -> None keeps the scenario value
+    run_parser.add_argument("--engine", choices=ENGINES, default=None)
+    run_parser.add_argument("--n-iter", type=int, default=None)
+    run_parser.add_argument("--seed", type=int, default=None)
+    run_parser.add_argument("--n-workers", type=int, default=None)
+    run_parser.add_argument("--chunk-size", type=int, default=None)
+    run_parser.add_argument(
+        "--common-random-numbers", action="store_true", default=None
+    )
+    run_parser.add_argument("--target-std-error", type=float, default=None)
+    run_parser.add_argument("--profile", action="store_true", default=None)
+    run_parser.add_argument("--file-format", choices=FILE_FORMATS, default=None)
+    run_parser.set_defaults(handler=run_command)
+    validate_parser = commands.add_parser(
+        "validate", help="check a scenario without running it"
+    )
+    validate_parser.add_argument("scenario", help="TOML, YAML or JSON scenario file")
+    validate_parser.set_defaults(handler=validate_command)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,85 @@
-from rollup import RollupSpec
+from .rollup import RollupSpec
+from typing import Union
+from numpy.typing import NDArray
 
 
 def compute_atomic_arb_cost(
-    failure_outcome_A: int,
-    failure_outcome_B: int,
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
     rollup_A: RollupSpec,
     rollup_B: RollupSpec,
-    gas_price_A: float,
-    gas_price_B: float,
-) -> float:
-    gas_cost_A_success = gas_price_A * rollup_A.get_gas_units_swap()
-    gas_cost_B_success = gas_price_B * rollup_B.get_gas_units_swap()
-    gas_cost_A_fail = gas_price_A * rollup_A.get_gas_units_fail()
-    gas_cost_B_fail = gas_price_B * rollup_B.get_gas_units_fail()
-    if failure_outcome_A == 0 and failure_outcome_B == 0:
-        arb_cost = gas_cost_A_success + gas_cost_B_success
-    else:
-        arb_cost = gas_cost_A_fail + gas_cost_B_fail
+    gas_price_A: Union[float, NDArray],
+    gas_price_B: Union[float, NDArray],
+) -> Union[float, NDArray]:
+    return compute_atomic_arb_cost_from_gas_units(
+        failure_outcome_A,
+        failure_outcome_B,
+        rollup_A.get_gas_units_swap(),
+        rollup_A.get_gas_units_fail(),
+        rollup_B.get_gas_units_swap(),
+        rollup_B.get_gas_units_fail(),
+        gas_price_A,
+        gas_price_B,
+    )
+
+
+def compute_atomic_arb_cost_from_gas_units(
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
+    gas_units_swap_A: float,
+    gas_units_fail_A: float,
+    gas_units_swap_B: float,
+    gas_units_fail_B: float,
+    gas_price_A: Union[float, NDArray],
+    gas_price_B: Union[float, NDArray],
+) -> Union[float, NDArray]:
+    # Same as compute_atomic_arb_cost -> only depends on the gas params of the rollups
+    gas_cost_A_success = gas_price_A * gas_units_swap_A
+    gas_cost_B_success = gas_price_B * gas_units_swap_B
+    gas_cost_A_fail = gas_price_A * gas_units_fail_A
+    gas_cost_B_fail = gas_price_B * gas_units_fail_B
+    # -> both transactions pay the success gas cost only if the bundle executes
+    both_succeed = (1 - failure_outcome_A) * (1 - failure_outcome_B)
+    arb_cost = (gas_cost_A_success + gas_cost_B_success) * both_succeed + (
+        gas_cost_A_fail + gas_cost_B_fail
+    ) * (1 - both_succeed)
     return arb_cost
 
 
 def compute_non_atomic_arb_cost(
-    failure_outcome_A: int,
-    failure_outcome_B: int,
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
     rollup_A: RollupSpec,
     rollup_B: RollupSpec,
-    gas_price_A: float,
-    gas_price_B: float,
-) -> float:
-    gas_cost_A_success = gas_price_A * rollup_A.get_gas_units_swap()
-    gas_cost_B_success = gas_price_B * rollup_B.get_gas_units_swap()
-    gas_cost_A_fail = gas_price_A * rollup_A.get_gas_units_fail()
-    gas_cost_B_fail = gas_price_B * rollup_B.get_gas_units_fail()
+    gas_price_A: Union[float, NDArray],
+    gas_price_B: Union[float, NDArray],
+) -> Union[float, NDArray]:
+    return compute_non_atomic_arb_cost_from_gas_units(
+        failure_outcome_A,
+        failure_outcome_B,
+        rollup_A.get_gas_units_swap(),
+        rollup_A.get_gas_units_fail(),
+        rollup_B.get_gas_units_swap(),
+        rollup_B.get_gas_units_fail(),
+        gas_price_A,
+        gas_price_B,
+    )
+
+
+def compute_non_atomic_arb_cost_from_gas_units(
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
+    gas_units_swap_A: float,
+    gas_units_fail_A: float,
+    gas_units_swap_B: float,
+    gas_units_fail_B: float,
+    gas_price_A: Union[float, NDArray],
+    gas_price_B: Union[float, NDArray],
+) -> Union[float, NDArray]:
+    gas_cost_A_success = gas_price_A * gas_units_swap_A
+    gas_cost_B_success = gas_price_B * gas_units_swap_B
+    gas_cost_A_fail = gas_price_A * gas_units_fail_A
+    gas_cost_B_fail = gas_price_B * gas_units_fail_B
     arb_cost = (
         gas_cost_A_success * (1 - failure_outcome_A)
         + gas_cost_A_fail * failure_outcome_A
@@ -0,0 +1,162 @@
+import time
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional
+
+# Dependency-tracked evaluation graph: inputs are set by name, every other node is a
+# function of other nodes. Values are cached, and a node is only recomputed when
+# one of its dependencies actually changed value since it was last computed. If a
+# recomputed node gets the same value as before (e.g. the pool state of rollups
+# whose fail rate changed), its dependents are not recomputed either.
+# Counters per node: n_computed (function calls), n_skipped (dependencies changed
+# upstream but not its own) and n_hits (nothing changed), with the compute time
+
+
+def values_equal(value_a: Any, value_b: Any) -> bool:
+    # Equality for the node values: scalars, arrays and (nested) tuples / lists / dicts
+    if value_a is value_b:
+        return True
+    if isinstance(value_a, np.ndarray) or isinstance(value_b, np.ndarray):
+        return np.shape(value_a) == np.shape(value_b) and np.array_equal(
+            value_a, value_b
+        )
+    if isinstance(value_a, (tuple, list)):
+        return (
+            type(value_a) is type(value_b)
+            and len(value_a) == len(value_b)
+            and all(values_equal(a, b) for a, b in zip(value_a, value_b))
+        )
+    if isinstance(value_a, dict):
+        return (
+            isinstance(value_b, dict)
+            and value_a.keys() == value_b.keys()
+            and all(values_equal(value_a[key], value_b[key]) for key in value_a)
+        )
+    try:
+        return bool(value_a == value_b)
+    except (TypeError, ValueError):
+        return False
+
+
+class EvalNode:
+    __slots__ = (
+        "name",
+        "func",
+        "deps",
+        "value",
+        "changed_at",
+        "verified_at",
+        "n_computed",
+        "n_skipped",
+        "n_hits",
+        "compute_time",
+    )
+
+    def __init__(
+        self, name: str, func: Optional[Callable[..., Any]], deps: List[str]
+    ) -> None:
+        self.name = name
+        self.func = func  # None -> input node
+        self.deps = deps
+        self.value = None
+        # Revisions: last change of the value, and last check against the deps
+        self.changed_at = -1
+        self.verified_at = -1
+        self.n_computed = 0
+        self.n_skipped = 0
+        self.n_hits = 0
+        self.compute_time = 0.0
+
+
+class EvalGraph:
+    def __init__(self) -> None:
+        self.nodes: Dict[str, EvalNode] = {}
+        self.revision = 0
+
+    def add_input(self, name: str, value: Any = None) -> None:
+        self.add_node_object(EvalNode(name, None, []))
+        if value is not None:
+            self.set_input(name, value)
+
+    def add_node(self, name: str, func: Callable[..., Any], deps: List[str]) -> None:
+        # func is called with the values of deps as positional args, in order
+        for dep in deps:
+            if dep not in self.nodes:
+                raise KeyError(f"Unknown dependency {dep} of node {name}")
+        self.add_node_object(EvalNode(name, func, list(deps)))
+
+    def add_node_object(self, node: EvalNode) -> None:
+        if node.name in self.nodes:
+            raise AttributeError(f"Node {node.name} is already in the graph")
+        self.nodes[node.name] = node
+
+    def set_input(self, name: str, value: Any) -> bool:
+        # Returns whether the input changed -> an equal value invalidates nothing
+        node = self.nodes[name]
+        if node.func is not None:
+            raise AttributeError(f"{name} is a computed node, not an input")
+        if node.changed_at >= 0 and values_equal(node.value, value):
+            return False
+        self.revision += 1
+        node.value = value
+        node.changed_at = self.revision
+        node.verified_at = self.revision
+        return True
+
+    def set_inputs(self, **values: Any) -> List[str]:
+        # Returns the names of the inputs that changed
+        return [name for name, value in values.items() if self.set_input(name, value)]
+
+    def get(self, name: str) -> Any:
+        node = self.nodes[name]
+        self.update_node(node)
+        return node.value
+
+    def update_node(self, node: EvalNode) -> None:
+        if node.verified_at == self.revision:
+            node.n_hits += 1
+            return
+        if node.func is None:
+            if node.changed_at < 0:
+                raise AttributeError(f"Input {node.name} has not been set")
+            node.verified_at = self.revision
+            return
+        for dep in node.deps:
+            self.update_node(self.nodes[dep])
+        # -> recompute only if a dependency changed since this node was last checked
+        if node.changed_at >= 0 and all(
+            self.nodes[dep].changed_at <= node.verified_at for dep in node.deps
+        ):
+            node.n_skipped += 1
+            node.verified_at = self.revision
+            return
+        start = time.perf_counter()
+        value = node.func(*[self.nodes[dep].value for dep in node.deps])
+        node.compute_time += time.perf_counter() - start
+        node.n_computed += 1
+        if node.changed_at < 0 or not values_equal(node.value, value):
+            node.value = value
+            node.changed_at = self.revision
+        node.verified_at = self.revision
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        # skipped_time estimates the work saved: (skips + hits) * mean compute time
+        stats = {}
+        for name, node in self.nodes.items():
+            if node.func is None:
+                continue
+            mean_time = node.compute_time / node.n_computed if node.n_computed else 0.0
+            stats[name] = {
+                "n_computed": node.n_computed,
+                "n_skipped": node.n_skipped,
+                "n_hits": node.n_hits,
+                "compute_time": node.compute_time,
+                "skipped_time": (node.n_skipped + node.n_hits) * mean_time,
+            }
+        return stats
+
+    def reset_stats(self) -> None:
+        for node in self.nodes.values():
+            node.n_computed = 0
+            node.n_skipped = 0
+            node.n_hits = 0
+            node.compute_time = 0.0
@@ -0,0 +1,268 @@
+import numpy as np
+from . import cost
+from . import bundle
+from .rollup import RollupSpec
+from .asset import AssetPriceModel
+from .evalgraph import EvalGraph
+from typing import Dict, Tuple
+from numpy.typing import NDArray
+
+# The four (fail_A, fail_B) outcome cells
+FAIL_OUTCOMES_A = np.array([0, 0, 1, 1])
+FAIL_OUTCOMES_B = np.array([0, 1, 0, 1])
+
+
+def compute_outcome_cell_probs(rollup_A: RollupSpec, rollup_B: RollupSpec) -> NDArray:
+    return compute_outcome_cell_probs_from_fail_rates(
+        rollup_A.get_fail_rate(), rollup_B.get_fail_rate()
+    )
+
+
+def compute_outcome_cell_probs_from_fail_rates(
+    fail_rate_A: float, fail_rate_B: float
+) -> NDArray:
+    cell_probs = np.where(FAIL_OUTCOMES_A == 1, fail_rate_A, 1 - fail_rate_A) * (
+        np.where(FAIL_OUTCOMES_B == 1, fail_rate_B, 1 - fail_rate_B)
+    )
+    return cell_probs
+
+
+def compute_expected_profits_by_cell(
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    n_nodes: int = 10,
+) -> Dict[str, NDArray]:
+    # Conditional expectations for each outcome cell (arrays of shape (4,)), where
+    # only gas and asset prices are integrated by quadrature
+    trade_sizes = bundle.compute_arb_trade_sizes_for_pool_state(
+        bundle.PoolState.from_rollups(rollup_A, rollup_B)
+    )
+    expected_bundle_profits = compute_expected_bundle_profits_by_cell(
+        trade_sizes,
+        rollup_A.get_arb_pool_price_in_y_units(),
+        rollup_B.get_arb_pool_price_in_y_units(),
+        y_price_model.get_trading_fee(),
+        y_price_model.get_asset_price_quadrature(n_nodes),
+    )
+    expected_costs = compute_expected_arb_costs_by_cell(
+        get_gas_units(rollup_A),
+        get_gas_units(rollup_B),
+        rollup_A.get_gas_price_model().get_gas_price_quadrature(n_nodes),
+        rollup_B.get_gas_price_model().get_gas_price_quadrature(n_nodes),
+    )
+    return aggregate_expected_profits_by_cell(
+        compute_outcome_cell_probs(rollup_A, rollup_B),
+        expected_bundle_profits,
+        expected_costs,
+    )
+
+
+def get_gas_units(rollup: RollupSpec) -> Tuple[float, float]:
+    return (rollup.get_gas_units_swap(), rollup.get_gas_units_fail())
+
+
+def get_gas_price_quadrature(
+    rollup: RollupSpec, n_nodes: int
+) -> Tuple[NDArray, NDArray]:
+    return rollup.get_gas_price_model().get_gas_price_quadrature(n_nodes)
+
+
+def compute_expected_bundle_profits_by_cell(
+    trade_sizes: Tuple[float, float, float, float],
+    price_A: float,
+    price_B: float,
+    fee_stable: float,
+    y_quadrature: Tuple[NDArray, NDArray],
+) -> Dict[str, NDArray]:
+    # Bundle profits only depend on the y price -> grid of (cell, y node)
+    y_nodes, y_weights = y_quadrature
+    fail_outcomes_A = FAIL_OUTCOMES_A[:, None]
+    fail_outcomes_B = FAIL_OUTCOMES_B[:, None]
+    pure_bundle_profits_A, pure_bundle_profits_B = (
+        bundle.compute_pure_bundle_profits_from_trades(
+            *trade_sizes,
+            price_A,
+            price_B,
+            fail_outcomes_A,
+            fail_outcomes_B,
+            fee_stable,
+            y_nodes[None, :],
+        )
+    )
+    atomic_bundle_profits = bundle.compute_atomic_bundle_profit(
+        pure_bundle_profits_A,
+        pure_bundle_profits_B,
+        fail_outcomes_A,
+        fail_outcomes_B,
+    )
+    non_atomic_bundle_profits = bundle.compute_non_atomic_bundle_profit(
+        pure_bundle_profits_A,
+        pure_bundle_profits_B,
+    )
+    return {
+        "atomic": atomic_bundle_profits @ y_weights,
+        "non_atomic": non_atomic_bundle_profits @ y_weights,
+    }
+
+
+def compute_expected_arb_costs_by_cell(
+    gas_units_A: Tuple[float, float],  # (swap, fail)
+    gas_units_B: Tuple[float, float],
+    gas_quadrature_A: Tuple[NDArray, NDArray],
+    gas_quadrature_B: Tuple[NDArray, NDArray],
+) -> Dict[str, NDArray]:
+    # Arb costs are a sum of a rollup A term and a rollup B term -> each gas price is
+    # integrated on its own grid of (cell, gas node)
+    gas_nodes_A, gas_weights_A = gas_quadrature_A
+    gas_nodes_B, gas_weights_B = gas_quadrature_B
+    fail_outcomes_A = FAIL_OUTCOMES_A[:, None]
+    fail_outcomes_B = FAIL_OUTCOMES_B[:, None]
+    expected_costs = {}
+    for regime, compute_arb_cost in [
+        ("atomic", cost.compute_atomic_arb_cost_from_gas_units),
+        ("non_atomic", cost.compute_non_atomic_arb_cost_from_gas_units),
+    ]:
+        arb_costs_A = compute_arb_cost(
+            fail_outcomes_A,
+            fail_outcomes_B,
+            *gas_units_A,
+            *gas_units_B,
+            gas_nodes_A[None, :],
+            0.0,
+        )
+        arb_costs_B = compute_arb_cost(
+            fail_outcomes_A,
+            fail_outcomes_B,
+            *gas_units_A,
+            *gas_units_B,
+            0.0,
+            gas_nodes_B[None, :],
+        )
+        expected_costs[regime] = (
+            arb_costs_A @ gas_weights_A + arb_costs_B @ gas_weights_B
+        )
+    return expected_costs
+
+
+def aggregate_expected_profits_by_cell(
+    cell_probs: NDArray,
+    expected_bundle_profits: Dict[str, NDArray],
+    expected_costs: Dict[str, NDArray],
+) -> Dict[str, NDArray]:
+    # Aggregate expectations per cell
+    expected_atomic_profits = (
+        expected_bundle_profits["atomic"] - expected_costs["atomic"]
+    )
+    expected_non_atomic_profits = (
+        expected_bundle_profits["non_atomic"] - expected_costs["non_atomic"]
+    )
+    expected_profits_by_cell = {
+        "fail_outcome_A": FAIL_OUTCOMES_A,
+        "fail_outcome_B": FAIL_OUTCOMES_B,
+        "cell_prob": cell_probs,
+        "atomic_bundle_profit": expected_bundle_profits["atomic"],
+        "non_atomic_bundle_profit": expected_bundle_profits["non_atomic"],
+        "atomic_arb_cost": expected_costs["atomic"],
+        "non_atomic_arb_cost": expected_costs["non_atomic"],
+        "atomic_profit": expected_atomic_profits,
+        "non_atomic_profit": expected_non_atomic_profits,
+        "shared_sequencing_gain": expected_atomic_profits - expected_non_atomic_profits,
+    }
+    return expected_profits_by_cell
+
+
+def compute_expected_profits(
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    n_nodes: int = 10,
+) -> Dict[str, float]:
+    # Exact expectation over the failure outcomes -> no Bernoulli sampling needed
+    return sum_expected_profits_over_cells(
+        compute_expected_profits_by_cell(rollup_A, rollup_B, y_price_model, n_nodes)
+    )
+
+
+def sum_expected_profits_over_cells(
+    expected_profits_by_cell: Dict[str, NDArray],
+) -> Dict[str, float]:
+    cell_probs = expected_profits_by_cell["cell_prob"]
+    expected_profits = {
+        col: float(values @ cell_probs)
+        for col, values in expected_profits_by_cell.items()
+        if col not in ["fail_outcome_A", "fail_outcome_B", "cell_prob"]
+    }
+    return expected_profits
+
+
+def build_expected_profits_graph(n_nodes: int = 10) -> EvalGraph:
+    # compute_expected_profits as an evaluation graph -> set the rollup_A, rollup_B
+    # and y_price_model inputs, then get("expected_profits"). Between two calls only
+    # the nodes downstream of what changed are recomputed, e.g. a new fail rate only
+    # recomputes the cell probs and the aggregation, not the pool math or gas
+    graph = EvalGraph()
+    for input_name in ["rollup_A", "rollup_B", "y_price_model"]:
+        graph.add_input(input_name)
+    # Spec params -> cheap, and an unchanged param stops the recomputation
+    graph.add_node(
+        "pool_state", bundle.PoolState.from_rollups, ["rollup_A", "rollup_B"]
+    )
+    for side in ["A", "B"]:
+        rollup_name = f"rollup_{side}"
+        graph.add_node(f"fail_rate_{side}", RollupSpec.get_fail_rate, [rollup_name])
+        graph.add_node(
+            f"price_{side}", RollupSpec.get_arb_pool_price_in_y_units, [rollup_name]
+        )
+        graph.add_node(f"gas_units_{side}", get_gas_units, [rollup_name])
+    graph.add_node("fee_stable", AssetPriceModel.get_trading_fee, ["y_price_model"])
+    # Pool math
+    graph.add_node(
+        "trade_sizes", bundle.compute_arb_trade_sizes_for_pool_state, ["pool_state"]
+    )
+    # Failure model
+    graph.add_node(
+        "cell_probs",
+        compute_outcome_cell_probs_from_fail_rates,
+        ["fail_rate_A", "fail_rate_B"],
+    )
+    # Gas and price models -> quadratures of the model instances (empirical models
+    # can be memory-mapped tables, with no constructor args to rebuild them from).
+    # New instances recompute them, but equal nodes / weights stop there
+    for side in ["A", "B"]:
+        graph.add_node(
+            f"gas_quadrature_{side}",
+            lambda rollup: get_gas_price_quadrature(rollup, n_nodes),
+            [f"rollup_{side}"],
+        )
+    graph.add_node(
+        "y_quadrature",
+        lambda y_price_model: y_price_model.get_asset_price_quadrature(n_nodes),
+        ["y_price_model"],
+    )
+    # Profit aggregation
+    graph.add_node(
+        "expected_bundle_profits_by_cell",
+        compute_expected_bundle_profits_by_cell,
+        ["trade_sizes", "price_A", "price_B", "fee_stable", "y_quadrature"],
+    )
+    graph.add_node(
+        "expected_arb_costs_by_cell",
+        compute_expected_arb_costs_by_cell,
+        ["gas_units_A", "gas_units_B", "gas_quadrature_A", "gas_quadrature_B"],
+    )
+    graph.add_node(
+        "expected_profits_by_cell",
+        aggregate_expected_profits_by_cell,
+        [
+            "cell_probs",
+            "expected_bundle_profits_by_cell",
+            "expected_arb_costs_by_cell",
+        ],
+    )
+    graph.add_node(
+        "expected_profits",
+        sum_expected_profits_over_cells,
+        ["expected_profits_by_cell"],
+    )
+    return graph
@@ -1,9 +1,68 @@
-import pandas as pd
-import cost
-import bundle
-from rollup import RollupSpec
-from asset import AssetPriceModel
-from gas import GasPriceModel
+import numpy as np
+from functools import lru_cache
+from . import cost
+from . import bundle
+from . import profit_models
+from .rollup import RollupSpec
+from .asset import AssetPriceModel
+from .gas import GasPriceModel
+from .sink import (
+    ArbSimSink,
+    get_record_dtype,
+    build_arb_sim_records,
+    arb_sim_records_to_frame,
+)
+from .summary import ArbSimSummary
+from .profiler import StageProfiler, NullProfiler, NULL_PROFILER, get_profiler
+from .profit_models import DEFAULT_PROFIT_MODEL
+from typing import TYPE_CHECKING, Optional, Dict, Union
+from numpy.typing import NDArray
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Column types of the simulation output when written to disk
+ARB_SIM_SCHEMA = {
+    "iter": "int64",
+    "fail_outcome_A": "int8",
+    "fail_outcome_B": "int8",
+    "gas_price_A": "float64",
+    "gas_price_B": "float64",
+    "pure_bundle_profit_A": "float64",
+    "pure_bundle_profit_B": "float64",
+    "atomic_bundle_profit": "float64",
+    "non_atomic_bundle_profit": "float64",
+    "atomic_arb_cost": "float64",
+    "non_atomic_arb_cost": "float64",
+    "atomic_profit": "float64",
+    "non_atomic_profit": "float64",
+    "shared_sequencing_gain": "float64",
+}
+
+# Fixed dtype of the in-memory per-iter records
+ARB_SIM_RECORD_DTYPE = get_record_dtype(ARB_SIM_SCHEMA)
+
+# Uniform streams per iter: fail A, fail B, gas A (quantile, jitter),
+# gas B (quantile, jitter), y price (quantile, jitter)
+N_UNIFORM_STREAMS = 8
+
+# Iters per block of common random numbers -> each block has its own stream, so
+# any range of iters can be drawn without drawing the iters before it
+CRN_BLOCK_SIZE = 16_384
+# Blocks kept per process (~1 MiB each) -> the cells of a sweep reuse the blocks of
+# the same iters instead of redrawing them
+CRN_BLOCK_CACHE_SIZE = 32
+
+# Profit, cost and gain columns tracked when only a summary of the runs is kept
+ARB_SIM_SUMMARY_COLUMNS = [
+    "atomic_bundle_profit",
+    "non_atomic_bundle_profit",
+    "atomic_arb_cost",
+    "non_atomic_arb_cost",
+    "atomic_profit",
+    "non_atomic_profit",
+    "shared_sequencing_gain",
+]
 
 
 def run_arb_profit_simulation(
@@ -11,78 +70,349 @@ def run_arb_profit_simulation(
     rollup_A: RollupSpec,
     rollup_B: RollupSpec,
     y_price_model: AssetPriceModel,
-) -> pd.DataFrame:
+    rng: Optional[np.random.Generator] = None,
+    summary_only: bool = False,
+    target_std_error: Optional[float] = None,
+    as_records: bool = False,
+    profit_model: str = DEFAULT_PROFIT_MODEL,
+    crn_seed: Optional[int] = None,
+    iter_offset: int = 0,
+    profile: Union[bool, StageProfiler, NullProfiler] = False,
+) -> Union["pd.DataFrame", NDArray, ArbSimSummary]:
+    # profile=True attaches a per-stage timing report to the output (df.attrs["profile"]
+    # or summary.profile). Records have no attrs -> pass a StageProfiler and read it.
+    # crn_seed -> common random numbers: iter i uses the same uniforms in every run
+    # with the same crn_seed (rng is then unused), so runs of different scenarios
+    # are paired per iter. iter_offset shifts the iters (e.g. chunk of a longer run)
+    if summary_only:
+        return run_arb_profit_simulation_summary(
+            n_iter,
+            rollup_A,
+            rollup_B,
+            y_price_model,
+            target_std_error=target_std_error,
+            rng=rng,
+            profit_model=profit_model,
+            crn_seed=crn_seed,
+            iter_offset=iter_offset,
+            profile=profile,
+        )
+    profiler = get_profiler(profile)
+    arb_sim_columns = compute_arb_sim_columns(
+        n_iter,
+        rollup_A,
+        rollup_B,
+        y_price_model,
+        rng=rng,
+        iter_offset=iter_offset,
+        profit_model=profit_model,
+        crn_seed=crn_seed,
+        profiler=profiler,
+    )
+    with profiler.stage("records_assembly", n_items=n_iter):
+        arb_sim_records = build_arb_sim_records(arb_sim_columns, ARB_SIM_SCHEMA)
+    if as_records:
+        return arb_sim_records
+    with profiler.stage("frame_assembly", n_items=n_iter):
+        arb_sim_df = arb_sim_records_to_frame(arb_sim_records)
+    if profiler.enabled:
+        arb_sim_df.attrs["profile"] = profiler.get_report()
+    return arb_sim_df
+
+
+def run_arb_profit_simulation_to_file(
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    path: str,
+    file_format: str = "parquet",
+    batch_size: int = 1_000_000,
+    rng: Optional[np.random.Generator] = None,
+    profit_model: str = DEFAULT_PROFIT_MODEL,
+    crn_seed: Optional[int] = None,
+    profile: Union[bool, StageProfiler, NullProfiler] = False,
+) -> Optional[Dict]:
+    # Streams the simulation to disk -> peak memory is bounded by batch_size.
+    # Returns the profile report when profiling is on
+    if rng is None:
+        rng = np.random.default_rng()
+    profiler = get_profiler(profile)
+    with ArbSimSink(path, ARB_SIM_SCHEMA, file_format=file_format) as sink:
+        for iter_offset in range(0, n_iter, batch_size):
+            n_iter_batch = min(batch_size, n_iter - iter_offset)
+            arb_sim_columns = compute_arb_sim_columns(
+                n_iter_batch,
+                rollup_A,
+                rollup_B,
+                y_price_model,
+                rng=rng,
+                iter_offset=iter_offset,
+                profit_model=profit_model,
+                crn_seed=crn_seed,
+                profiler=profiler,
+            )
+            with profiler.stage("sink_write", n_items=n_iter_batch):
+                sink.write_batch(arb_sim_columns)
+    return profiler.get_report()
+
+
+def run_arb_profit_simulation_summary(
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    batch_size: int = 100_000,
+    target_std_error: Optional[float] = None,
+    target_column: str = "shared_sequencing_gain",
+    rng: Optional[np.random.Generator] = None,
+    profit_model: str = DEFAULT_PROFIT_MODEL,
+    crn_seed: Optional[int] = None,
+    iter_offset: int = 0,
+    profile: Union[bool, StageProfiler, NullProfiler] = False,
+) -> ArbSimSummary:
+    # Keeps running aggregates only -> no per-iteration rows are stored
+    if rng is None:
+        rng = np.random.default_rng()
+    profiler = get_profiler(profile)
+    arb_sim_summary = ArbSimSummary(ARB_SIM_SUMMARY_COLUMNS, seed=rng.integers(2**32))
+    for batch_offset in range(0, n_iter, batch_size):
+        n_iter_batch = min(batch_size, n_iter - batch_offset)
+        arb_sim_columns = compute_arb_sim_columns(
+            n_iter_batch,
+            rollup_A,
+            rollup_B,
+            y_price_model,
+            rng=rng,
+            iter_offset=iter_offset + batch_offset,
+            profit_model=profit_model,
+            crn_seed=crn_seed,
+            profiler=profiler,
+        )
+        with profiler.stage("summary_update", n_items=n_iter_batch):
+            arb_sim_summary.update(arb_sim_columns)
+        # Stop early once the mean of the target column is precise enough
+        if (target_std_error is not None) and (
+            arb_sim_summary.get_std_error(target_column) <= target_std_error
+        ):
+            arb_sim_summary.converged = True
+            break
+    arb_sim_summary.profile = profiler.get_report()
+    return arb_sim_summary
 
+
+def compute_arb_sim_columns(
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    rng: Optional[np.random.Generator] = None,
+    iter_offset: int = 0,
+    profit_model: str = DEFAULT_PROFIT_MODEL,
+    crn_seed: Optional[int] = None,
+    profiler: Union[StageProfiler, NullProfiler] = NULL_PROFILER,
+) -> Dict[str, NDArray]:
+    if crn_seed is not None:
+        with profiler.stage("uniform_sampling", "common", n_iter):
+            uniforms = draw_common_uniforms(n_iter, crn_seed, iter_offset=iter_offset)
+        return compute_arb_sim_columns_from_uniforms(
+            rollup_A,
+            rollup_B,
+            y_price_model,
+            uniforms,
+            iter_offset=iter_offset,
+            profit_model=profit_model,
+            profiler=profiler,
+        )
+    if rng is None:
+        rng = np.random.default_rng()
+    # Generate failure outcomes for all iters
+    with profiler.stage("fail_sampling", "bernoulli", n_iter):
+        fail_outcomes_A = rollup_A.generate_fail_outcomes(n_iter, rng=rng)
+        fail_outcomes_B = rollup_B.generate_fail_outcomes(n_iter, rng=rng)
+    # Generate gas prices for all iters
+    with profiler.stage(
+        "gas_sampling", rollup_A.get_gas_price_model().get_model_type(), n_iter
+    ):
+        gas_prices_A = rollup_A.generate_gas_prices(n_iter, rng=rng)
+    with profiler.stage(
+        "gas_sampling", rollup_B.get_gas_price_model().get_model_type(), n_iter
+    ):
+        gas_prices_B = rollup_B.generate_gas_prices(n_iter, rng=rng)
+    # Generate asset prices for all iters
+    with profiler.stage("y_price_sampling", y_price_model.get_model_type(), n_iter):
+        y_prices = y_price_model.generate_asset_prices(n_iter, rng=rng)
+    arb_sim_columns = compute_arb_sim_columns_from_draws(
+        rollup_A,
+        rollup_B,
+        y_price_model,
+        fail_outcomes_A,
+        fail_outcomes_B,
+        gas_prices_A,
+        gas_prices_B,
+        y_prices,
+        iter_offset=iter_offset,
+        profit_model=profit_model,
+        profiler=profiler,
+    )
+    return arb_sim_columns
+
+
+def draw_uniforms(n_iter: int, rng: np.random.Generator) -> NDArray:
+    # Uniforms in the open interval (0, 1) -> safe for inverse-CDF transforms
+    uniforms = rng.random((n_iter, N_UNIFORM_STREAMS))
+    return np.clip(uniforms, np.finfo(float).tiny, 1 - np.finfo(float).epsneg)
+
+
+def draw_common_uniforms(n_iter: int, crn_seed: int, iter_offset: int = 0) -> NDArray:
+    # Uniforms of iters [iter_offset, iter_offset + n_iter) -> they only depend on
+    # crn_seed and the iter index, not on the batching / chunking of the run
+    if n_iter == 0:
+        return np.empty((0, N_UNIFORM_STREAMS))
+    first_block = iter_offset // CRN_BLOCK_SIZE
+    last_block = (iter_offset + n_iter - 1) // CRN_BLOCK_SIZE
+    start = iter_offset - first_block * CRN_BLOCK_SIZE
+    if first_block == last_block:
+        return get_common_uniform_block(crn_seed, first_block)[start : start + n_iter]
+    blocks = [
+        get_common_uniform_block(crn_seed, block_idx)
+        for block_idx in range(first_block, last_block + 1)
+    ]
+    return np.concatenate(blocks)[start : start + n_iter]
+
+
+@lru_cache(maxsize=CRN_BLOCK_CACHE_SIZE)
+def get_common_uniform_block(crn_seed: int, block_idx: int) -> NDArray:
+    # Read-only, as the blocks are shared by all callers
+    block = draw_uniforms(
+        CRN_BLOCK_SIZE,
+        np.random.default_rng(np.random.SeedSequence(crn_seed, spawn_key=(block_idx,))),
+    )
+    block.flags.writeable = False
+    return block
+
+
+def compute_arb_sim_columns_from_uniforms(
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    uniforms: NDArray,  # shape: (n_iter, N_UNIFORM_STREAMS)
+    iter_offset: int = 0,
+    profit_model: str = DEFAULT_PROFIT_MODEL,
+    profiler: Union[StageProfiler, NullProfiler] = NULL_PROFILER,
+) -> Dict[str, NDArray]:
+    # Same as compute_arb_sim_columns, but all randomness comes from the uniforms
+    # -> used for antithetic and common random numbers
+    n_iter = len(uniforms)
+    gas_price_model_A = rollup_A.get_gas_price_model()
+    gas_price_model_B = rollup_B.get_gas_price_model()
+    with profiler.stage("fail_sampling", "bernoulli", n_iter):
+        fail_outcomes_A = rollup_A.fail_outcomes_from_uniforms(uniforms[:, 0])
+        fail_outcomes_B = rollup_B.fail_outcomes_from_uniforms(uniforms[:, 1])
+    with profiler.stage("gas_sampling", gas_price_model_A.get_model_type(), n_iter):
+        gas_prices_A = gas_price_model_A.gas_prices_from_uniforms(
+            uniforms[:, 2], uniforms[:, 3]
+        )
+    with profiler.stage("gas_sampling", gas_price_model_B.get_model_type(), n_iter):
+        gas_prices_B = gas_price_model_B.gas_prices_from_uniforms(
+            uniforms[:, 4], uniforms[:, 5]
+        )
+    with profiler.stage("y_price_sampling", y_price_model.get_model_type(), n_iter):
+        y_prices = y_price_model.asset_prices_from_uniforms(
+            uniforms[:, 6], uniforms[:, 7]
+        )
+    arb_sim_columns = compute_arb_sim_columns_from_draws(
+        rollup_A,
+        rollup_B,
+        y_price_model,
+        fail_outcomes_A,
+        fail_outcomes_B,
+        gas_prices_A,
+        gas_prices_B,
+        y_prices,
+        iter_offset=iter_offset,
+        profit_model=profit_model,
+        profiler=profiler,
+    )
+    return arb_sim_columns
+
+
+def compute_arb_sim_columns_from_draws(
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    fail_outcomes_A: NDArray,
+    fail_outcomes_B: NDArray,
+    gas_prices_A: NDArray,
+    gas_prices_B: NDArray,
+    y_prices: NDArray,
+    iter_offset: int = 0,
+    profit_model: str = DEFAULT_PROFIT_MODEL,
+    profiler: Union[StageProfiler, NullProfiler] = NULL_PROFILER,
+) -> Dict[str, NDArray]:
+    n_iter = len(fail_outcomes_A)
     # Compute profit under each regime - atomic vs. non-atomic transactions
-    arb_sim_df = pd.DataFrame()
-    for i in range(n_iter):
-        # Generate failure outcomes for iter
-        i_fail_outcome_A = rollup_A.generate_fail_outcome()
-        i_fail_outcome_B = rollup_B.generate_fail_outcome()
-        # Generate gas prices for iter
-        i_gas_price_A = rollup_A.generate_gas_price()
-        i_gas_price_B = rollup_B.generate_gas_price()
-        # Compute pure bundle profits for iter
-        i_pure_bundle_profit_A, i_pure_bundle_profit_B = (
-            bundle.compute_pure_bundle_profits(
+    with profiler.stage("bundle_profit", profit_model, n_iter):
+        pure_bundle_profits_A, pure_bundle_profits_B = (
+            profit_models.compute_pure_bundle_profits(
+                profit_model,
                 rollup_A,
                 rollup_B,
-                i_fail_outcome_A,
-                i_fail_outcome_B,
+                fail_outcomes_A,
+                fail_outcomes_B,
                 y_price_model,
+                y_prices,
             )
         )
-        i_atomic_bundle_profit = bundle.compute_atomic_bundle_profit(
-            i_pure_bundle_profit_A,
-            i_pure_bundle_profit_B,
-            i_fail_outcome_A,
-            i_fail_outcome_B,
+        atomic_bundle_profits = bundle.compute_atomic_bundle_profit(
+            pure_bundle_profits_A,
+            pure_bundle_profits_B,
+            fail_outcomes_A,
+            fail_outcomes_B,
         )
-        i_non_atomic_bundle_profit = bundle.compute_non_atomic_bundle_profit(
-            i_pure_bundle_profit_A,
-            i_pure_bundle_profit_B,
+        non_atomic_bundle_profits = bundle.compute_non_atomic_bundle_profit(
+            pure_bundle_profits_A,
+            pure_bundle_profits_B,
         )
-        # Compute arb cost for iter
-        i_atomic_arb_cost = cost.compute_atomic_arb_cost(
-            i_fail_outcome_A,
-            i_fail_outcome_B,
+    # Compute arb cost for all iters
+    with profiler.stage("arb_cost", n_items=n_iter):
+        atomic_arb_costs = cost.compute_atomic_arb_cost(
+            fail_outcomes_A,
+            fail_outcomes_B,
             rollup_A,
             rollup_B,
-            i_gas_price_A,
-            i_gas_price_B,
+            gas_prices_A,
+            gas_prices_B,
         )
-        i_non_atomic_arb_cost = cost.compute_non_atomic_arb_cost(
-            i_fail_outcome_A,
-            i_fail_outcome_B,
+        non_atomic_arb_costs = cost.compute_non_atomic_arb_cost(
+            fail_outcomes_A,
+            fail_outcomes_B,
             rollup_A,
             rollup_B,
-            i_gas_price_A,
-            i_gas_price_B,
+            gas_prices_A,
+            gas_prices_B,
         )
-        # Compute final profits for iter
-        i_atomic_profit = i_atomic_bundle_profit - i_atomic_arb_cost
-        i_non_atomic_profit = i_non_atomic_bundle_profit - i_non_atomic_arb_cost
-        # store results in DataFramwe
-        iter_df = pd.DataFrame(
-            {
-                "iter": [i],
-                "fail_outcome_A": [i_fail_outcome_A],
-                "fail_outcome_B": [i_fail_outcome_B],
-                "gas_price_A": [i_gas_price_A],
-                "gas_price_B": [i_gas_price_B],
-                "pure_bundle_profit_A": [i_pure_bundle_profit_A],
-                "pure_bundle_profit_B": [i_pure_bundle_profit_B],
-                "atomic_bundle_profit": [i_atomic_bundle_profit],
-                "non_atomic_bundle_profit": [i_non_atomic_bundle_profit],
-                "atomic_arb_cost": [i_atomic_arb_cost],
-                "non_atomic_arb_cost": [i_non_atomic_arb_cost],
-                "atomic_profit": [i_atomic_profit],
-                "non_atomic_profit": [i_non_atomic_profit],
-                "shared_sequencing_gain": [i_atomic_profit - i_non_atomic_profit],
-            }
-        )
-        arb_sim_df = pd.concat([arb_sim_df, iter_df], ignore_index=True)
-    return arb_sim_df
+    # Compute final profits for all iters
+    atomic_profits = atomic_bundle_profits - atomic_arb_costs
+    non_atomic_profits = non_atomic_bundle_profits - non_atomic_arb_costs
+    # store results in columns
+    arb_sim_columns = {
+        "iter": np.arange(iter_offset, iter_offset + n_iter),
+        "fail_outcome_A": fail_outcomes_A,
+        "fail_outcome_B": fail_outcomes_B,
+        "gas_price_A": gas_prices_A,
+        "gas_price_B": gas_prices_B,
+        "pure_bundle_profit_A": pure_bundle_profits_A,
+        "pure_bundle_profit_B": pure_bundle_profits_B,
+        "atomic_bundle_profit": atomic_bundle_profits,
+        "non_atomic_bundle_profit": non_atomic_bundle_profits,
+        "atomic_arb_cost": atomic_arb_costs,
+        "non_atomic_arb_cost": non_atomic_arb_costs,
+        "atomic_profit": atomic_profits,
+        "non_atomic_profit": non_atomic_profits,
+        "shared_sequencing_gain": atomic_profits - non_atomic_profits,
+    }
+    return arb_sim_columns
 
 
 if __name__ == "__main__":
@@ -117,5 +447,6 @@ if __name__ == "__main__":
     )
     # Run simulation
     n_iter = 10
-    arb_sim_df = run_arb_profit_simulation(n_iter, rollup_A, rollup_B, y_price_model)
-    arb_sim_df.to_csv("./data/test_arb_sim_df.csv", index=False)
+    run_arb_profit_simulation_to_file(
+        n_iter, rollup_A, rollup_B, y_price_model, "./data/test_arb_sim.parquet"
+    )
@@ -0,0 +1,156 @@
+import itertools
+import numpy as np
+from typing import Any, Callable, Dict, Tuple, Union
+from numpy.typing import NDArray
+
+# Adaptive sampling of the zero contour of a function over a box of params, e.g.
+# the break-even frontier of compute_expected_profit_diff_grid over (fail_rate_A,
+# fail_rate_B, external_price):
+#   evaluate = functools.partial(
+#       compute_expected_profit_diff_grid,
+#       arb_pool_reserve_x_A=..., arb_pool_reserve_y_A=...,
+#       arb_pool_reserve_x_B=..., arb_pool_reserve_y_B=..., arb_pool_fee=...,
+#   )
+#   frontier = refine_zero_contour(
+#       evaluate,
+#       {"fail_rate_A": (0, 1), "fail_rate_B": (0, 1), "external_price": (1.0, 1.01)},
+#       tol={"fail_rate_A": 0.001, "fail_rate_B": 0.001, "external_price": 1e-5},
+#   )
+# The evaluator gets one array per param (points as keywords) and returns one value
+# per point -> can be a closed form or a Monte Carlo estimate (use common random
+# numbers so that the noise does not move the sign between neighbour points)
+
+
+def refine_zero_contour(
+    evaluate: Callable[..., NDArray],
+    bounds: Dict[str, Tuple[float, float]],
+    tol: Union[float, Dict[str, float]] = 0.01,
+    n_init: int = 4,
+) -> Dict[str, Any]:
+    # Quadtree (octree in 3D, ...) refinement: the box is split in n_init cells per
+    # param, and only the cells whose corner values change sign are split in two
+    # along every param, until the cells are smaller than tol (param units).
+    # Corners are shared between cells -> each point is evaluated once, and all new
+    # points of a level go to the evaluator in one batched call.
+    # A zero contour that does not cross the edges of the initial cells (e.g. small
+    # closed contour inside one cell) is missed -> n_init sets that resolution
+    param_names = list(bounds.keys())
+    n_dims = len(param_names)
+    lows = np.array([bounds[param_name][0] for param_name in param_names], dtype=float)
+    highs = np.array([bounds[param_name][1] for param_name in param_names], dtype=float)
+    if np.any(highs <= lows):
+        raise Exception("Every param should have bounds (low, high) with low < high")
+    if not isinstance(tol, dict):
+        tol = {param_name: tol for param_name in param_names}
+    tols = np.array([tol[param_name] for param_name in param_names], dtype=float)
+    # Same number of halvings for all params -> cells stay boxes of the same shape
+    n_levels = int(max(0, np.ceil(np.log2((highs - lows) / (n_init * tols))).max()))
+    # Points live on the lattice of the finest level -> integer coords as cache keys
+    n_fine = n_init * 2**n_levels
+    lattice_shape = (n_fine + 1,) * n_dims
+    lattice_step = (highs - lows) / n_fine
+    corner_offsets = np.array(list(itertools.product([0, 1], repeat=n_dims)))
+    # Evaluated points -> sorted lattice keys and their values
+    cached_keys = np.empty(0, dtype=np.int64)
+    cached_values = np.empty(0)
+    cell_size = 2**n_levels
+    cells = cell_size * np.array(
+        list(itertools.product(range(n_init), repeat=n_dims)), dtype=np.int64
+    )
+    for level in range(n_levels + 1):
+        # (n_cells, 2^n_dims, n_dims) -> lattice coords of every corner of every cell
+        corners = cells[:, None, :] + cell_size * corner_offsets[None, :, :]
+        corner_keys = np.ravel_multi_index(
+            corners.reshape(-1, n_dims).T, lattice_shape
+        ).reshape(len(cells), len(corner_offsets))
+        # Sorted unique keys (a plain sort beats np.unique on these sizes)
+        level_keys = np.sort(corner_keys, axis=None)
+        level_keys = level_keys[np.r_[True, level_keys[1:] != level_keys[:-1]]]
+        new_keys = level_keys[~np.isin(level_keys, cached_keys, assume_unique=True)]
+        if len(new_keys) > 0:
+            new_points = lows + lattice_step * np.column_stack(
+                np.unravel_index(new_keys, lattice_shape)
+            )
+            new_values = np.broadcast_to(
+                evaluate(
+                    **{
+                        param_name: new_points[:, i]
+                        for i, param_name in enumerate(param_names)
+                    }
+                ),
+                len(new_keys),
+            )
+            # Both sorted -> merge in place of a full sort
+            insert_idx = np.searchsorted(cached_keys, new_keys)
+            cached_keys = np.insert(cached_keys, insert_idx, new_keys)
+            cached_values = np.insert(cached_values, insert_idx, new_values)
+        corner_values = cached_values[np.searchsorted(cached_keys, corner_keys)]
+        # Keep cells with a sign change (or a zero) on their corners
+        signs = np.sign(corner_values)
+        crossing = signs.min(axis=1) != signs.max(axis=1)
+        cells = cells[crossing]
+        corners = corners[crossing]
+        corner_keys = corner_keys[crossing]
+        corner_values = corner_values[crossing]
+        if len(cells) == 0:
+            break
+        if level < n_levels:
+            cell_size //= 2
+            cells = (
+                cells[:, None, :] + cell_size * corner_offsets[None, :, :]
+            ).reshape(-1, n_dims)
+    frontier_points = compute_edge_crossings(
+        corners, corner_keys, corner_values, corner_offsets, lows, lattice_step
+    )
+    return {
+        "param_names": param_names,
+        # Zero crossings on the edges of the finest cells (linear interpolation)
+        "frontier_points": frontier_points,
+        # Lower corners of the finest cells containing the contour, and their size
+        "frontier_cells": lows + lattice_step * cells,
+        "cell_size": lattice_step,
+        "points": lows
+        + lattice_step * np.column_stack(np.unravel_index(cached_keys, lattice_shape)),
+        "values": cached_values,
+        "n_evals": len(cached_values),
+        # Evaluations of the dense grid at the same resolution
+        "n_dense_evals": (n_fine + 1) ** n_dims,
+    }
+
+
+def compute_edge_crossings(
+    corners: NDArray,  # shape: (n_cells, 2^n_dims, n_dims), lattice coords
+    corner_keys: NDArray,  # shape: (n_cells, 2^n_dims)
+    corner_values: NDArray,  # shape: (n_cells, 2^n_dims)
+    corner_offsets: NDArray,  # shape: (2^n_dims, n_dims)
+    lows: NDArray,
+    lattice_step: NDArray,
+) -> NDArray:
+    # Edges join corners that only differ along one param -> the zero crossing of
+    # an edge with a strict sign change is interpolated linearly between its two
+    # corners
+    n_dims = corner_offsets.shape[1]
+    crossing_points = []
+    for dim in range(n_dims):
+        # Corners with offset 0 along dim, and their neighbour with offset 1
+        start_idx = np.flatnonzero(corner_offsets[:, dim] == 0)
+        end_idx = start_idx + 2 ** (n_dims - 1 - dim)
+        start_values = corner_values[:, start_idx].ravel()
+        end_values = corner_values[:, end_idx].ravel()
+        crossing = np.sign(start_values) * np.sign(end_values) < 0
+        # Edges are shared between neighbour cells -> keep one per start corner
+        _, edge_idx = np.unique(
+            corner_keys[:, start_idx].ravel()[crossing], return_index=True
+        )
+        edge_idx = np.flatnonzero(crossing)[edge_idx]
+        start_corners = corners[:, start_idx].reshape(-1, n_dims)[edge_idx]
+        end_corners = corners[:, end_idx].reshape(-1, n_dims)[edge_idx]
+        t = start_values[edge_idx] / (start_values[edge_idx] - end_values[edge_idx])
+        crossing_points.append(
+            start_corners + t[:, None] * (end_corners - start_corners)
+        )
+    # Zeros on the corners themselves
+    _, zero_idx = np.unique(corner_keys[corner_values == 0], return_index=True)
+    crossing_points.append(corners[corner_values == 0][zero_idx])
+    crossing_points = np.concatenate(crossing_points)
+    return lows + lattice_step * crossing_points
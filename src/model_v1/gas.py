@@ -1,11 +1,12 @@
 import numpy as np
-from scipy.stats import norm
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 from numpy.typing import NDArray
-from sklearn.neighbors import KernelDensity
+from . import sampling
 
 
-class GasPriceModel:
+class GasPriceModel(sampling.SamplingTableMixin):
+    histogram_attr = "gas_price_histogram"
+
     def __init__(
         self,
         model_type: str = "constant",
@@ -14,6 +15,7 @@ class GasPriceModel:
         gas_price_histogram: List[Tuple[float, float]] = [
             (1, 1)
         ],  # used for empirical model; shape: (val, count)
+        sampling_table_path: Optional[str] = None,  # empirical model, saved table
     ) -> None:
         if model_type not in ["gaussian", "empirical", "constant"]:
             raise AttributeError(
@@ -23,23 +25,73 @@ class GasPriceModel:
         self.gas_price_mean = gas_price_mean
         self.gas_price_std = gas_price_std
         self.gas_price_histogram = gas_price_histogram
+        self.init_sampler(model_type, gas_price_histogram, sampling_table_path)
+
+    @classmethod
+    def from_chain(cls, chain: str, data_dir: Optional[str] = None) -> "GasPriceModel":
+        # Empirical model from the Dune gas price histogram of the chain (in gwei)
+        from . import ingest
+
+        return cls(
+            model_type="empirical",
+            gas_price_histogram=ingest.get_gas_price_histogram(chain, data_dir),
+        )
 
     def get_model_type(self) -> str:
         return self.model_type
 
-    def generate_gas_prices(self, n_samples: int) -> NDArray:
+    def generate_gas_prices(
+        self, n_samples: int, rng: Optional[np.random.Generator] = None
+    ) -> NDArray:
+        if rng is None:
+            rng = np.random.default_rng()
         if self.model_type == "gaussian":
-            gas_prices = norm.rvs(
+            gas_prices = rng.normal(
                 loc=self.gas_price_mean, scale=self.gas_price_std, size=n_samples
             )
         elif self.model_type == "constant":
             gas_prices = np.ones(n_samples) * self.gas_price_mean
         elif self.model_type == "empirical":
-            vals = np.array([t[0] for t in self.gas_price_histogram]).reshape(-1, 1)
-            counts = np.array([t[1] for t in self.gas_price_histogram])
-            bandwidth = np.diff(vals).mean()
-            kde_model = KernelDensity(kernel="gaussian", bandwidth=bandwidth).fit(
-                vals, sample_weight=counts
+            gas_prices = sampling.sample_from_alias_table(
+                self.hist_vals,
+                self.alias_prob,
+                self.alias_vals,
+                self.bandwidth,
+                rng.random(n_samples),
+                rng.standard_normal(n_samples),
+            )
+        return gas_prices
+
+    def gas_prices_from_uniforms(self, u: NDArray, v: NDArray) -> NDArray:
+        # Inverse-CDF transform of uniforms -> u picks the quantile (or histogram
+        # bucket) and v the gaussian jitter of the empirical model
+        from scipy.special import ndtri
+
+        if self.model_type == "gaussian":
+            gas_prices = self.gas_price_mean + self.gas_price_std * ndtri(u)
+        elif self.model_type == "constant":
+            gas_prices = np.ones(len(u)) * self.gas_price_mean
+        elif self.model_type == "empirical":
+            gas_prices = sampling.sample_from_table(
+                self.hist_vals, self.hist_cdf, self.bandwidth, u, ndtri(v)
             )
-            gas_prices = kde_model.sample(n_samples).reshape(-1)
         return gas_prices
+
+    def get_gas_price_quadrature(self, n_nodes: int = 10) -> Tuple[NDArray, NDArray]:
+        # Nodes and weights such that E[f(price)] ~= sum(weights * f(nodes)); exact for
+        # polynomials of degree < 2 * n_nodes (Gauss-Hermite)
+        hermite_nodes, hermite_weights = sampling.get_hermite_quadrature(n_nodes)
+        if self.model_type == "gaussian":
+            nodes = self.gas_price_mean + self.gas_price_std * hermite_nodes
+            weights = hermite_weights
+        elif self.model_type == "constant":
+            nodes = np.array([self.gas_price_mean])
+            weights = np.array([1.0])
+        elif self.model_type == "empirical":
+            # -> mixture of gaussians centered on the histogram buckets
+            bucket_probs = np.diff(self.hist_cdf, prepend=0.0)
+            nodes = (
+                self.hist_vals[:, None] + self.bandwidth * hermite_nodes[None, :]
+            ).reshape(-1)
+            weights = (bucket_probs[:, None] * hermite_weights[None, :]).reshape(-1)
+        return nodes, weights
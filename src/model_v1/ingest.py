@@ -0,0 +1,224 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+# Dune exports (saved as CSVs next to their queries in data/) -> columns kept
+DUNE_EXPORTS = {
+    "gas_fee_dist": {
+        "file_name": "dune_gas_fee_dist.csv",
+        "columns": [
+            "blockchain",
+            "bucket",
+            "bucket_lower_bound",
+            "bucket_upper_bound",
+            "bucket_cnt",
+        ],
+    },
+    "success_swap_traces": {
+        "file_name": "dune_success_swap_traces.csv",
+        "columns": [
+            "blockchain",
+            "block_time",
+            "tx_hash",
+            "gas_units_used_tx",
+            "trace_address",
+            "gas_trace",
+            "gas_units_used_trace",
+        ],
+    },
+    "fail_swap_traces": {
+        "file_name": "dune_fail_swap_traces.csv",
+        "columns": [
+            "blockchain",
+            "block_time",
+            "tx_hash",
+            "gas_units_used_tx",
+            "trace_address",
+            "gas_trace",
+            "gas_units_used_trace",
+            "error",
+        ],
+    },
+    "success_swaps": {
+        "file_name": "dune_success_swaps.csv",
+        "columns": [
+            "blockchain",
+            "block_time",
+            "project",
+            "version",
+            "token_pair",
+            "tx_hash",
+            "evt_index",
+            "gas_used",
+            "effective_gas_price",
+        ],
+    },
+}
+
+DEFAULT_DATA_DIR = os.path.realpath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data")
+)
+STORE_DIR_NAME = "store"
+MANIFEST_FILE_NAME = "manifest.json"
+
+# Tables already loaded in this process -> key: (store_dir, export, chain, sha256)
+_table_cache: Dict[Tuple[str, str, str, str], pd.DataFrame] = {}
+
+
+def compute_file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_store_dir(data_dir: Optional[str] = None) -> str:
+    if data_dir is None:
+        data_dir = DEFAULT_DATA_DIR
+    return os.path.join(data_dir, STORE_DIR_NAME)
+
+
+def read_manifest(store_dir: str) -> Dict[str, Dict]:
+    manifest_path = os.path.join(store_dir, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def write_manifest(store_dir: str, manifest: Dict[str, Dict]) -> None:
+    # Write then rename -> a crash never leaves a half-written manifest
+    manifest_path = os.path.join(store_dir, MANIFEST_FILE_NAME)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def get_chain_table_path(store_dir: str, export: str, chain: str) -> str:
+    return os.path.join(store_dir, export, f"{chain}.parquet")
+
+
+def ingest_dune_export(
+    export: str, data_dir: Optional[str] = None, force: bool = False
+) -> Dict:
+    # Converts one CSV export into one parquet file per chain. The stored sha256 of
+    # the CSV invalidates the store; size and mtime are checked first, so an
+    # unchanged file is not re-hashed
+    if export not in DUNE_EXPORTS:
+        raise AttributeError(f"export should be one of {list(DUNE_EXPORTS.keys())}")
+    if data_dir is None:
+        data_dir = DEFAULT_DATA_DIR
+    store_dir = get_store_dir(data_dir)
+    csv_path = os.path.join(data_dir, DUNE_EXPORTS[export]["file_name"])
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(
+            f"{csv_path} not found -> export the results of "
+            + DUNE_EXPORTS[export]["file_name"].replace(".csv", ".sql")
+            + " from Dune first"
+        )
+    manifest = read_manifest(store_dir)
+    entry = manifest.get(export)
+    csv_stat = os.stat(csv_path)
+    if not force and entry is not None:
+        if (
+            entry["size"] == csv_stat.st_size
+            and entry["mtime_ns"] == csv_stat.st_mtime_ns
+        ):
+            return entry
+        csv_hash = compute_file_hash(csv_path)
+        if entry["sha256"] == csv_hash:
+            # -> file touched but not changed
+            entry["size"] = csv_stat.st_size
+            entry["mtime_ns"] = csv_stat.st_mtime_ns
+            write_manifest(store_dir, manifest)
+            return entry
+    else:
+        csv_hash = compute_file_hash(csv_path)
+    # (Re)build the chain tables
+    export_df = pd.read_csv(
+        csv_path, usecols=DUNE_EXPORTS[export]["columns"], low_memory=False
+    )
+    os.makedirs(os.path.join(store_dir, export), exist_ok=True)
+    chains = []
+    for chain, chain_df in export_df.groupby("blockchain"):
+        chain_df.drop(columns="blockchain").reset_index(drop=True).to_parquet(
+            get_chain_table_path(store_dir, export, chain), index=False
+        )
+        chains.append(chain)
+    entry = {
+        "source": csv_path,
+        "sha256": csv_hash,
+        "size": csv_stat.st_size,
+        "mtime_ns": csv_stat.st_mtime_ns,
+        "chains": chains,
+        "n_rows": len(export_df),
+    }
+    manifest = read_manifest(store_dir)
+    manifest[export] = entry
+    write_manifest(store_dir, manifest)
+    return entry
+
+
+def ingest_dune_exports(
+    data_dir: Optional[str] = None, force: bool = False
+) -> Dict[str, Dict]:
+    # Ingests every export whose CSV is available
+    if data_dir is None:
+        data_dir = DEFAULT_DATA_DIR
+    entries = {}
+    for export, export_spec in DUNE_EXPORTS.items():
+        if os.path.exists(os.path.join(data_dir, export_spec["file_name"])):
+            entries[export] = ingest_dune_export(export, data_dir, force=force)
+    return entries
+
+
+def load_chain_table(
+    export: str, chain: str, data_dir: Optional[str] = None
+) -> pd.DataFrame:
+    entry = ingest_dune_export(export, data_dir)
+    if chain not in entry["chains"]:
+        raise KeyError(f"No {export} data for chain {chain} -> {entry['chains']}")
+    store_dir = get_store_dir(data_dir)
+    cache_key = (store_dir, export, chain, entry["sha256"])
+    if cache_key not in _table_cache:
+        _table_cache[cache_key] = pd.read_parquet(
+            get_chain_table_path(store_dir, export, chain)
+        )
+    return _table_cache[cache_key]
+
+
+def get_gas_price_histogram(
+    chain: str, data_dir: Optional[str] = None
+) -> List[Tuple[float, float]]:
+    # (val, count) buckets for GasPriceModel(model_type="empirical"), in gwei
+    gas_dist_df = load_chain_table("gas_fee_dist", chain, data_dir).sort_values(
+        "bucket"
+    )
+    return list(
+        zip(
+            gas_dist_df["bucket_lower_bound"].astype(float),
+            gas_dist_df["bucket_cnt"].astype(float),
+        )
+    )
+
+
+def estimate_rollup_params(
+    chain: str, data_dir: Optional[str] = None
+) -> Dict[str, float]:
+    # fail_rate, gas_units_swap and gas_units_fail of RollupSpec from swap traces
+    success_traces_df = load_chain_table("success_swap_traces", chain, data_dir)
+    fail_traces_df = load_chain_table("fail_swap_traces", chain, data_dir)
+    # The 10% sample of dune_success_swap_traces.sql is LEFT JOINed -> every success
+    # trace is exported (only gas_units_used_tx is null outside the sample), so the
+    # counts are not rescaled
+    n_success = len(success_traces_df)
+    n_fail = len(fail_traces_df)
+    return {
+        "fail_rate": n_fail / (n_fail + n_success),
+        "gas_units_swap": float(np.median(success_traces_df["gas_units_used_trace"])),
+        "gas_units_fail": float(np.median(fail_traces_df["gas_units_used_trace"])),
+    }
@@ -0,0 +1,218 @@
+import numpy as np
+from typing import Tuple, Union
+from numpy.typing import NDArray
+
+# Broadcasting kernels of the CPMM arbitrage formulae -> arrays of reserves / fees
+# (e.g. millions of pool states) are evaluated in one call. Compiled to numpy
+# gufuncs with numba when it is installed (optional), else the same formulae run
+# as numpy array expressions. Both give the same numerics as the scalar versions:
+# same operations in the same order, and fastmath is off (no reassociation / FMA)
+try:
+    import numba
+except ImportError:
+    numba = None
+
+KERNEL_BACKEND = "numpy" if numba is None else "numba"
+
+ArrayLike = Union[float, NDArray]
+
+
+# Formulae -> written once, run on python floats (numba) or numpy arrays (fallback)
+def arb_trade_sizes_formula(x_A, y_A, x_B, y_B, fee):
+    # Check paper for full derivation! (swap.compute_arb_trade_sizes)
+    delta_y_B = ((1 - fee) * np.sqrt(x_A * y_A * x_B * y_B) - x_A * y_B) / (
+        (1 - fee) * x_A + ((1 - fee) ** 2) * x_B
+    )
+    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
+    delta_x_A = delta_x_B
+    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
+    return delta_x_A, delta_y_A, delta_x_B, delta_y_B
+
+
+def prices_after_trades_formula(
+    x_A, y_A, x_B, y_B, fee, delta_x_A, delta_y_A, delta_x_B, delta_y_B
+):
+    # swap.compute_prices_after_arb
+    price_end_B = (y_B + (1 - fee) * delta_y_B) / (x_B - delta_x_B)
+    price_end_A = (y_A - delta_y_A) / (x_A + (1 - fee) * delta_x_A)
+    return price_end_A, price_end_B
+
+
+def arb_opportunity_threshold_formula(x_A, y_A, x_B, y_B, fee):
+    # swap.compute_arb_opportunity_threshold -> arbitrage iff threshold > 1
+    thres_num = x_B * y_A * (1 - fee) * (1 - fee)
+    thres_denum = np.sqrt(x_A * y_A * x_B * y_B)
+    return thres_num / thres_denum
+
+
+def stable_fee_arb_trade_sizes_formula(x_A, y_A, x_B, y_B, fee, fee_stable):
+    # bundle_full_stable_derivation.compute_arb_trade_sizes
+    delta_y_B_num = -x_A * y_B * (1 + fee_stable) + (1 - fee) * (
+        1 - fee_stable
+    ) * np.sqrt(x_A * y_A * x_B * y_B)
+    delta_y_B_denum = x_A * (1 + fee_stable) * (1 - fee) + x_B * (1 - fee) * (
+        1 - fee
+    ) * (1 - fee_stable)
+    delta_y_B = delta_y_B_num / delta_y_B_denum
+    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
+    delta_x_A = delta_x_B * ((1 - fee_stable) / (1 + fee_stable))
+    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
+    return delta_x_A, delta_y_A, delta_x_B, delta_y_B
+
+
+def arb_trade_sizes_v1_formula(x_A, y_A, x_B, y_B, fee):
+    # bundle_full_stable_derivation.compute_arb_trade_sizes_v1
+    delta_y_B = (np.sqrt(x_A * y_A * x_B * y_B) - x_A * y_B) / (
+        (1 - fee) * x_A + ((1 - fee) ** 2) * x_B
+    )
+    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
+    delta_x_A = delta_x_B
+    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
+    return delta_x_A, delta_y_A, delta_x_B, delta_y_B
+
+
+def arb_trade_sizes_v2_formula(x_A, y_A, x_B, y_B, fee):
+    # bundle_full_stable_derivation.compute_arb_trade_sizes_v2
+    price_A = y_A / x_A
+    price_B = y_B / x_B
+    delta_y_B = (np.sqrt(x_A * y_A * x_B * y_B) * (price_A / price_B) - x_A * y_B) / (
+        (1 - fee) * x_A + ((1 - fee) ** 2) * x_B
+    )
+    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
+    delta_x_A = delta_x_B * (price_B / price_A)
+    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
+    return delta_x_A, delta_y_A, delta_x_B, delta_y_B
+
+
+if numba is not None:
+    # Element-wise gufuncs (core dims "()") -> numpy does the broadcasting and the
+    # output allocation, numba compiles the loop. cache=True keeps the machine code
+    # in __pycache__ so later imports skip the compilation
+    _arb_trade_sizes_scalar = numba.njit(cache=True)(arb_trade_sizes_formula)
+    _prices_after_trades_scalar = numba.njit(cache=True)(prices_after_trades_formula)
+    _arb_opportunity_threshold_scalar = numba.njit(cache=True)(
+        arb_opportunity_threshold_formula
+    )
+    _stable_fee_arb_trade_sizes_scalar = numba.njit(cache=True)(
+        stable_fee_arb_trade_sizes_formula
+    )
+    _arb_trade_sizes_v1_scalar = numba.njit(cache=True)(arb_trade_sizes_v1_formula)
+    _arb_trade_sizes_v2_scalar = numba.njit(cache=True)(arb_trade_sizes_v2_formula)
+
+    @numba.guvectorize(
+        ["void(f8, f8, f8, f8, f8, f8[:], f8[:], f8[:], f8[:])"],
+        "(),(),(),(),()->(),(),(),()",
+        cache=True,
+    )
+    def _arb_trade_sizes_gufunc(
+        x_A, y_A, x_B, y_B, fee, delta_x_A, delta_y_A, delta_x_B, delta_y_B
+    ):
+        delta_x_A[0], delta_y_A[0], delta_x_B[0], delta_y_B[0] = (
+            _arb_trade_sizes_scalar(x_A, y_A, x_B, y_B, fee)
+        )
+
+    @numba.guvectorize(
+        ["void(f8, f8, f8, f8, f8, f8[:], f8[:])"],
+        "(),(),(),(),()->(),()",
+        cache=True,
+    )
+    def _prices_after_arb_gufunc(x_A, y_A, x_B, y_B, fee, price_end_A, price_end_B):
+        price_end_A[0], price_end_B[0] = _prices_after_trades_scalar(
+            x_A, y_A, x_B, y_B, fee, *_arb_trade_sizes_scalar(x_A, y_A, x_B, y_B, fee)
+        )
+
+    @numba.vectorize(["f8(f8, f8, f8, f8, f8)"], cache=True)
+    def _arb_opportunity_threshold_ufunc(x_A, y_A, x_B, y_B, fee):
+        return _arb_opportunity_threshold_scalar(x_A, y_A, x_B, y_B, fee)
+
+    @numba.guvectorize(
+        ["void(f8, f8, f8, f8, f8, f8, f8[:], f8[:], f8[:], f8[:])"],
+        "(),(),(),(),(),()->(),(),(),()",
+        cache=True,
+    )
+    def _stable_fee_arb_trade_sizes_gufunc(
+        x_A, y_A, x_B, y_B, fee, fee_stable, delta_x_A, delta_y_A, delta_x_B, delta_y_B
+    ):
+        delta_x_A[0], delta_y_A[0], delta_x_B[0], delta_y_B[0] = (
+            _stable_fee_arb_trade_sizes_scalar(x_A, y_A, x_B, y_B, fee, fee_stable)
+        )
+
+    @numba.guvectorize(
+        ["void(f8, f8, f8, f8, f8, f8[:], f8[:], f8[:], f8[:])"],
+        "(),(),(),(),()->(),(),(),()",
+        cache=True,
+    )
+    def _arb_trade_sizes_v1_gufunc(
+        x_A, y_A, x_B, y_B, fee, delta_x_A, delta_y_A, delta_x_B, delta_y_B
+    ):
+        delta_x_A[0], delta_y_A[0], delta_x_B[0], delta_y_B[0] = (
+            _arb_trade_sizes_v1_scalar(x_A, y_A, x_B, y_B, fee)
+        )
+
+    @numba.guvectorize(
+        ["void(f8, f8, f8, f8, f8, f8[:], f8[:], f8[:], f8[:])"],
+        "(),(),(),(),()->(),(),(),()",
+        cache=True,
+    )
+    def _arb_trade_sizes_v2_gufunc(
+        x_A, y_A, x_B, y_B, fee, delta_x_A, delta_y_A, delta_x_B, delta_y_B
+    ):
+        delta_x_A[0], delta_y_A[0], delta_x_B[0], delta_y_B[0] = (
+            _arb_trade_sizes_v2_scalar(x_A, y_A, x_B, y_B, fee)
+        )
+
+
+def compute_arb_trade_sizes(
+    x_A: ArrayLike, y_A: ArrayLike, x_B: ArrayLike, y_B: ArrayLike, fee: ArrayLike
+) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+    if numba is None:
+        return arb_trade_sizes_formula(x_A, y_A, x_B, y_B, fee)
+    return _arb_trade_sizes_gufunc(x_A, y_A, x_B, y_B, fee)
+
+
+def compute_prices_after_arb(
+    x_A: ArrayLike, y_A: ArrayLike, x_B: ArrayLike, y_B: ArrayLike, fee: ArrayLike
+) -> Tuple[NDArray, NDArray]:
+    # Prices after the optimal arbitrage trade
+    if numba is None:
+        return prices_after_trades_formula(
+            x_A, y_A, x_B, y_B, fee, *arb_trade_sizes_formula(x_A, y_A, x_B, y_B, fee)
+        )
+    return _prices_after_arb_gufunc(x_A, y_A, x_B, y_B, fee)
+
+
+def compute_arb_opportunity_threshold(
+    x_A: ArrayLike, y_A: ArrayLike, x_B: ArrayLike, y_B: ArrayLike, fee: ArrayLike
+) -> NDArray:
+    if numba is None:
+        return arb_opportunity_threshold_formula(x_A, y_A, x_B, y_B, fee)
+    return _arb_opportunity_threshold_ufunc(x_A, y_A, x_B, y_B, fee)
+
+
+def compute_stable_fee_arb_trade_sizes(
+    x_A: ArrayLike,
+    y_A: ArrayLike,
+    x_B: ArrayLike,
+    y_B: ArrayLike,
+    fee: ArrayLike,
+    fee_stable: ArrayLike,
+) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+    if numba is None:
+        return stable_fee_arb_trade_sizes_formula(x_A, y_A, x_B, y_B, fee, fee_stable)
+    return _stable_fee_arb_trade_sizes_gufunc(x_A, y_A, x_B, y_B, fee, fee_stable)
+
+
+def compute_arb_trade_sizes_v1(
+    x_A: ArrayLike, y_A: ArrayLike, x_B: ArrayLike, y_B: ArrayLike, fee: ArrayLike
+) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+    if numba is None:
+        return arb_trade_sizes_v1_formula(x_A, y_A, x_B, y_B, fee)
+    return _arb_trade_sizes_v1_gufunc(x_A, y_A, x_B, y_B, fee)
+
+
+def compute_arb_trade_sizes_v2(
+    x_A: ArrayLike, y_A: ArrayLike, x_B: ArrayLike, y_B: ArrayLike, fee: ArrayLike
+) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+    if numba is None:
+        return arb_trade_sizes_v2_formula(x_A, y_A, x_B, y_B, fee)
+    return _arb_trade_sizes_v2_gufunc(x_A, y_A, x_B, y_B, fee)
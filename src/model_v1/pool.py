@@ -0,0 +1,89 @@
+import numpy as np
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Dict, NamedTuple
+
+if TYPE_CHECKING:
+    from .rollup import RollupSpec
+
+# Pool math cache shared by both models (the v0 swap.py imports it too): the trade
+# sizes, post-arb prices and opportunity threshold only depend on the arb pools ->
+# memoized per (pool function, pool state, extra args), e.g.
+#   compute_for_pool_state(kernels.compute_arb_trade_sizes_v1, pool_state)
+# Max number of distinct entries kept in each pool math cache
+POOL_CACHE_SIZE = 1024
+
+
+class PoolState(NamedTuple):
+    # Immutable (and hashable) snapshot of the arb pools on both rollups -> the pool
+    # math only depends on this, not on fail rates, gas or asset prices
+    arb_pool_reserve_x_A: float
+    arb_pool_reserve_y_A: float
+    arb_pool_reserve_x_B: float
+    arb_pool_reserve_y_B: float
+    arb_pool_fee_A: float
+    arb_pool_fee_B: float
+
+    @classmethod
+    def from_rollups(
+        cls, rollup_A: "RollupSpec", rollup_B: "RollupSpec"
+    ) -> "PoolState":
+        # -> any rollup spec with get_arb_pool_reserves / get_arb_pool_fee (v0 or v1)
+        x_A, y_A = rollup_A.get_arb_pool_reserves()
+        x_B, y_B = rollup_B.get_arb_pool_reserves()
+        return cls(
+            float(x_A),
+            float(y_A),
+            float(x_B),
+            float(y_B),
+            float(rollup_A.get_arb_pool_fee()),
+            float(rollup_B.get_arb_pool_fee()),
+        )
+
+
+def check_rollup_specs(rollup_A: "RollupSpec", rollup_B: "RollupSpec") -> None:
+    check_pool_state(PoolState.from_rollups(rollup_A, rollup_B))
+
+
+@lru_cache(maxsize=POOL_CACHE_SIZE)
+def check_pool_state(pool_state: PoolState) -> None:
+    price_A = pool_state.arb_pool_reserve_y_A / pool_state.arb_pool_reserve_x_A
+    price_B = pool_state.arb_pool_reserve_y_B / pool_state.arb_pool_reserve_x_B
+    if price_A <= price_B:
+        raise Exception(
+            "The pool on rollup A must have a higher price than the pool on rollup B"
+        )
+    if pool_state.arb_pool_fee_A != pool_state.arb_pool_fee_B:
+        raise Exception(
+            "The pools on both rollups must have the same fee. The bundle profit formulae makes this assumption!"
+        )
+
+
+@lru_cache(maxsize=POOL_CACHE_SIZE)
+def compute_for_pool_state(
+    pool_func: Callable[..., Any], pool_state: PoolState, *args: Any
+) -> Any:
+    # pool_func(x_A, y_A, x_B, y_B, fee, *args), e.g. a kernel. Raise exceptions if
+    # some specs are not correct
+    check_pool_state(pool_state)
+    x_A, y_A, x_B, y_B, fee, _ = pool_state  # fee should be the same in both rollups!
+    return pool_func(x_A, y_A, x_B, y_B, fee, *args)
+
+
+def get_pool_cache_info() -> Dict[str, Dict[str, float]]:
+    # Hits, misses and hit rate of each pool math cache
+    pool_cache_info = {}
+    for cached_func in [check_pool_state, compute_for_pool_state]:
+        cache_info = cached_func.cache_info()
+        n_calls = cache_info.hits + cache_info.misses
+        pool_cache_info[cached_func.__name__] = {
+            "hits": cache_info.hits,
+            "misses": cache_info.misses,
+            "size": cache_info.currsize,
+            "hit_rate": cache_info.hits / n_calls if n_calls > 0 else np.nan,
+        }
+    return pool_cache_info
+
+
+def clear_pool_cache() -> None:
+    check_pool_state.cache_clear()
+    compute_for_pool_state.cache_clear()
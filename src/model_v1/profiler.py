@@ -0,0 +1,156 @@
+import time
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Stages of the Monte Carlo loop, in the order they run
+PROFILE_STAGES = [
+    "spec_build",
+    "uniform_sampling",
+    "fail_sampling",
+    "gas_sampling",
+    "y_price_sampling",
+    "bundle_profit",
+    "arb_cost",
+    "records_assembly",
+    "frame_assembly",
+    "summary_update",
+    "sink_write",
+]
+
+
+class StageTimer:
+    # Context manager timing one call of a stage -> added to the profiler on exit
+    __slots__ = ("profiler", "stage", "model_type", "n_items", "start")
+
+    def __init__(
+        self, profiler: "StageProfiler", stage: str, model_type: str, n_items: int
+    ) -> None:
+        self.profiler = profiler
+        self.stage = stage
+        self.model_type = model_type
+        self.n_items = n_items
+
+    def __enter__(self) -> "StageTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.profiler.add(
+            self.stage,
+            self.model_type,
+            time.perf_counter() - self.start,
+            n_items=self.n_items,
+        )
+
+
+class StageProfiler:
+    # Cumulative time, call count and item count (iterations) per (stage, model type).
+    # Stages wrap whole batches, not single iterations -> overhead is per batch
+    enabled = True
+
+    def __init__(self) -> None:
+        self.stats: Dict[Tuple[str, str], List[float]] = {}
+
+    def stage(self, stage: str, model_type: str = "", n_items: int = 0) -> StageTimer:
+        return StageTimer(self, stage, model_type, n_items)
+
+    def add(
+        self,
+        stage: str,
+        model_type: str,
+        total_time: float,
+        n_calls: int = 1,
+        n_items: int = 0,
+    ) -> None:
+        stats = self.stats.setdefault((stage, model_type), [0.0, 0, 0])
+        stats[0] += total_time
+        stats[1] += n_calls
+        stats[2] += n_items
+
+    def merge(self, report: Dict[str, Any]) -> None:
+        # Adds a report of another profiler (e.g. from a sweep worker)
+        for row in report["stages"]:
+            self.add(
+                row["stage"],
+                row["model_type"],
+                row["total_time"],
+                n_calls=row["n_calls"],
+                n_items=row["n_items"],
+            )
+
+    def get_report(self) -> Dict[str, Any]:
+        # Plain dicts and lists -> picklable, JSON serialisable and fits df.attrs
+        stage_order = {stage: i for i, stage in enumerate(PROFILE_STAGES)}
+        rows = []
+        for (stage, model_type), (total_time, n_calls, n_items) in sorted(
+            self.stats.items(),
+            key=lambda item: (stage_order.get(item[0][0], len(stage_order)), item[0]),
+        ):
+            rows.append(
+                {
+                    "stage": stage,
+                    "model_type": model_type,
+                    "n_calls": n_calls,
+                    "n_items": n_items,
+                    "total_time": total_time,
+                    "time_per_item": total_time / n_items if n_items > 0 else np.nan,
+                }
+            )
+        return {
+            "stages": rows,
+            "total_time": sum(row["total_time"] for row in rows),
+        }
+
+
+class NullStageTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "NullStageTimer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        return None
+
+
+class NullProfiler:
+    # Profiling off -> every stage is the same do-nothing context manager
+    enabled = False
+
+    def stage(
+        self, stage: str, model_type: str = "", n_items: int = 0
+    ) -> NullStageTimer:
+        return NULL_STAGE_TIMER
+
+    def add(self, *args, **kwargs) -> None:
+        return None
+
+    def merge(self, report: Dict[str, Any]) -> None:
+        return None
+
+    def get_report(self) -> Optional[Dict[str, Any]]:
+        return None
+
+
+NULL_STAGE_TIMER = NullStageTimer()
+NULL_PROFILER = NullProfiler()
+
+
+def get_profiler(
+    profile: Union[bool, StageProfiler, NullProfiler, None],
+) -> Union[StageProfiler, NullProfiler]:
+    # profile=True -> new profiler, profile=<StageProfiler> -> keep accumulating in it
+    # (e.g. across the calls of a sweep), False / None -> profiling off
+    if isinstance(profile, (StageProfiler, NullProfiler)):
+        return profile
+    if profile:
+        return StageProfiler()
+    return NULL_PROFILER
+
+
+def profile_report_to_frame(report: Dict[str, Any]):
+    import pandas as pd
+
+    profile_df = pd.DataFrame(report["stages"])
+    if len(profile_df) > 0:
+        profile_df["time_share"] = profile_df["total_time"] / report["total_time"]
+    return profile_df
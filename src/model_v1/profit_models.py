@@ -0,0 +1,175 @@
+import time
+import numpy as np
+from . import kernels
+from . import bundle
+from . import bundle_full_stable_derivation
+from .rollup import RollupSpec
+from .asset import AssetPriceModel
+from .pool import PoolState, compute_for_pool_state
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+from numpy.typing import NDArray
+
+# Profit model used when none is given -> bundle.compute_pure_bundle_profits
+DEFAULT_PROFIT_MODEL = "v1"
+
+
+class ProfitModel(NamedTuple):
+    # compute_arb_trade_sizes(x_A, y_A, x_B, y_B, fee, fee_stable) and
+    # compute_pure_bundle_profits_from_trades (same signature as
+    # bundle.compute_pure_bundle_profits_from_trades) must both broadcast over arrays
+    name: str
+    compute_arb_trade_sizes: Callable[..., Tuple[NDArray, NDArray, NDArray, NDArray]]
+    compute_pure_bundle_profits_from_trades: Callable[..., Tuple[NDArray, NDArray]]
+
+
+PROFIT_MODELS: Dict[str, ProfitModel] = {}
+
+
+def register_profit_model(
+    name: str,
+    compute_arb_trade_sizes: Callable[..., Tuple[NDArray, NDArray, NDArray, NDArray]],
+    compute_pure_bundle_profits_from_trades: Callable[..., Tuple[NDArray, NDArray]],
+) -> ProfitModel:
+    if name in PROFIT_MODELS:
+        raise AttributeError(f"Profit model {name} is already registered")
+    PROFIT_MODELS[name] = ProfitModel(
+        name, compute_arb_trade_sizes, compute_pure_bundle_profits_from_trades
+    )
+    return PROFIT_MODELS[name]
+
+
+def get_profit_model(name: str) -> ProfitModel:
+    if name not in PROFIT_MODELS:
+        raise AttributeError(f"profit_model should be one of {list(PROFIT_MODELS)}")
+    return PROFIT_MODELS[name]
+
+
+def get_profit_model_names() -> List[str]:
+    return list(PROFIT_MODELS)
+
+
+def compute_arb_trade_sizes_v1(x_A, y_A, x_B, y_B, fee, fee_stable):
+    return kernels.compute_arb_trade_sizes_v1(x_A, y_A, x_B, y_B, fee)
+
+
+def compute_arb_trade_sizes_v2(x_A, y_A, x_B, y_B, fee, fee_stable):
+    return kernels.compute_arb_trade_sizes_v2(x_A, y_A, x_B, y_B, fee)
+
+
+# v1: trade sizes ignore the stable fee, each leg is valued at its pool price
+register_profit_model(
+    "v1",
+    compute_arb_trade_sizes_v1,
+    bundle.compute_pure_bundle_profits_from_trades,
+)
+# v2: trade sizes rescaled by the pool price ratio, v1 profit formula
+register_profit_model(
+    "v2",
+    compute_arb_trade_sizes_v2,
+    bundle.compute_pure_bundle_profits_from_trades,
+)
+# stable_fee: trade sizes and profits account for the stable fee on both sides
+register_profit_model(
+    "stable_fee",
+    kernels.compute_stable_fee_arb_trade_sizes,
+    bundle_full_stable_derivation.compute_pure_bundle_profits_from_trades,
+)
+
+
+def compute_arb_trade_sizes_for_pool_state(
+    profit_model_name: str, pool_state: PoolState, fee_stable: float
+) -> Tuple[float, float, float, float]:
+    # Cached per pool state in the pool math cache (raises exceptions if some specs
+    # are not correct)
+    return compute_for_pool_state(
+        get_profit_model(profit_model_name).compute_arb_trade_sizes,
+        pool_state,
+        fee_stable,
+    )
+
+
+def compute_pure_bundle_profits(
+    profit_model_name: str,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    failure_outcome_A: Union[int, NDArray],
+    failure_outcome_B: Union[int, NDArray],
+    y_price_model: AssetPriceModel,
+    y_price: Union[float, NDArray],
+) -> Tuple[Union[float, NDArray], Union[float, NDArray]]:
+    # Same as bundle.compute_pure_bundle_profits, for any registered profit model
+    profit_model = get_profit_model(profit_model_name)
+    fee_stable = y_price_model.get_trading_fee()  # same for both X and Y tokens
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = compute_arb_trade_sizes_for_pool_state(
+        profit_model_name, PoolState.from_rollups(rollup_A, rollup_B), fee_stable
+    )
+    return profit_model.compute_pure_bundle_profits_from_trades(
+        delta_x_A,
+        delta_y_A,
+        delta_x_B,
+        delta_y_B,
+        rollup_A.get_arb_pool_price_in_y_units(),
+        rollup_B.get_arb_pool_price_in_y_units(),
+        failure_outcome_A,
+        failure_outcome_B,
+        fee_stable,
+        y_price,
+    )
+
+
+def compare_profit_models(
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    profit_model_names: Optional[List[str]] = None,
+    rng: Optional[np.random.Generator] = None,
+    n_repeat: int = 3,
+):
+    # Runs every profit model on the same draws -> differences in the output are only
+    # due to the model. Times the whole columns computation (best of n_repeat) and
+    # compares the gain of each model to the first one
+    import pandas as pd
+    from .extraction import compute_arb_sim_columns_from_draws
+
+    if profit_model_names is None:
+        profit_model_names = get_profit_model_names()
+    if rng is None:
+        rng = np.random.default_rng()
+    draws = {
+        "fail_outcomes_A": rollup_A.generate_fail_outcomes(n_iter, rng=rng),
+        "fail_outcomes_B": rollup_B.generate_fail_outcomes(n_iter, rng=rng),
+        "gas_prices_A": rollup_A.generate_gas_prices(n_iter, rng=rng),
+        "gas_prices_B": rollup_B.generate_gas_prices(n_iter, rng=rng),
+        "y_prices": y_price_model.generate_asset_prices(n_iter, rng=rng),
+    }
+    rows = []
+    ref_gains = None
+    for profit_model_name in profit_model_names:
+        best_time = np.inf
+        for _ in range(n_repeat):
+            start = time.perf_counter()
+            arb_sim_columns = compute_arb_sim_columns_from_draws(
+                rollup_A,
+                rollup_B,
+                y_price_model,
+                **draws,
+                profit_model=profit_model_name,
+            )
+            best_time = min(best_time, time.perf_counter() - start)
+        gains = arb_sim_columns["shared_sequencing_gain"]
+        if ref_gains is None:
+            ref_gains = gains
+        rows.append(
+            {
+                "profit_model": profit_model_name,
+                "time": best_time,
+                "iters_per_s": n_iter / best_time,
+                "atomic_profit_mean": arb_sim_columns["atomic_profit"].mean(),
+                "non_atomic_profit_mean": arb_sim_columns["non_atomic_profit"].mean(),
+                "shared_sequencing_gain_mean": gains.mean(),
+                "shared_sequencing_gain_std": gains.std(ddof=1),
+                "max_abs_gain_diff": np.abs(gains - ref_gains).max(),
+            }
+        )
+    return pd.DataFrame(rows).set_index("profit_model")
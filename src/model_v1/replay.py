@@ -0,0 +1,213 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+from . import ingest
+from .service import FeedService, read_socket_updates
+from typing import Any, Dict, List, Optional
+
+# Replays the recorded Dune swaps as an update feed for service.py -> throughput and
+# latency of the service can be measured offline. Each swap of a chain gives a gas
+# update (its effective gas price) and moves the reserves of one pool of that chain
+# along its constant product curve (random log size, as swaps have no reserves).
+# Usage (from src, or shared_sequencer_arb.* when installed):
+#   python -m model_v1.replay --pairs pairs.json --port 8765      -> server
+#   python -m model_v1.replay --pairs pairs.json --output feed.jsonl
+#   python -m model_v1.replay --pairs pairs.json --measure        -> stats
+# Without --rate the feed is sent as fast as possible -> measures the max throughput,
+# and the latencies are then mostly the time spent in the queue
+
+# Dune effective_gas_price is in wei -> gwei, as the gas price histograms
+DEFAULT_GAS_PRICE_SCALE = 1e-9
+
+
+def build_replay_updates(
+    pair_configs: Dict[str, Dict[str, Any]],
+    data_dir: Optional[str] = None,
+    max_swaps_per_chain: Optional[int] = None,
+    swap_size_std: float = 0.001,
+    gas_price_scale: float = DEFAULT_GAS_PRICE_SCALE,
+    seed: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    # Pools of each chain -> (pair, side, reserve_x, reserve_y)
+    pools_by_chain = {}
+    for pair_id, pair_config in pair_configs.items():
+        for side in ["A", "B"]:
+            chain = pair_config.get(f"chain_{side}")
+            if chain is None:
+                continue
+            rollup_config = pair_config[f"rollup_{side}"]
+            pools_by_chain.setdefault(chain, []).append(
+                (
+                    pair_id,
+                    side,
+                    rollup_config["arb_pool_reserve_x"],
+                    rollup_config["arb_pool_reserve_y"],
+                )
+            )
+    update_dfs = []
+    for chain, pools in pools_by_chain.items():
+        swaps_df = ingest.load_chain_table("success_swaps", chain, data_dir)
+        swaps_df = swaps_df.sort_values("block_time", kind="stable")
+        if max_swaps_per_chain is not None:
+            swaps_df = swaps_df.head(max_swaps_per_chain)
+        n_swaps = len(swaps_df)
+        block_times = pd.to_datetime(swaps_df["block_time"]).to_numpy()
+        update_dfs.append(
+            pd.DataFrame(
+                {
+                    "block_time": block_times,
+                    "type": "gas",
+                    "chain": chain,
+                    "gas_price": swaps_df["effective_gas_price"].to_numpy(dtype=float)
+                    * gas_price_scale,
+                }
+            )
+        )
+        # Swap i moves pool pool_idx[i] -> reserves follow the cumulative log size
+        pool_idx = rng.integers(len(pools), size=n_swaps)
+        log_sizes = rng.normal(0.0, swap_size_std, size=n_swaps)
+        for i, (pair_id, side, reserve_x, reserve_y) in enumerate(pools):
+            swap_mask = pool_idx == i
+            cum_log_sizes = np.cumsum(log_sizes[swap_mask])
+            update_dfs.append(
+                pd.DataFrame(
+                    {
+                        "block_time": block_times[swap_mask],
+                        "type": "reserves",
+                        "pair": pair_id,
+                        "rollup": side,
+                        "reserve_x": reserve_x * np.exp(cum_log_sizes),
+                        "reserve_y": reserve_y * np.exp(-cum_log_sizes),
+                    }
+                )
+            )
+    if not update_dfs:
+        return []
+    updates_df = pd.concat(update_dfs, ignore_index=True).sort_values(
+        "block_time", kind="stable"
+    )
+    # One dict per update, without the fields of the other update type
+    updates = []
+    for update in updates_df.drop(columns="block_time").to_dict("records"):
+        updates.append(
+            {key: value for key, value in update.items() if not pd.isna(value)}
+        )
+    return updates
+
+
+def write_replay_file(updates: List[Dict[str, Any]], path: str) -> None:
+    with open(path, "w") as f:
+        for update in updates:
+            f.write(json.dumps(update) + "\n")
+        f.write(json.dumps({"type": "end"}) + "\n")
+
+
+async def serve_replay(
+    updates: List[Dict[str, Any]],
+    host: str = "127.0.0.1",
+    port: int = 0,
+    rate: Optional[float] = None,
+) -> asyncio.AbstractServer:
+    # Streams the updates to every client, stamped with sent_at, then an end message.
+    # rate -> updates per second, as fast as possible if None
+    async def handle_client(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            for i, update in enumerate(updates):
+                if rate is not None:
+                    delay = start + i / rate - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                writer.write(
+                    (json.dumps(dict(update, sent_at=time.time())) + "\n").encode()
+                )
+                # -> let the client read, so sent_at is close to the actual send
+                await writer.drain()
+            writer.write((json.dumps({"type": "end"}) + "\n").encode())
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle_client, host, port)
+
+
+async def measure_service(
+    pair_configs: Dict[str, Dict[str, Any]],
+    updates: List[Dict[str, Any]],
+    rate: Optional[float] = None,
+    n_nodes: int = 10,
+) -> Dict[str, Any]:
+    # Replay server and service in one process, over a local socket
+    server = await serve_replay(updates, rate=rate)
+    host, port = server.sockets[0].getsockname()[:2]
+    service = FeedService(pair_configs, n_nodes=n_nodes)
+    try:
+        stats = await service.run(read_socket_updates(host, port))
+    finally:
+        server.close()
+        await server.wait_closed()
+    return stats
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay the recorded Dune swaps as a reserve and gas update feed"
+    )
+    parser.add_argument("--pairs", required=True, help="JSON file of pair configs")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--max-swaps-per-chain", type=int, default=None)
+    parser.add_argument("--swap-size-std", type=float, default=0.001)
+    parser.add_argument(
+        "--gas-price-scale", type=float, default=DEFAULT_GAS_PRICE_SCALE
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate", type=float, default=None, help="updates per second")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--port", type=int, help="serve the feed on this port")
+    mode.add_argument("--output", help="write the feed as a JSON lines file")
+    mode.add_argument(
+        "--measure", action="store_true", help="run the service on the feed"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    return parser.parse_args()
+
+
+async def serve_forever(updates: List[Dict[str, Any]], args: argparse.Namespace):
+    server = await serve_replay(updates, args.host, args.port, args.rate)
+    print(f"Serving {len(updates)} updates on {args.host}:{args.port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    args = parse_args()
+    with open(args.pairs) as f:
+        pair_configs = json.load(f)
+    updates = build_replay_updates(
+        pair_configs,
+        data_dir=args.data_dir,
+        max_swaps_per_chain=args.max_swaps_per_chain,
+        swap_size_std=args.swap_size_std,
+        gas_price_scale=args.gas_price_scale,
+        seed=args.seed,
+    )
+    if args.output is not None:
+        write_replay_file(updates, args.output)
+    elif args.measure:
+        stats = asyncio.run(measure_service(pair_configs, updates, rate=args.rate))
+        print(json.dumps(stats, indent=2))
+    else:
+        asyncio.run(serve_forever(updates, args))
+
+
+if __name__ == "__main__":
+    main()
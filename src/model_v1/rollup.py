@@ -1,10 +1,22 @@
-from gas import GasPriceModel
-from asset import AssetPriceModel
-from scipy.stats import bernoulli
-from typing import Tuple
+import numpy as np
+from .gas import GasPriceModel
+from .asset import AssetPriceModel
+from typing import Any, Tuple, Optional
+from numpy.typing import NDArray
 
 
 class RollupSpec:
+    # Slotted and frozen -> cheap to create and share, use replace(...) to change params
+    __slots__ = (
+        "fail_rate",
+        "gas_price_model",
+        "gas_units_swap",
+        "gas_units_fail",
+        "arb_pool_reserve_x",
+        "arb_pool_reserve_y",
+        "arb_pool_fee",
+    )
+
     def __init__(
         self,
         fail_rate: float,
@@ -15,13 +27,81 @@ class RollupSpec:
         arb_pool_reserve_y: float,
         arb_pool_fee: float,
     ) -> None:
-        self.fail_rate = fail_rate
-        self.gas_price_model = gas_price_model
-        self.gas_units_swap = gas_units_swap
-        self.gas_units_fail = gas_units_fail
-        self.arb_pool_reserve_x = arb_pool_reserve_x
-        self.arb_pool_reserve_y = arb_pool_reserve_y
-        self.arb_pool_fee = arb_pool_fee
+        for field, value in zip(
+            self.__slots__,
+            (
+                fail_rate,
+                gas_price_model,
+                gas_units_swap,
+                gas_units_fail,
+                arb_pool_reserve_x,
+                arb_pool_reserve_y,
+                arb_pool_fee,
+            ),
+        ):
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("RollupSpec is frozen, use replace(...) to change params")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("RollupSpec is frozen, use replace(...) to change params")
+
+    def __reduce__(self) -> Tuple[type, Tuple[Any, ...]]:
+        # -> pickle / copy through the constructor, as attributes can't be set
+        return (RollupSpec, tuple(getattr(self, field) for field in self.__slots__))
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, RollupSpec):
+            return NotImplemented
+        return all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__
+        )
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, field) for field in self.__slots__))
+
+    def __repr__(self) -> str:
+        params = ", ".join(
+            f"{field}={getattr(self, field)!r}" for field in self.__slots__
+        )
+        return f"RollupSpec({params})"
+
+    def replace(self, **changes: Any) -> "RollupSpec":
+        # New spec with some params changed, e.g. rollup_A.replace(fail_rate=0.1)
+        unknown_params = set(changes) - set(self.__slots__)
+        if unknown_params:
+            raise AttributeError(f"Unknown RollupSpec params: {sorted(unknown_params)}")
+        params = {field: getattr(self, field) for field in self.__slots__}
+        params.update(changes)
+        return RollupSpec(**params)
+
+    @classmethod
+    def from_chain(
+        cls,
+        chain: str,
+        arb_pool_reserve_x: float,
+        arb_pool_reserve_y: float,
+        arb_pool_fee: float,
+        gas_price_model: Optional[GasPriceModel] = None,
+        data_dir: Optional[str] = None,
+    ) -> "RollupSpec":
+        # Fail rate and gas units estimated from the Dune swap traces of the chain
+        # -> the gas price model defaults to the chain's empirical model
+        from . import ingest
+
+        rollup_params = ingest.estimate_rollup_params(chain, data_dir)
+        if gas_price_model is None:
+            gas_price_model = GasPriceModel.from_chain(chain, data_dir)
+        return cls(
+            fail_rate=rollup_params["fail_rate"],
+            gas_price_model=gas_price_model,
+            gas_units_swap=rollup_params["gas_units_swap"],
+            gas_units_fail=rollup_params["gas_units_fail"],
+            arb_pool_reserve_x=arb_pool_reserve_x,
+            arb_pool_reserve_y=arb_pool_reserve_y,
+            arb_pool_fee=arb_pool_fee,
+        )
 
     def get_fail_rate(self) -> float:
         return self.fail_rate
@@ -47,8 +127,24 @@ class RollupSpec:
     def get_arb_pool_price_in_y_units(self) -> float:
         return self.arb_pool_reserve_y / self.arb_pool_reserve_x
 
-    def generate_gas_price(self) -> float:
-        return self.gas_price_model.generate_gas_prices(n_samples=1)[0]
+    def generate_gas_price(self, rng: Optional[np.random.Generator] = None) -> float:
+        return self.generate_gas_prices(n_samples=1, rng=rng)[0]
+
+    def generate_gas_prices(
+        self, n_samples: int, rng: Optional[np.random.Generator] = None
+    ) -> NDArray:
+        return self.gas_price_model.generate_gas_prices(n_samples=n_samples, rng=rng)
+
+    def generate_fail_outcome(self, rng: Optional[np.random.Generator] = None) -> int:
+        return self.generate_fail_outcomes(n_samples=1, rng=rng)[0]
+
+    def generate_fail_outcomes(
+        self, n_samples: int, rng: Optional[np.random.Generator] = None
+    ) -> NDArray:
+        if rng is None:
+            rng = np.random.default_rng()
+        # Bernoulli draws -> 1 if the transaction fails, 0 otherwise
+        return (rng.random(n_samples) < self.fail_rate).astype(np.int64)
 
-    def generate_fail_outcome(self) -> float:
-        return bernoulli.rvs(self.fail_rate, size=1)[0]
+    def fail_outcomes_from_uniforms(self, u: NDArray) -> NDArray:
+        return (u < self.fail_rate).astype(np.int64)
@@ -0,0 +1,198 @@
+import os
+import numpy as np
+from functools import lru_cache
+from numpy.polynomial.hermite_e import hermegauss
+from typing import Any, Dict, List, Optional, Tuple
+from numpy.typing import NDArray
+
+# Empirical models are sampled from a flat table with one column per histogram
+# bucket. Rows: bucket values, CDF (inverse-CDF sampling of given uniforms), alias
+# probability and alias value (O(1) sampling of fresh draws). The gaussian jitter
+# bandwidth is the mean bucket spacing, so it is recomputed from row 0 (0 for a
+# single bucket -> the model is a point mass at its value)
+SAMPLING_TABLE_ROWS = ["hist_vals", "hist_cdf", "alias_prob", "alias_vals"]
+
+
+@lru_cache(maxsize=None)
+def get_hermite_quadrature(n_nodes: int) -> Tuple[NDArray, NDArray]:
+    # Gauss-Hermite nodes and normalized weights for a standard normal. Cached ->
+    # hermegauss takes ~0.2 ms, more than the rest of a quadrature. Read-only, as
+    # the arrays are shared by all callers
+    hermite_nodes, hermite_weights = hermegauss(n_nodes)
+    hermite_weights = hermite_weights / hermite_weights.sum()
+    hermite_nodes.flags.writeable = False
+    hermite_weights.flags.writeable = False
+    return hermite_nodes, hermite_weights
+
+
+def compile_alias_table(probs: NDArray) -> Tuple[NDArray, NDArray]:
+    # Vose's alias method -> bucket k is kept with prob alias_prob[k], otherwise
+    # its alias alias_idx[k] is used
+    n_buckets = len(probs)
+    scaled_probs = np.asarray(probs, dtype=float) * n_buckets
+    alias_prob = np.ones(n_buckets)
+    alias_idx = np.arange(n_buckets)
+    small = [k for k in range(n_buckets) if scaled_probs[k] < 1]
+    large = [k for k in range(n_buckets) if scaled_probs[k] >= 1]
+    while small and large:
+        k_small = small.pop()
+        k_large = large.pop()
+        alias_prob[k_small] = scaled_probs[k_small]
+        alias_idx[k_small] = k_large
+        scaled_probs[k_large] += scaled_probs[k_small] - 1
+        if scaled_probs[k_large] < 1:
+            small.append(k_large)
+        else:
+            large.append(k_large)
+    # -> buckets left in either list only differ from 1 by rounding errors
+    return alias_prob, alias_idx
+
+
+def compile_sampling_table(vals: NDArray, counts: NDArray) -> NDArray:
+    vals = np.asarray(vals, dtype=float).reshape(-1)
+    counts = np.asarray(counts, dtype=float).reshape(-1)
+    if len(vals) == 0 or len(vals) != len(counts):
+        raise Exception("The histogram must have one count per bucket value")
+    if np.any(counts < 0) or counts.sum() <= 0:
+        raise Exception("The histogram counts must be non-negative with a positive sum")
+    alias_prob, alias_idx = compile_alias_table(counts / counts.sum())
+    sampling_table = np.empty((len(SAMPLING_TABLE_ROWS), len(vals)))
+    sampling_table[0] = vals
+    sampling_table[1] = np.cumsum(counts) / counts.sum()
+    sampling_table[2] = alias_prob
+    sampling_table[3] = vals[alias_idx]
+    return sampling_table
+
+
+def unpack_sampling_table(sampling_table: NDArray) -> Dict[str, Any]:
+    # Rows are views -> nothing is copied out of a memory-mapped table
+    sampler = dict(zip(SAMPLING_TABLE_ROWS, sampling_table))
+    hist_vals = sampler["hist_vals"]
+    sampler["bandwidth"] = np.diff(hist_vals).mean() if len(hist_vals) > 1 else 0.0
+    return sampler
+
+
+def save_sampling_table(path: str, sampling_table: NDArray) -> None:
+    # Write then rename -> processes mapping the old file keep a consistent copy
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, sampling_table)
+    os.replace(tmp_path, path)
+
+
+def load_sampling_table(path: str) -> Dict[str, Any]:
+    # Read-only memory map -> all processes share the same pages of the file
+    return unpack_sampling_table(np.load(path, mmap_mode="r"))
+
+
+def sample_from_alias_table(
+    hist_vals: NDArray,
+    alias_prob: NDArray,
+    alias_vals: NDArray,
+    bandwidth: float,
+    u: NDArray,
+    z: NDArray,
+) -> NDArray:
+    # O(1) per draw: u picks a bucket and whether to use its alias (not monotone in
+    # u, so only for fresh draws), z is the standard normal jitter
+    n_buckets = len(hist_vals)
+    scaled_u = u * n_buckets
+    bucket_idx = np.minimum(scaled_u.astype(np.int64), n_buckets - 1)
+    keep_bucket = scaled_u - bucket_idx < alias_prob[bucket_idx]
+    return (
+        np.where(keep_bucket, hist_vals[bucket_idx], alias_vals[bucket_idx])
+        + bandwidth * z
+    )
+
+
+def sample_from_table(
+    hist_vals: NDArray,
+    hist_cdf: NDArray,
+    bandwidth: float,
+    u: NDArray,
+    z: NDArray,
+) -> NDArray:
+    # Inverse CDF: u picks the histogram bucket (monotone in u -> used for antithetic
+    # and common random numbers), z is the standard normal jitter
+    bucket_idx = np.searchsorted(hist_cdf, u, side="right")
+    # -> guard against cdf[-1] being rounded slightly below 1
+    bucket_idx = np.minimum(bucket_idx, len(hist_vals) - 1)
+    return hist_vals[bucket_idx] + bandwidth * z
+
+
+def fit_kde_model(hist_vals: NDArray, hist_cdf: NDArray, bandwidth: float):
+    # Only used for inspection (e.g. score_samples) -> sampling uses the table
+    from sklearn.neighbors import KernelDensity
+
+    bucket_probs = np.diff(hist_cdf, prepend=0.0)
+    return KernelDensity(kernel="gaussian", bandwidth=bandwidth).fit(
+        np.asarray(hist_vals).reshape(-1, 1), sample_weight=bucket_probs
+    )
+
+
+class SamplingTableMixin:
+    # Sampling table plumbing of the gas and asset price models. Empirical models
+    # sample from a table compiled from their histogram (attribute histogram_attr),
+    # or memory-mapped from a .npy saved by save_sampling_table
+    histogram_attr = None
+
+    def init_sampler(
+        self,
+        model_type: str,
+        histogram: List[Tuple[float, float]],
+        sampling_table_path: Optional[str] = None,
+    ) -> None:
+        if sampling_table_path is not None and model_type != "empirical":
+            raise AttributeError(
+                'sampling_table_path is only used by the "empirical" model'
+            )
+        self.sampling_table_path = None
+        self.kde_model = None
+        if sampling_table_path is not None:
+            self.attach_sampling_table(sampling_table_path)
+        elif model_type == "empirical":
+            # Sampling table of the weighted histogram -> same distribution as sampling
+            # the gaussian KDE: pick a bucket, then jitter it by the bandwidth
+            sampling_table = compile_sampling_table(
+                [t[0] for t in histogram], [t[1] for t in histogram]
+            )
+            self.__dict__.update(unpack_sampling_table(sampling_table))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The KDE is never pickled, and models backed by a sampling table only
+        # pickle its path (re-mapped when unpickled)
+        state = dict(self.__dict__)
+        state.pop("kde_model", None)
+        if state.get("sampling_table_path") is not None:
+            for attr in SAMPLING_TABLE_ROWS + ["bandwidth", self.histogram_attr]:
+                state.pop(attr, None)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        if self.sampling_table_path is not None:
+            self.attach_sampling_table(self.sampling_table_path)
+
+    def save_sampling_table(self, path: str) -> None:
+        # Stores the empirical sampler as a .npy and switches the model to a
+        # read-only memory map of it -> workers share the file instead of copies
+        save_sampling_table(
+            path, np.stack([getattr(self, row) for row in SAMPLING_TABLE_ROWS])
+        )
+        self.attach_sampling_table(path)
+
+    def attach_sampling_table(self, path: str) -> None:
+        self.sampling_table_path = path
+        self.__dict__.update(load_sampling_table(path))
+
+    def get_kde_model(self):
+        if self.kde_model is None:
+            self.kde_model = fit_kde_model(
+                self.hist_vals, self.hist_cdf, self.bandwidth
+            )
+        return self.kde_model
+
+    @classmethod
+    def from_sampling_table(cls, path: str, *args: Any, **kwargs: Any):
+        # Empirical model memory-mapped from a table saved by save_sampling_table;
+        # other constructor args (e.g. asset_label, fee) are passed through
+        return cls(*args, model_type="empirical", sampling_table_path=path, **kwargs)
@@ -0,0 +1,372 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from . import kernels
+from . import bundle
+from .gas import GasPriceModel
+from .rollup import RollupSpec
+from .sweep import build_simulation_specs
+from .expectation import compute_expected_profits
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# Streaming mode: pool reserve and gas price updates for many rollup pairs come in
+# as JSON lines, and the expected atomic vs non-atomic profits are recomputed for
+# the pairs whose inputs changed, e.g.
+#   {"type": "reserves", "pair": "arb-op", "rollup": "A", "reserve_x": 990.0, "reserve_y": 1050.0}
+#   {"type": "gas", "chain": "arbitrum", "gas_price": 0.01}
+#   {"type": "end"}  -> stops the service (e.g. end of a replay)
+# An optional "sent_at" (time.time() of the producer) gives end-to-end latencies.
+# Updates with non-positive reserves (or a negative gas price) are skipped, and a
+# pair whose evaluation raises gets an {"pair": ..., "error": ...} result.
+# Pair configs are sweep configs (rollup_A, rollup_B, y_price_model) plus the
+# chains whose gas updates apply to each side, e.g.
+#   {"arb-op": {"chain_A": "arbitrum", "chain_B": "optimism", "rollup_A": {...}, ...}}
+# Usage (from src, or shared_sequencer_arb.* when installed):
+#   python -m model_v1.service --pairs pairs.json --connect 127.0.0.1:8765
+#   python -m model_v1.service --pairs pairs.json --tail updates.jsonl
+
+UPDATE_TYPES = ["reserves", "gas", "end"]
+SIDES = ["A", "B"]
+LATENCY_QUANTILES = [0.5, 0.9, 0.99]
+
+
+def check_pair_specs(pair_id: str, rollup_A: RollupSpec, rollup_B: RollupSpec) -> None:
+    # Same checks as the bundle formulae, up to the order of the rollups (the service
+    # swaps them when the prices cross) -> bad pair configs fail at startup
+    for rollup in [rollup_A, rollup_B]:
+        if min(rollup.get_arb_pool_reserves()) <= 0:
+            raise Exception(f"The pools of pair {pair_id} must have positive reserves")
+    if (
+        rollup_A.get_arb_pool_price_in_y_units()
+        < rollup_B.get_arb_pool_price_in_y_units()
+    ):
+        rollup_A, rollup_B = rollup_B, rollup_A
+    try:
+        bundle.check_rollup_specs(rollup_A, rollup_B)
+    except Exception as error:
+        raise Exception(f"Invalid specs for pair {pair_id}: {error}") from error
+
+
+class FeedService:
+    def __init__(self, pair_configs: Dict[str, Dict[str, Any]], n_nodes: int = 10):
+        # n_nodes -> quadrature nodes of expectation.compute_expected_profits
+        self.n_nodes = n_nodes
+        self.specs: Dict[str, List] = {}
+        # Latest raw inputs per (pair, side) -> updates that change nothing are skipped
+        self.inputs: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.sides_by_chain: Dict[str, List[Tuple[str, str]]] = {}
+        # Pairs to recompute -> time of their oldest pending update
+        self.pending: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        self.n_updates = 0
+        self.n_unchanged = 0
+        # Updates of pairs / chains that are not configured, or with reserves / gas
+        # prices the formulae can't use -> skipped
+        self.n_unknown = 0
+        self.n_invalid = 0
+        # Pairs whose evaluation raised -> published as error results
+        self.n_errors = 0
+        self.n_evaluations = 0
+        self.start_time = None
+        self.last_flush_time = None
+        now = time.time()
+        for pair_id, pair_config in pair_configs.items():
+            rollup_A, rollup_B, y_price_model = build_simulation_specs(pair_config)
+            check_pair_specs(pair_id, rollup_A, rollup_B)
+            self.specs[pair_id] = [rollup_A, rollup_B, y_price_model]
+            for side, rollup in zip(SIDES, [rollup_A, rollup_B]):
+                reserve_x, reserve_y = rollup.get_arb_pool_reserves()
+                self.inputs[(pair_id, side)] = {
+                    "reserve_x": reserve_x,
+                    "reserve_y": reserve_y,
+                    "gas_price": None,
+                }
+                chain = pair_config.get(f"chain_{side}")
+                if chain is not None:
+                    self.sides_by_chain.setdefault(chain, []).append((pair_id, side))
+            # -> first results for every pair
+            self.pending[pair_id] = now
+
+    def apply_update(self, update: Dict[str, Any]) -> None:
+        if update["type"] not in UPDATE_TYPES:
+            raise AttributeError(f"update type should be one of {UPDATE_TYPES}")
+        if update["type"] == "end":
+            return
+        received_at = time.time()
+        if self.start_time is None:
+            self.start_time = received_at
+        self.n_updates += 1
+        if update["type"] == "reserves":
+            if update["rollup"] not in SIDES:
+                raise AttributeError('update rollup should be "A" or "B"')
+            targets = [(update["pair"], update["rollup"])]
+            if targets[0] not in self.inputs:
+                self.n_unknown += 1
+                return
+            changes = {
+                "reserve_x": float(update["reserve_x"]),
+                "reserve_y": float(update["reserve_y"]),
+            }
+            if not all(np.isfinite(value) and value > 0 for value in changes.values()):
+                self.n_invalid += 1
+                return
+        else:
+            # -> every pair with a rollup on this chain
+            if update["chain"] not in self.sides_by_chain:
+                self.n_unknown += 1
+                return
+            targets = self.sides_by_chain[update["chain"]]
+            changes = {"gas_price": float(update["gas_price"])}
+            if not (np.isfinite(changes["gas_price"]) and changes["gas_price"] >= 0):
+                self.n_invalid += 1
+                return
+        changed = False
+        for pair_id, side in targets:
+            side_inputs = self.inputs[(pair_id, side)]
+            if all(side_inputs[key] == value for key, value in changes.items()):
+                continue
+            side_inputs.update(changes)
+            self.pending.setdefault(pair_id, update.get("sent_at", received_at))
+            changed = True
+        if not changed:
+            self.n_unchanged += 1
+
+    def get_pair_specs(self, pair_id: str) -> List:
+        # Specs with the latest inputs -> rebuilt only when the pair is evaluated
+        pair_specs = self.specs[pair_id]
+        for i, side in enumerate(SIDES):
+            side_inputs = self.inputs[(pair_id, side)]
+            changes = {}
+            if pair_specs[i].get_arb_pool_reserves() != (
+                side_inputs["reserve_x"],
+                side_inputs["reserve_y"],
+            ):
+                changes["arb_pool_reserve_x"] = side_inputs["reserve_x"]
+                changes["arb_pool_reserve_y"] = side_inputs["reserve_y"]
+            gas_price_model = pair_specs[i].get_gas_price_model()
+            if side_inputs["gas_price"] is not None and (
+                gas_price_model.get_model_type() != "constant"
+                or gas_price_model.gas_price_mean != side_inputs["gas_price"]
+            ):
+                # Latest observed gas price -> constant model
+                changes["gas_price_model"] = GasPriceModel(
+                    model_type="constant", gas_price_mean=side_inputs["gas_price"]
+                )
+            if changes:
+                pair_specs[i] = pair_specs[i].replace(**changes)
+        return pair_specs
+
+    def evaluate_pair(self, pair_id: str) -> Dict[str, Any]:
+        rollup_A, rollup_B, y_price_model = self.get_pair_specs(pair_id)
+        # The bundle formulae need the higher price on A -> swap the rollups if the
+        # prices crossed
+        swapped = (
+            rollup_A.get_arb_pool_price_in_y_units()
+            < rollup_B.get_arb_pool_price_in_y_units()
+        )
+        if swapped:
+            rollup_A, rollup_B = rollup_B, rollup_A
+        x_A, y_A = rollup_A.get_arb_pool_reserves()
+        x_B, y_B = rollup_B.get_arb_pool_reserves()
+        arb_threshold = float(
+            kernels.compute_arb_opportunity_threshold(
+                x_A, y_A, x_B, y_B, rollup_A.get_arb_pool_fee()
+            )
+        )
+        result = {
+            "pair": pair_id,
+            "swapped": bool(swapped),
+            "arb_threshold": arb_threshold,
+            "contains_arb_opportunity": arb_threshold > 1,
+        }
+        if arb_threshold > 1:
+            trade_sizes_dict = bundle.compute_arb_trade_sizes(rollup_A, rollup_B)
+            expected_profits = compute_expected_profits(
+                rollup_A, rollup_B, y_price_model, self.n_nodes
+            )
+        else:
+            # -> no trade, so no profit and no cost
+            trade_sizes_dict = dict.fromkeys(
+                ["delta_x_A", "delta_y_A", "delta_x_B", "delta_y_B"], 0.0
+            )
+            expected_profits = dict.fromkeys(
+                ["atomic_profit", "non_atomic_profit", "shared_sequencing_gain"], 0.0
+            )
+        result.update({key: float(value) for key, value in trade_sizes_dict.items()})
+        for key in ["atomic_profit", "non_atomic_profit", "shared_sequencing_gain"]:
+            result[f"expected_{key}"] = float(expected_profits[key])
+        self.n_evaluations += 1
+        return result
+
+    def flush(self) -> List[Dict[str, Any]]:
+        # Recomputes the pairs with pending updates -> one result per pair, however
+        # many updates it got since the last flush
+        results = []
+        for pair_id, pending_since in self.pending.items():
+            try:
+                result = self.evaluate_pair(pair_id)
+            except Exception as error:
+                # -> one bad pair does not stop the service
+                result = {"pair": pair_id, "error": f"{type(error).__name__}: {error}"}
+                self.n_errors += 1
+            result["latency"] = time.time() - pending_since
+            self.latencies.append(result["latency"])
+            results.append(result)
+        self.pending = {}
+        self.last_flush_time = time.time()
+        return results
+
+    async def run(
+        self,
+        updates: AsyncIterator[Dict[str, Any]],
+        publish: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        max_queue_size: int = 10_000,
+    ) -> Dict[str, Any]:
+        # Reads updates in a separate task -> all updates queued while a flush runs
+        # are applied together, and each changed pair is recomputed once
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+
+        async def read_updates() -> None:
+            try:
+                async for update in updates:
+                    await queue.put(update)
+            except Exception as error:
+                # -> re-raised by the loop below (no end update would ever come)
+                await queue.put(error)
+                return
+            await queue.put({"type": "end"})
+
+        reader_task = asyncio.create_task(read_updates())
+        try:
+            running = True
+            while running:
+                await self.publish_results(self.flush(), publish)
+                update = await queue.get()
+                while True:
+                    if isinstance(update, Exception):
+                        raise update
+                    if update["type"] == "end":
+                        running = False
+                        break
+                    self.apply_update(update)
+                    if queue.empty():
+                        break
+                    update = queue.get_nowait()
+            await self.publish_results(self.flush(), publish)
+        finally:
+            reader_task.cancel()
+        return self.get_stats()
+
+    @staticmethod
+    async def publish_results(
+        results: List[Dict[str, Any]],
+        publish: Optional[Callable[[Dict[str, Any]], Any]],
+    ) -> None:
+        # publish can be a plain function or a coroutine function
+        if publish is None:
+            return
+        for result in results:
+            published = publish(result)
+            if asyncio.iscoroutine(published):
+                await published
+
+    def get_stats(self) -> Dict[str, Any]:
+        if self.start_time is not None and self.last_flush_time is not None:
+            elapsed = self.last_flush_time - self.start_time
+        else:
+            elapsed = 0.0
+        stats = {
+            "n_pairs": len(self.specs),
+            "n_updates": self.n_updates,
+            "n_unchanged": self.n_unchanged,
+            "n_unknown": self.n_unknown,
+            "n_invalid": self.n_invalid,
+            "n_errors": self.n_errors,
+            "n_evaluations": self.n_evaluations,
+            "elapsed": elapsed,
+            "updates_per_s": self.n_updates / elapsed if elapsed > 0 else np.nan,
+        }
+        latencies = np.array(self.latencies) if self.latencies else np.full(1, np.nan)
+        for q in LATENCY_QUANTILES:
+            stats[f"latency_p{int(q * 100)}"] = float(np.quantile(latencies, q))
+        stats["latency_max"] = float(latencies.max())
+        return stats
+
+
+async def read_socket_updates(host: str, port: int) -> AsyncIterator[Dict[str, Any]]:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        async for line in reader:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        writer.close()
+
+
+async def tail_file_updates(
+    path: str, follow: bool = True, poll_interval: float = 0.1
+) -> AsyncIterator[Dict[str, Any]]:
+    # Like tail -f -> waits for new lines at the end of the file if follow is set
+    with open(path) as f:
+        partial_line = ""
+        while True:
+            line = f.readline()
+            if line.endswith("\n"):
+                line = partial_line + line
+                partial_line = ""
+                if line.strip():
+                    yield json.loads(line)
+                continue
+            # -> end of file, possibly in the middle of a line being written
+            partial_line += line
+            if not follow:
+                if partial_line.strip():
+                    yield json.loads(partial_line)
+                return
+            await asyncio.sleep(poll_interval)
+
+
+def make_jsonl_publisher(stream) -> Callable[[Dict[str, Any]], None]:
+    def publish(result: Dict[str, Any]) -> None:
+        stream.write(json.dumps(result) + "\n")
+
+    return publish
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Recompute expected arb profits from streamed reserves and gas"
+    )
+    parser.add_argument("--pairs", required=True, help="JSON file of pair configs")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--connect", help="host:port of an update server")
+    source.add_argument("--tail", help="JSON lines file of updates")
+    parser.add_argument(
+        "--no-follow", action="store_true", help="stop at the end of the tailed file"
+    )
+    parser.add_argument("--output", default=None, help="results file (default stdout)")
+    parser.add_argument("--n-nodes", type=int, default=10)
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    with open(args.pairs) as f:
+        pair_configs = json.load(f)
+    service = FeedService(pair_configs, n_nodes=args.n_nodes)
+    if args.connect is not None:
+        host, port = args.connect.rsplit(":", 1)
+        updates = read_socket_updates(host, int(port))
+    else:
+        updates = tail_file_updates(args.tail, follow=not args.no_follow)
+    if args.output is None:
+        return await service.run(updates, make_jsonl_publisher(sys.stdout))
+    with open(args.output, "w") as output:
+        return await service.run(updates, make_jsonl_publisher(output))
+
+
+if __name__ == "__main__":
+    stats = asyncio.run(main(parse_args()))
+    print(json.dumps(stats), file=sys.stderr)
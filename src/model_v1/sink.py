@@ -0,0 +1,140 @@
+import numpy as np
+from typing import Dict, List, Optional
+from numpy.typing import NDArray
+
+# Integer fields of in-memory records can't hold NaN -> missing values use this
+RECORD_INT_NULL = -1
+
+
+class ArbSimSink:
+    # Writes simulation output to disk in record batches as it is produced, so the
+    # full output never has to be held in memory
+    def __init__(
+        self,
+        path: str,
+        schema: Dict[str, str],  # shape: {column: numpy dtype name}
+        file_format: str = "parquet",
+    ) -> None:
+        if file_format not in ["parquet", "arrow", "csv"]:
+            raise AttributeError('file_format should be "parquet", "arrow" or "csv"')
+        self.path = path
+        self.file_format = file_format
+        self.schema = schema
+        self.n_rows = 0
+        if file_format == "csv":
+            # -> plain text, no pyarrow needed (header first, then one block per batch)
+            self.writer = open(path, "w", newline="")
+            self.writer.write(",".join(schema) + "\n")
+            return
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("pyarrow is required to write simulation output")
+        self.arrow_schema = pa.schema(
+            [
+                (col, pa.from_numpy_dtype(np.dtype(dtype)))
+                for col, dtype in schema.items()
+            ]
+        )
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(path, self.arrow_schema)
+        elif file_format == "arrow":
+            self.writer = pa.ipc.new_file(path, self.arrow_schema)
+
+    def write_batch(self, columns: Dict[str, NDArray]) -> None:
+        if self.file_format == "csv":
+            self.write_csv_batch(columns)
+            return
+        import pyarrow as pa
+
+        arrays = []
+        for col, arrow_type in zip(self.schema, self.arrow_schema.types):
+            values = np.asarray(columns[col])
+            if values.dtype.kind == "f" and arrow_type != pa.float64():
+                # -> NaNs (e.g. outcomes of iters without arbitrage) are stored as nulls
+                arrays.append(pa.array(values, from_pandas=True).cast(arrow_type))
+            else:
+                arrays.append(pa.array(values.astype(self.schema[col], copy=False)))
+        self.writer.write_batch(
+            pa.RecordBatch.from_arrays(arrays, schema=self.arrow_schema)
+        )
+        self.n_rows += len(arrays[0])
+
+    def write_csv_batch(self, columns: Dict[str, NDArray]) -> None:
+        import pandas as pd
+
+        frame_columns = {}
+        for col, dtype in self.schema.items():
+            values = np.asarray(columns[col])
+            if values.dtype.kind == "f" and np.dtype(dtype).kind in "iu":
+                # -> NaNs are written as empty fields, integers without them as such
+                if not np.any(np.isnan(values)):
+                    values = values.astype(dtype)
+            frame_columns[col] = values
+        pd.DataFrame(frame_columns).to_csv(self.writer, header=False, index=False)
+        self.n_rows += len(frame_columns[next(iter(self.schema))])
+
+    def close(self) -> None:
+        self.writer.close()
+
+    def __enter__(self) -> "ArbSimSink":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def open_arb_sim_output(path: str, columns: Optional[List[str]] = None):
+    # Opens simulation output lazily -> arrow files are memory-mapped (zero-copy) and
+    # parquet files only read the requested columns
+    import pyarrow as pa
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        return table
+
+
+def get_record_dtype(schema: Dict[str, str]) -> np.dtype:
+    # Fixed-size per-iteration record, e.g. ~130 bytes per iter instead of a
+    # one-row DataFrame
+    return np.dtype([(col, np.dtype(dtype)) for col, dtype in schema.items()])
+
+
+def build_arb_sim_records(
+    columns: Dict[str, NDArray], schema: Dict[str, str]
+) -> NDArray:
+    record_dtype = get_record_dtype(schema)
+    n_rows = len(columns[record_dtype.names[0]])
+    records = np.empty(n_rows, dtype=record_dtype)
+    for col in record_dtype.names:
+        values = np.asarray(columns[col])
+        if values.dtype.kind == "f" and record_dtype[col].kind in "iu":
+            values = np.where(np.isnan(values), RECORD_INT_NULL, values)
+        records[col] = values
+    return records
+
+
+def arb_sim_records_to_frame(records: NDArray):
+    # Conversion to pandas only happens here, at the edge
+    import pandas as pd
+
+    return pd.DataFrame(arb_sim_records_to_columns(records))
+
+
+def arb_sim_records_to_columns(records: NDArray) -> Dict[str, NDArray]:
+    # Inverse of build_arb_sim_records -> missing integer values are NaN again
+    columns = {}
+    for col in records.dtype.names:
+        values = records[col]
+        if values.dtype.kind == "i" and np.any(values == RECORD_INT_NULL):
+            values = np.where(values == RECORD_INT_NULL, np.nan, values)
+        columns[col] = values
+    return columns
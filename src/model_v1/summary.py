@@ -0,0 +1,184 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from numpy.typing import NDArray
+
+
+class RunningMoments:
+    # Welford's running mean/variance, updated with whole batches (Chan et al. merge)
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: NDArray) -> None:
+        n_batch = len(values)
+        if n_batch == 0:
+            return
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        n_total = self.n + n_batch
+        delta = batch_mean - self.mean
+        self.mean += delta * n_batch / n_total
+        self.m2 += batch_m2 + delta**2 * self.n * n_batch / n_total
+        self.n = n_total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    def get_variance(self) -> float:
+        if self.n < 2:
+            return np.nan
+        return self.m2 / (self.n - 1)
+
+    def get_std(self) -> float:
+        return np.sqrt(self.get_variance())
+
+    def get_std_error(self) -> float:
+        return np.sqrt(self.get_variance() / self.n)
+
+
+class QuantileSketch:
+    # Keeps a uniform random sample of fixed size (values with the smallest random
+    # keys), so quantiles are approximate but memory does not grow with n_iter
+    def __init__(self, sample_size: int = 10_000, seed: Optional[int] = None) -> None:
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.values = np.empty(0)
+
+    def update(self, values: NDArray) -> None:
+        keys = np.concatenate([self.keys, self.rng.random(len(values))])
+        values = np.concatenate([self.values, values])
+        if len(keys) > self.sample_size:
+            keep_idx = np.argpartition(keys, self.sample_size)[: self.sample_size]
+            keys = keys[keep_idx]
+            values = values[keep_idx]
+        self.keys = keys
+        self.values = values
+
+    def get_quantiles(self, q: List[float]) -> NDArray:
+        if len(self.values) == 0:
+            return np.full(len(q), np.nan)
+        return np.quantile(self.values, q)
+
+
+class RunningHistogram:
+    # bin_range given -> fixed edges, values outside them are counted in the
+    # underflow/overflow bins. Otherwise the edges start from the first batch and
+    # the bin width doubles (pairs of bins are merged) whenever a later batch falls
+    # outside -> counts stay exact, only the resolution and the bin origin depend
+    # on the batch order. Infinities go to underflow/overflow, NaNs are skipped
+    def __init__(
+        self, n_bins: int = 100, bin_range: Optional[Tuple[float, float]] = None
+    ) -> None:
+        self.n_bins = n_bins
+        self.fixed_range = bin_range is not None
+        self.bin_edges = None
+        if bin_range is not None:
+            self.bin_edges = np.linspace(bin_range[0], bin_range[1], n_bins + 1)
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def update(self, values: NDArray) -> None:
+        finite_values = values[np.isfinite(values)]
+        if len(finite_values) > 0 and not self.fixed_range:
+            low, high = finite_values.min(), finite_values.max()
+            if self.bin_edges is None:
+                pad = (high - low) * 0.5 if high > low else max(abs(low), 1.0) * 0.5
+                self.bin_edges = np.linspace(low - pad, high + pad, self.n_bins + 1)
+            else:
+                self.grow_bins(low, high)
+        if self.bin_edges is None:
+            return
+        self.underflow += int((values < self.bin_edges[0]).sum())
+        self.overflow += int((values > self.bin_edges[-1]).sum())
+        self.counts += np.histogram(finite_values, bins=self.bin_edges)[0]
+
+    def grow_bins(self, low: float, high: float) -> None:
+        while low < self.bin_edges[0] or high > self.bin_edges[-1]:
+            width = self.bin_edges[-1] - self.bin_edges[0]
+            downward = low < self.bin_edges[0]
+            # Growing downward keeps the top edge -> pairs are aligned from the top
+            n_front = self.n_bins % 2 if downward else 0
+            n_back = (self.n_bins + n_front) % 2
+            merged_counts = (
+                np.concatenate(
+                    [
+                        np.zeros(n_front, dtype=np.int64),
+                        self.counts,
+                        np.zeros(n_back, dtype=np.int64),
+                    ]
+                )
+                .reshape(-1, 2)
+                .sum(axis=1)
+            )
+            self.counts = np.zeros(self.n_bins, dtype=np.int64)
+            if downward:
+                self.counts[self.n_bins - len(merged_counts) :] = merged_counts
+                new_low = self.bin_edges[-1] - 2 * width
+            else:
+                self.counts[: len(merged_counts)] = merged_counts
+                new_low = self.bin_edges[0]
+            self.bin_edges = np.linspace(new_low, new_low + 2 * width, self.n_bins + 1)
+
+
+class ArbSimSummary:
+    # Aggregate-only output of the Monte Carlo runs -> memory is O(1) in n_iter
+    def __init__(
+        self,
+        columns: List[str],
+        quantiles: List[float] = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99],
+        sketch_size: int = 10_000,
+        n_bins: int = 100,
+        seed: Optional[int] = None,
+        histogram_ranges: Optional[Dict[str, Tuple[float, float]]] = None,
+    ) -> None:
+        self.columns = columns
+        self.quantiles = quantiles
+        self.moments = {col: RunningMoments() for col in columns}
+        self.sketches = {col: QuantileSketch(sketch_size, seed=seed) for col in columns}
+        # Histograms without a range in histogram_ranges grow with the data -> their
+        # edges depend on the batch order (see RunningHistogram)
+        if histogram_ranges is None:
+            histogram_ranges = {}
+        self.histograms = {
+            col: RunningHistogram(n_bins, histogram_ranges.get(col)) for col in columns
+        }
+        self.n_iter = 0
+        self.converged = False
+        self.profile = None  # stage timing report, when the run was profiled
+
+    def update(self, arb_sim_columns: Dict[str, NDArray]) -> None:
+        for col in self.columns:
+            values = np.asarray(arb_sim_columns[col], dtype=float)
+            self.moments[col].update(values)
+            self.sketches[col].update(values)
+            self.histograms[col].update(values)
+        self.n_iter = self.moments[self.columns[0]].n
+
+    def get_std_error(self, column: str) -> float:
+        return self.moments[column].get_std_error()
+
+    def to_frame(self):
+        import pandas as pd
+
+        rows = []
+        for col in self.columns:
+            moments = self.moments[col]
+            row = {
+                "column": col,
+                "count": moments.n,
+                "mean": moments.mean,
+                "std": moments.get_std(),
+                "std_error": moments.get_std_error(),
+                "min": moments.min,
+                "max": moments.max,
+            }
+            for q, q_val in zip(
+                self.quantiles, self.sketches[col].get_quantiles(self.quantiles)
+            ):
+                row[f"q{q:g}"] = q_val
+            rows.append(row)
+        return pd.DataFrame(rows).set_index("column")
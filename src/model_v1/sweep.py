@@ -0,0 +1,484 @@
+import os
+import copy
+import itertools
+import collections
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+from .rollup import RollupSpec
+from .gas import GasPriceModel
+from .asset import AssetPriceModel
+from numpy.typing import NDArray
+from .sink import ArbSimSink, arb_sim_records_to_frame, arb_sim_records_to_columns
+from .summary import ArbSimSummary
+from .extraction import (
+    ARB_SIM_RECORD_DTYPE,
+    ARB_SIM_SCHEMA,
+    CRN_BLOCK_SIZE,
+    run_arb_profit_simulation,
+    run_arb_profit_simulation_summary,
+    compute_arb_sim_columns,
+)
+from .profiler import StageProfiler, NULL_PROFILER
+from .profit_models import DEFAULT_PROFIT_MODEL
+from .expectation import build_expected_profits_graph
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Example of a base config -> every grid cell is a copy of it with some params changed
+# {
+#     "rollup_A": {
+#         "fail_rate": 0.5,
+#         "gas_price_model": {"model_type": "constant", "gas_price_mean": 0.01},
+#         "gas_units_swap": 10.0,
+#         "gas_units_fail": 1.0,
+#         "arb_pool_reserve_x": 1000.0,
+#         "arb_pool_reserve_y": 1050.0,
+#         "arb_pool_fee": 0.005,
+#     },
+#     "rollup_B": {...},
+#     "y_price_model": {"asset_label": "Y", "fee": 0.005, "asset_price_mean": 50.0},
+#     "profit_model": "v1",  # optional, any name in profit_models.PROFIT_MODELS
+# }
+# Grid params are addressed with dotted keys, e.g. "rollup_A.fail_rate" or
+# "rollup_B.gas_price_model.gas_price_mean" ("profit_model" can be swept too)
+
+
+def build_param_grid(
+    base_config: Dict[str, Dict[str, Any]], param_grid: Dict[str, List[Any]]
+) -> List[Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]]:
+    # Cells are ordered as itertools.product of the grid values -> deterministic
+    param_names = list(param_grid.keys())
+    grid_cells = []
+    for param_values in itertools.product(*param_grid.values()):
+        cell_params = dict(zip(param_names, param_values))
+        cell_config = copy.deepcopy(base_config)
+        for param_name, param_value in cell_params.items():
+            set_config_param(cell_config, param_name, param_value)
+        grid_cells.append((cell_params, cell_config))
+    return grid_cells
+
+
+def set_config_param(config: Dict[str, Any], param_name: str, value: Any) -> None:
+    keys = param_name.split(".")
+    sub_config = config
+    for key in keys[:-1]:
+        if key not in sub_config:
+            raise KeyError(f"Unknown config section {key} in param {param_name}")
+        sub_config = sub_config[key]
+    sub_config[keys[-1]] = value
+
+
+def build_simulation_specs(
+    config: Dict[str, Dict[str, Any]],
+) -> Tuple[RollupSpec, RollupSpec, AssetPriceModel]:
+    # Empirical models can be given as {"sampling_table_path": ...} -> every worker
+    # memory-maps the same table instead of rebuilding it from the histogram
+    rollups = []
+    for rollup_name in ["rollup_A", "rollup_B"]:
+        rollup_config = dict(config[rollup_name])
+        gas_config = rollup_config.pop("gas_price_model")
+        if "sampling_table_path" in gas_config:
+            gas_price_model = GasPriceModel.from_sampling_table(
+                gas_config["sampling_table_path"]
+            )
+        else:
+            gas_price_model = GasPriceModel(**gas_config)
+        rollups.append(RollupSpec(gas_price_model=gas_price_model, **rollup_config))
+    y_config = dict(config["y_price_model"])
+    if "sampling_table_path" in y_config:
+        y_price_model = AssetPriceModel.from_sampling_table(
+            y_config.pop("sampling_table_path"), **y_config
+        )
+    else:
+        y_price_model = AssetPriceModel(**y_config)
+    return rollups[0], rollups[1], y_price_model
+
+
+def split_iters_in_chunks(n_iter: int, chunk_size: int) -> List[Tuple[int, int]]:
+    # returns (iter_offset, n_iter_chunk) pairs
+    return [
+        (iter_offset, min(chunk_size, n_iter - iter_offset))
+        for iter_offset in range(0, n_iter, chunk_size)
+    ]
+
+
+def run_sweep_chunk(
+    task: Tuple[
+        int,
+        Dict[str, Any],
+        Dict[str, Any],
+        int,
+        int,
+        np.random.SeedSequence,
+        Optional[int],
+        bool,
+    ],
+) -> Tuple[NDArray, Optional[Dict[str, Any]]]:
+    (
+        cell_idx,
+        cell_params,
+        cell_config,
+        iter_offset,
+        n_iter_chunk,
+        seed_seq,
+        crn_seed,
+        profile,
+    ) = task
+    # Each chunk profiles itself -> reports are merged in the parent process
+    profiler = StageProfiler() if profile else NULL_PROFILER
+    with profiler.stage("spec_build"):
+        rollup_A, rollup_B, y_price_model = build_simulation_specs(cell_config)
+    rng = np.random.default_rng(seed_seq)
+    # Records are compact to send back from the workers -> pandas only at the end
+    chunk_records = run_arb_profit_simulation(
+        n_iter_chunk,
+        rollup_A,
+        rollup_B,
+        y_price_model,
+        rng=rng,
+        as_records=True,
+        profit_model=cell_config.get("profit_model", DEFAULT_PROFIT_MODEL),
+        crn_seed=crn_seed,
+        iter_offset=iter_offset,
+        profile=profiler,
+    )
+    return chunk_records, profiler.get_report()
+
+
+def build_sweep_tasks(
+    n_iter: int,
+    base_config: Dict[str, Dict[str, Any]],
+    param_grid: Dict[str, List[Any]],
+    chunk_size: int = 100_000,
+    seed: Optional[int] = None,
+    common_random_numbers: bool = False,
+    profile: bool = False,
+) -> Tuple[List[Tuple], Optional[int]]:
+    # returns (tasks, crn_seed) -> one task per (cell, chunk), cells in grid order
+    grid_cells = build_param_grid(base_config, param_grid)
+    # One independent RNG stream per (cell, chunk) -> results do not depend on the
+    # number of workers or on how the chunks are scheduled
+    sweep_seed_seq = np.random.SeedSequence(seed)
+    cell_seed_seqs = sweep_seed_seq.spawn(len(grid_cells))
+    # With common random numbers the streams are addressed by iter instead, so the
+    # chunks can be aligned to the CRN blocks (no block is drawn by two chunks)
+    crn_seed = sweep_seed_seq.entropy if common_random_numbers else None
+    if crn_seed is not None:
+        chunk_size = -(-chunk_size // CRN_BLOCK_SIZE) * CRN_BLOCK_SIZE
+    iter_chunks = split_iters_in_chunks(n_iter, chunk_size)
+    tasks = []
+    for cell_idx, (cell_params, cell_config) in enumerate(grid_cells):
+        chunk_seed_seqs = cell_seed_seqs[cell_idx].spawn(len(iter_chunks))
+        for (iter_offset, n_iter_chunk), chunk_seed_seq in zip(
+            iter_chunks, chunk_seed_seqs
+        ):
+            tasks.append(
+                (
+                    cell_idx,
+                    cell_params,
+                    cell_config,
+                    iter_offset,
+                    n_iter_chunk,
+                    chunk_seed_seq,
+                    crn_seed,
+                    profile,
+                )
+            )
+    return tasks, crn_seed
+
+
+def iterate_sweep_chunks(
+    tasks: List[Tuple], n_workers: Optional[int] = None
+) -> Iterator[Tuple[NDArray, Optional[Dict[str, Any]]]]:
+    # Yields the chunk results in task order -> the output order is deterministic.
+    # At most 2 chunks per worker are in flight, so finished chunks that wait for an
+    # earlier one don't pile up in the parent
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    if n_workers == 1:
+        for task in tasks:
+            yield run_sweep_chunk(task)
+        return
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = collections.deque()
+        for task in tasks:
+            futures.append(executor.submit(run_sweep_chunk, task))
+            if len(futures) >= 2 * n_workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+def get_sweep_id_columns(
+    task: Tuple, param_grid: Dict[str, List[Any]], n_rows: int
+) -> Dict[str, NDArray]:
+    # Grid cell identifiers of the rows of one chunk -> cell index, then grid params
+    cell_idx, cell_params = task[0], task[1]
+    id_columns = {"cell": np.full(n_rows, cell_idx, dtype=np.int64)}
+    for param_name in param_grid:
+        id_columns[param_name] = np.repeat(
+            np.asarray([cell_params[param_name]]), n_rows
+        )
+    return id_columns
+
+
+def run_param_sweep(
+    n_iter: int,
+    base_config: Dict[str, Dict[str, Any]],
+    param_grid: Dict[str, List[Any]],
+    n_workers: Optional[int] = None,
+    chunk_size: int = 100_000,
+    seed: Optional[int] = None,
+    common_random_numbers: bool = False,
+    profile: bool = False,
+) -> "pd.DataFrame":
+    # profile=True attaches the stage timings summed over all chunks (worker time,
+    # not wall time) to sweep_df.attrs["profile"].
+    # common_random_numbers=True -> every cell reuses the same uniforms per iter, so
+    # the differences between cells are paired per iter (see compute_cell_diffs).
+    # The whole output is held in memory -> see run_param_sweep_to_file for big runs
+    tasks, crn_seed = build_sweep_tasks(
+        n_iter,
+        base_config,
+        param_grid,
+        chunk_size=chunk_size,
+        seed=seed,
+        common_random_numbers=common_random_numbers,
+        profile=profile,
+    )
+    chunk_results = list(iterate_sweep_chunks(tasks, n_workers))
+    chunk_records = [records for records, _ in chunk_results]
+    profiler = StageProfiler() if profile else NULL_PROFILER
+    for _, chunk_report in chunk_results:
+        if chunk_report is not None:
+            profiler.merge(chunk_report)
+    with profiler.stage("frame_assembly", n_items=sum(map(len, chunk_records))):
+        # -> an empty grid (or n_iter=0) gives an empty frame with all the columns
+        sweep_df = arb_sim_records_to_frame(
+            np.concatenate(chunk_records)
+            if chunk_records
+            else np.empty(0, dtype=ARB_SIM_RECORD_DTYPE)
+        )
+    # Add grid cell identifiers in front
+    chunk_lens = [len(records) for records in chunk_records]
+    sweep_df.insert(0, "cell", np.repeat([task[0] for task in tasks], chunk_lens))
+    for i, param_name in enumerate(param_grid.keys()):
+        param_values = np.asarray([task[1][param_name] for task in tasks])
+        sweep_df.insert(i + 1, param_name, np.repeat(param_values, chunk_lens))
+    if crn_seed is not None:
+        sweep_df.attrs["crn_seed"] = crn_seed
+    if profiler.enabled:
+        sweep_df.attrs["profile"] = profiler.get_report()
+    return sweep_df
+
+
+def run_param_sweep_to_file(
+    n_iter: int,
+    base_config: Dict[str, Dict[str, Any]],
+    param_grid: Dict[str, List[Any]],
+    path: str,
+    file_format: str = "parquet",
+    n_workers: Optional[int] = None,
+    chunk_size: int = 100_000,
+    seed: Optional[int] = None,
+    common_random_numbers: bool = False,
+    profile: bool = False,
+) -> Dict[str, Any]:
+    # Same rows as run_param_sweep, but every chunk is written to path (see
+    # sink.ArbSimSink) as soon as it is done -> memory does not grow with n_iter or
+    # the number of cells. Returns {"n_rows", "columns", "attrs"}, attrs as in
+    # sweep_df.attrs
+    tasks, crn_seed = build_sweep_tasks(
+        n_iter,
+        base_config,
+        param_grid,
+        chunk_size=chunk_size,
+        seed=seed,
+        common_random_numbers=common_random_numbers,
+        profile=profile,
+    )
+    schema = {"cell": "int64"}
+    for param_name, param_values in param_grid.items():
+        schema[param_name] = np.asarray(param_values).dtype.str
+    schema.update(ARB_SIM_SCHEMA)
+    profiler = StageProfiler() if profile else NULL_PROFILER
+    with ArbSimSink(path, schema, file_format=file_format) as sink:
+        for task, (records, chunk_report) in zip(
+            tasks, iterate_sweep_chunks(tasks, n_workers)
+        ):
+            if chunk_report is not None:
+                profiler.merge(chunk_report)
+            with profiler.stage("batch_write", n_items=len(records)):
+                batch_columns = get_sweep_id_columns(task, param_grid, len(records))
+                batch_columns.update(arb_sim_records_to_columns(records))
+                sink.write_batch(batch_columns)
+    attrs = {}
+    if crn_seed is not None:
+        attrs["crn_seed"] = crn_seed
+    if profiler.enabled:
+        attrs["profile"] = profiler.get_report()
+    return {"n_rows": sink.n_rows, "columns": list(schema), "attrs": attrs}
+
+
+def compute_cell_diffs(
+    sweep_df: "pd.DataFrame",
+    column: str = "shared_sequencing_gain",
+    ref_cell: int = 0,
+) -> "pd.DataFrame":
+    # Mean difference of column between each cell and ref_cell, with its std error.
+    # Iters are paired -> with common random numbers the noise shared by the cells
+    # cancels out. Without them the paired std error is close to the independent one
+    import pandas as pd
+
+    values = sweep_df.pivot(index="iter", columns="cell", values=column)
+    diffs = values.sub(values[ref_cell], axis=0)
+    n_iter = len(values)
+    independent_var = (values.var(ddof=1) + values[ref_cell].var(ddof=1)) / n_iter
+    diffs_df = pd.DataFrame(
+        {
+            "mean_diff": diffs.mean(),
+            "std_error": np.sqrt(diffs.var(ddof=1) / n_iter),
+            "independent_std_error": np.sqrt(independent_var),
+        }
+    )
+    diffs_df.loc[ref_cell, "independent_std_error"] = 0.0
+    return diffs_df
+
+
+def make_mean_evaluator(
+    base_config: Dict[str, Dict[str, Any]],
+    n_iter: int,
+    crn_seed: int,
+    column: str = "shared_sequencing_gain",
+) -> Callable[..., NDArray]:
+    # Monte Carlo evaluator for frontier.refine_zero_contour -> params are dotted
+    # config keys (as in the sweep grid), e.g.
+    #   refine_zero_contour(
+    #       make_mean_evaluator(base_config, 10_000, crn_seed=0),
+    #       {"rollup_A.fail_rate": (0, 1), "rollup_B.fail_rate": (0, 1)},
+    #   )
+    # Every point reuses the same uniforms -> the estimate is a deterministic
+    # function of the params, so its sign does not flip from noise between points
+    def evaluate(**params: NDArray) -> NDArray:
+        param_names = list(params.keys())
+        n_points = len(params[param_names[0]])
+        means = np.empty(n_points)
+        for i in range(n_points):
+            config = copy.deepcopy(base_config)
+            for param_name in param_names:
+                set_config_param(config, param_name, float(params[param_name][i]))
+            rollup_A, rollup_B, y_price_model = build_simulation_specs(config)
+            arb_sim_columns = compute_arb_sim_columns(
+                n_iter,
+                rollup_A,
+                rollup_B,
+                y_price_model,
+                profit_model=config.get("profit_model", DEFAULT_PROFIT_MODEL),
+                crn_seed=crn_seed,
+            )
+            means[i] = arb_sim_columns[column].mean()
+        return means
+
+    return evaluate
+
+
+def run_expected_profits_sweep(
+    base_config: Dict[str, Dict[str, Any]],
+    param_grid: Dict[str, List[Any]],
+    n_nodes: int = 10,
+) -> "pd.DataFrame":
+    # Exact expectations (expectation.compute_expected_profits) for every grid cell.
+    # Cells go through one evaluation graph -> consecutive cells mostly differ in the
+    # last grid param, and only the nodes downstream of it are recomputed. The work
+    # done and skipped per node is in sweep_df.attrs["graph_stats"]
+    import pandas as pd
+
+    graph = build_expected_profits_graph(n_nodes)
+    rows = []
+    for cell_params, cell_config in build_param_grid(base_config, param_grid):
+        # The quadrature uses the bundle (v1) trade sizes and profits
+        if cell_config.get("profit_model", DEFAULT_PROFIT_MODEL) != "v1":
+            raise AttributeError('Expected profits need the "v1" profit model')
+        rollup_A, rollup_B, y_price_model = build_simulation_specs(cell_config)
+        graph.set_inputs(
+            rollup_A=rollup_A, rollup_B=rollup_B, y_price_model=y_price_model
+        )
+        rows.append({**cell_params, **graph.get("expected_profits")})
+    sweep_df = pd.DataFrame(rows)
+    sweep_df.attrs["graph_stats"] = graph.get_stats()
+    return sweep_df
+
+
+def run_summary_cell(
+    task: Tuple[
+        Dict[str, Any], int, np.random.SeedSequence, Optional[int], Optional[float]
+    ],
+) -> ArbSimSummary:
+    cell_config, n_iter, seed_seq, crn_seed, target_std_error = task
+    rollup_A, rollup_B, y_price_model = build_simulation_specs(cell_config)
+    return run_arb_profit_simulation_summary(
+        n_iter,
+        rollup_A,
+        rollup_B,
+        y_price_model,
+        target_std_error=target_std_error,
+        rng=np.random.default_rng(seed_seq),
+        profit_model=cell_config.get("profit_model", DEFAULT_PROFIT_MODEL),
+        crn_seed=crn_seed,
+    )
+
+
+def run_summary_sweep(
+    n_iter: int,
+    base_config: Dict[str, Dict[str, Any]],
+    param_grid: Dict[str, List[Any]],
+    n_workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    common_random_numbers: bool = False,
+    target_std_error: Optional[float] = None,
+) -> "pd.DataFrame":
+    # Aggregates only (extraction.run_arb_profit_simulation_summary) -> one row per
+    # (cell, column), memory does not grow with n_iter. Cells run in parallel, each
+    # on its own RNG stream, and stop early once target_std_error is reached
+    import pandas as pd
+
+    grid_cells = build_param_grid(base_config, param_grid)
+    sweep_seed_seq = np.random.SeedSequence(seed)
+    cell_seed_seqs = sweep_seed_seq.spawn(len(grid_cells))
+    crn_seed = sweep_seed_seq.entropy if common_random_numbers else None
+    tasks = [
+        (cell_config, n_iter, cell_seed_seq, crn_seed, target_std_error)
+        for (_, cell_config), cell_seed_seq in zip(grid_cells, cell_seed_seqs)
+    ]
+    if len(tasks) == 0:
+        return pd.DataFrame(columns=["cell", *param_grid.keys(), "column"])
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    if n_workers == 1:
+        summaries = [run_summary_cell(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks))) as executor:
+            summaries = list(executor.map(run_summary_cell, tasks))
+    summary_dfs = []
+    for cell_idx, ((cell_params, _), summary) in enumerate(zip(grid_cells, summaries)):
+        summary_df = summary.to_frame().reset_index()
+        summary_df.insert(0, "cell", cell_idx)
+        for i, (param_name, param_value) in enumerate(cell_params.items()):
+            summary_df.insert(i + 1, param_name, param_value)
+        summary_df["converged"] = summary.converged
+        summary_dfs.append(summary_df)
+    sweep_df = pd.concat(summary_dfs, ignore_index=True)
+    if crn_seed is not None:
+        sweep_df.attrs["crn_seed"] = crn_seed
+    return sweep_df
@@ -0,0 +1,252 @@
+import numpy as np
+from . import cost
+from . import bundle
+from .rollup import RollupSpec
+from .asset import AssetPriceModel
+from typing import Dict, Optional, Tuple
+from numpy.typing import NDArray
+
+# Both regimes are simulated on the same draws (fail outcomes, gas, prices, noise)
+REGIMES = ["atomic", "non_atomic"]
+
+
+def apply_swaps(
+    reserve_x: NDArray,
+    reserve_y: NDArray,
+    fee: float,
+    x_in: NDArray,
+    y_in: NDArray,
+) -> Tuple[NDArray, NDArray]:
+    # Constant-product swaps, one per path (x_in and y_in are never both > 0).
+    # Returns the new reserves -> only the input after fees is added to the pool,
+    # as in swap.compute_prices_after_arb
+    x_out = reserve_x * (1 - fee) * y_in / (reserve_y + (1 - fee) * y_in)
+    y_out = reserve_y * (1 - fee) * x_in / (reserve_x + (1 - fee) * x_in)
+    new_reserve_x = reserve_x + (1 - fee) * x_in - x_out
+    new_reserve_y = reserve_y + (1 - fee) * y_in - y_out
+    return new_reserve_x, new_reserve_y
+
+
+def apply_noise_trades(
+    reserve_x: NDArray,
+    reserve_y: NDArray,
+    fee: float,
+    noise_trades: NDArray,  # relative size, > 0 sells X into the pool, < 0 sells Y
+) -> Tuple[NDArray, NDArray]:
+    x_in = np.maximum(noise_trades, 0.0) * reserve_x
+    y_in = np.maximum(-noise_trades, 0.0) * reserve_y
+    return apply_swaps(reserve_x, reserve_y, fee, x_in, y_in)
+
+
+def simulate_arb_block(
+    reserves: Dict[str, NDArray],
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    fee_stable: float,
+    fail_outcomes_A: NDArray,
+    fail_outcomes_B: NDArray,
+    gas_prices_A: NDArray,
+    gas_prices_B: NDArray,
+    y_prices: NDArray,
+    atomic: bool,
+) -> Dict[str, NDArray]:
+    # One block of arbitrage for every path -> reserves are updated in place
+    fee = rollup_A.get_arb_pool_fee()
+    x_A, y_A = reserves["reserve_x_A"], reserves["reserve_y_A"]
+    x_B, y_B = reserves["reserve_x_B"], reserves["reserve_y_B"]
+    # The pool with the higher price plays rollup A of the bundle formulae
+    # -> noise trades can flip the direction of the arbitrage
+    A_is_high = y_A / x_A >= y_B / x_B
+    x_high, y_high = np.where(A_is_high, x_A, x_B), np.where(A_is_high, y_A, y_B)
+    x_low, y_low = np.where(A_is_high, x_B, x_A), np.where(A_is_high, y_B, y_A)
+    fail_high = np.where(A_is_high, fail_outcomes_A, fail_outcomes_B)
+    fail_low = np.where(A_is_high, fail_outcomes_B, fail_outcomes_A)
+    # Compute optimal arbitrage trade sizes for all paths
+    delta_x_high, delta_y_high, delta_x_low, delta_y_low = (
+        bundle.compute_arb_trade_sizes_from_reserves(x_high, y_high, x_low, y_low, fee)
+    )
+    # -> arbitrage only when the trade itself is profitable
+    contains_arb = delta_y_high - delta_y_low > 0
+    delta_x_high = np.where(contains_arb, delta_x_high, 0.0)
+    delta_y_high = np.where(contains_arb, delta_y_high, 0.0)
+    delta_x_low = np.where(contains_arb, delta_x_low, 0.0)
+    delta_y_low = np.where(contains_arb, delta_y_low, 0.0)
+    # Compute profit of the bundle
+    pure_bundle_profits_high, pure_bundle_profits_low = (
+        bundle.compute_pure_bundle_profits_from_trades(
+            delta_x_high,
+            delta_y_high,
+            delta_x_low,
+            delta_y_low,
+            y_high / x_high,
+            y_low / x_low,
+            fail_high,
+            fail_low,
+            fee_stable,
+            y_prices,
+        )
+    )
+    if atomic:
+        bundle_profits = bundle.compute_atomic_bundle_profit(
+            pure_bundle_profits_high, pure_bundle_profits_low, fail_high, fail_low
+        )
+        arb_costs = cost.compute_atomic_arb_cost(
+            fail_outcomes_A,
+            fail_outcomes_B,
+            rollup_A,
+            rollup_B,
+            gas_prices_A,
+            gas_prices_B,
+        )
+        # -> both legs execute only if both transactions succeed
+        both_succeed = (1 - fail_high) * (1 - fail_low)
+        executes_high = both_succeed
+        executes_low = both_succeed
+    else:
+        bundle_profits = bundle.compute_non_atomic_bundle_profit(
+            pure_bundle_profits_high, pure_bundle_profits_low
+        )
+        arb_costs = cost.compute_non_atomic_arb_cost(
+            fail_outcomes_A,
+            fail_outcomes_B,
+            rollup_A,
+            rollup_B,
+            gas_prices_A,
+            gas_prices_B,
+        )
+        executes_high = 1 - fail_high
+        executes_low = 1 - fail_low
+    # -> gas is only paid when the arbitrage is attempted
+    arb_costs = arb_costs * contains_arb
+    # Apply executed legs: X is bought on the low pool and sold on the high pool
+    x_high, y_high = apply_swaps(
+        x_high, y_high, fee, delta_x_high * executes_high, np.zeros_like(x_high)
+    )
+    x_low, y_low = apply_swaps(
+        x_low, y_low, fee, np.zeros_like(x_low), delta_y_low * executes_low
+    )
+    reserves["reserve_x_A"][:] = np.where(A_is_high, x_high, x_low)
+    reserves["reserve_y_A"][:] = np.where(A_is_high, y_high, y_low)
+    reserves["reserve_x_B"][:] = np.where(A_is_high, x_low, x_high)
+    reserves["reserve_y_B"][:] = np.where(A_is_high, y_low, y_high)
+    return {
+        "contains_arb": contains_arb,
+        "profit": bundle_profits - arb_costs,
+    }
+
+
+def simulate_arb_timeseries(
+    n_blocks: int,
+    n_paths: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    noise_trade_std: float = 0.001,  # relative to the pool reserves, per block
+    rng: Optional[np.random.Generator] = None,
+    record_every: Optional[int] = None,
+) -> Dict[str, NDArray]:
+    # Steps n_blocks blocks for n_paths independent paths in parallel. Each block:
+    # noise trades hit both pools, then the arbitrageur trades the price gap and the
+    # executed legs are applied to the reserves, which carry over to the next block.
+    # Per-block outputs are averaged over paths, so memory is O(n_blocks + n_paths);
+    # record_every also keeps the path prices every record_every blocks
+    bundle.check_rollup_specs(rollup_A, rollup_B)
+    if rng is None:
+        rng = np.random.default_rng()
+    fee = rollup_A.get_arb_pool_fee()
+    fee_stable = y_price_model.get_trading_fee()
+    # Preallocate path state -> one set of reserves per regime
+    x_A, y_A = rollup_A.get_arb_pool_reserves()
+    x_B, y_B = rollup_B.get_arb_pool_reserves()
+    reserves = {
+        regime: {
+            "reserve_x_A": np.full(n_paths, x_A, dtype=float),
+            "reserve_y_A": np.full(n_paths, y_A, dtype=float),
+            "reserve_x_B": np.full(n_paths, x_B, dtype=float),
+            "reserve_y_B": np.full(n_paths, y_B, dtype=float),
+        }
+        for regime in REGIMES
+    }
+    cum_profits = {regime: np.zeros(n_paths) for regime in REGIMES}
+    # Preallocate outputs
+    timeseries = {"block": np.arange(n_blocks)}
+    for regime in REGIMES:
+        timeseries[f"{regime}_profit_mean"] = np.empty(n_blocks)
+        timeseries[f"{regime}_arb_rate"] = np.empty(n_blocks)
+        timeseries[f"{regime}_price_ratio_mean"] = np.empty(n_blocks)
+    if record_every is not None:
+        record_blocks = np.arange(record_every - 1, n_blocks, record_every)
+        timeseries["record_block"] = record_blocks
+        for regime in REGIMES:
+            for pool in ["A", "B"]:
+                timeseries[f"{regime}_price_{pool}"] = np.empty(
+                    (len(record_blocks), n_paths)
+                )
+    for block in range(n_blocks):
+        # Draw block randomness for all paths
+        fail_outcomes_A = rollup_A.generate_fail_outcomes(n_paths, rng=rng)
+        fail_outcomes_B = rollup_B.generate_fail_outcomes(n_paths, rng=rng)
+        gas_prices_A = rollup_A.generate_gas_prices(n_paths, rng=rng)
+        gas_prices_B = rollup_B.generate_gas_prices(n_paths, rng=rng)
+        y_prices = y_price_model.generate_asset_prices(n_paths, rng=rng)
+        noise_trades_A = rng.normal(0.0, noise_trade_std, n_paths)
+        noise_trades_B = rng.normal(0.0, noise_trade_std, n_paths)
+        for regime in REGIMES:
+            regime_reserves = reserves[regime]
+            for pool, noise_trades in [("A", noise_trades_A), ("B", noise_trades_B)]:
+                reserve_x, reserve_y = apply_noise_trades(
+                    regime_reserves[f"reserve_x_{pool}"],
+                    regime_reserves[f"reserve_y_{pool}"],
+                    fee,
+                    noise_trades,
+                )
+                regime_reserves[f"reserve_x_{pool}"][:] = reserve_x
+                regime_reserves[f"reserve_y_{pool}"][:] = reserve_y
+            block_result = simulate_arb_block(
+                regime_reserves,
+                rollup_A,
+                rollup_B,
+                fee_stable,
+                fail_outcomes_A,
+                fail_outcomes_B,
+                gas_prices_A,
+                gas_prices_B,
+                y_prices,
+                atomic=regime == "atomic",
+            )
+            cum_profits[regime] += block_result["profit"]
+            price_A = regime_reserves["reserve_y_A"] / regime_reserves["reserve_x_A"]
+            price_B = regime_reserves["reserve_y_B"] / regime_reserves["reserve_x_B"]
+            timeseries[f"{regime}_profit_mean"][block] = block_result["profit"].mean()
+            timeseries[f"{regime}_arb_rate"][block] = block_result[
+                "contains_arb"
+            ].mean()
+            timeseries[f"{regime}_price_ratio_mean"][block] = (price_A / price_B).mean()
+            if record_every is not None and (block + 1) % record_every == 0:
+                record_idx = (block + 1) // record_every - 1
+                timeseries[f"{regime}_price_A"][record_idx] = price_A
+                timeseries[f"{regime}_price_B"][record_idx] = price_B
+    timeseries["shared_sequencing_gain_mean"] = (
+        timeseries["atomic_profit_mean"] - timeseries["non_atomic_profit_mean"]
+    )
+    # Final path state
+    for regime in REGIMES:
+        timeseries[f"{regime}_cum_profit"] = cum_profits[regime]
+        for col, values in reserves[regime].items():
+            timeseries[f"{regime}_final_{col}"] = values
+    return timeseries
+
+
+def get_timeseries_block_frame(timeseries: Dict[str, NDArray]):
+    # Per-block columns only (the path-level arrays have other shapes)
+    import pandas as pd
+
+    block_cols = ["block"]
+    for regime in REGIMES:
+        block_cols += [
+            f"{regime}_profit_mean",
+            f"{regime}_arb_rate",
+            f"{regime}_price_ratio_mean",
+        ]
+    block_cols.append("shared_sequencing_gain_mean")
+    return pd.DataFrame({col: timeseries[col] for col in block_cols})
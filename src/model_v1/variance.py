@@ -0,0 +1,280 @@
+import numpy as np
+from . import bundle
+from .rollup import RollupSpec
+from .asset import AssetPriceModel
+from typing import Dict, Optional, Tuple, Union
+from numpy.typing import NDArray
+from .extraction import (
+    draw_uniforms,
+    compute_arb_sim_columns_from_draws,
+    compute_arb_sim_columns_from_uniforms,
+)
+
+# Pilot evaluations per outcome cell of the stratified method (also the minimum per
+# cell, so that every cell variance is estimated from enough draws)
+STRATUM_PILOT_ITERS = 20
+
+
+def estimate_shared_sequencing_gain(
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    method: str = "plain",
+    external_price: Optional[float] = None,  # used for control_variate
+    rng: Optional[np.random.Generator] = None,
+) -> Dict[str, Union[str, int, float]]:
+    # Estimates the mean shared_sequencing_gain with (at most) n_iter evaluations,
+    # n_iter in the result is the number actually used.
+    # variance_reduction_factor = (plain MC variance of the mean) / (variance of the
+    # mean with the chosen method), both for the same number of evaluations
+    if method not in ["plain", "antithetic", "stratified", "control_variate"]:
+        raise AttributeError(
+            'method should be "plain", "antithetic", "stratified" or "control_variate"'
+        )
+    # -> the variance of the mean needs at least 2 draws (2 pairs for antithetic)
+    if method == "antithetic" and (n_iter < 4 or n_iter % 2 != 0):
+        raise AttributeError("n_iter should be even and at least 4 for antithetic")
+    if n_iter < 2:
+        raise AttributeError("n_iter should be at least 2")
+    if rng is None:
+        rng = np.random.default_rng()
+    n_evals = n_iter
+    if method == "plain":
+        gains = compute_gains_from_uniforms(
+            rollup_A, rollup_B, y_price_model, draw_uniforms(n_iter, rng)
+        )
+        gain_mean = gains.mean()
+        gain_mean_var = gains.var(ddof=1) / n_iter
+        plain_mean_var = gain_mean_var
+    elif method == "antithetic":
+        # Each draw is paired with its mirrored draw (u -> 1 - u) in every stream
+        n_pairs = n_iter // 2
+        uniforms = draw_uniforms(n_pairs, rng)
+        gains = compute_gains_from_uniforms(rollup_A, rollup_B, y_price_model, uniforms)
+        mirrored_gains = compute_gains_from_uniforms(
+            rollup_A, rollup_B, y_price_model, 1 - uniforms
+        )
+        pair_means = (gains + mirrored_gains) / 2
+        gain_mean = pair_means.mean()
+        gain_mean_var = pair_means.var(ddof=1) / n_pairs
+        plain_mean_var = np.concatenate([gains, mirrored_gains]).var(ddof=1) / (
+            2 * n_pairs
+        )
+    elif method == "stratified":
+        gain_mean, gain_mean_var, plain_mean_var, n_evals = estimate_stratified_gain(
+            n_iter, rollup_A, rollup_B, y_price_model, rng
+        )
+    elif method == "control_variate":
+        gain_mean, gain_mean_var, plain_mean_var = estimate_control_variate_gain(
+            n_iter, rollup_A, rollup_B, y_price_model, external_price, rng
+        )
+    if gain_mean_var > 0:
+        variance_reduction_factor = plain_mean_var / gain_mean_var
+    else:
+        variance_reduction_factor = np.inf if plain_mean_var > 0 else 1.0
+    return {
+        "method": method,
+        "n_iter": n_evals,
+        "mean": gain_mean,
+        "std_error": np.sqrt(gain_mean_var),
+        "variance_reduction_factor": variance_reduction_factor,
+    }
+
+
+def compute_gains_from_uniforms(
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    uniforms: NDArray,
+) -> NDArray:
+    arb_sim_columns = compute_arb_sim_columns_from_uniforms(
+        rollup_A, rollup_B, y_price_model, uniforms
+    )
+    return arb_sim_columns["shared_sequencing_gain"]
+
+
+def estimate_stratified_gain(
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    rng: np.random.Generator,
+) -> Tuple[float, float, float, int]:
+    # Strata are the four (fail_A, fail_B) outcome cells. A pilot of
+    # STRATUM_PILOT_ITERS evaluations per cell estimates the cell std devs, the rest
+    # of n_iter is spent with Neyman allocation (n_cell ~ cell_prob * cell_std).
+    # returns (mean, variance of the mean, plain MC variance of the mean, number of
+    # evaluations) -> plain MC is compared at the evaluations actually used
+    fail_rate_A = rollup_A.get_fail_rate()
+    fail_rate_B = rollup_B.get_fail_rate()
+    cells = []
+    for fail_outcome_A in [0, 1]:
+        for fail_outcome_B in [0, 1]:
+            cell_prob = (fail_rate_A if fail_outcome_A else 1 - fail_rate_A) * (
+                fail_rate_B if fail_outcome_B else 1 - fail_rate_B
+            )
+            if cell_prob > 0:
+                cells.append((fail_outcome_A, fail_outcome_B, cell_prob))
+    if n_iter < 2 * STRATUM_PILOT_ITERS * len(cells):
+        raise AttributeError(
+            f"n_iter should be at least {2 * STRATUM_PILOT_ITERS * len(cells)} for "
+            f"the stratified method ({len(cells)} outcome cells)"
+        )
+    cell_probs = np.array([cell_prob for _, _, cell_prob in cells])
+    cell_gains = [
+        compute_stratum_gains(
+            rollup_A, rollup_B, y_price_model, fail_A, fail_B, STRATUM_PILOT_ITERS, rng
+        )
+        for fail_A, fail_B, _ in cells
+    ]
+    # Neyman allocation of the remaining evaluations -> only cells below their target
+    # get more (zero variance everywhere -> proportional allocation)
+    allocation_weights = cell_probs * np.array([gains.std() for gains in cell_gains])
+    if allocation_weights.sum() == 0:
+        allocation_weights = cell_probs
+    target_n_cells = n_iter * allocation_weights / allocation_weights.sum()
+    deficits = np.maximum(target_n_cells - STRATUM_PILOT_ITERS, 0)
+    n_remaining = n_iter - STRATUM_PILOT_ITERS * len(cells)
+    if deficits.sum() > 0:
+        n_extra_cells = np.floor(n_remaining * deficits / deficits.sum()).astype(int)
+    else:
+        n_extra_cells = np.zeros(len(cells), dtype=int)
+    for i, (fail_A, fail_B, _) in enumerate(cells):
+        if n_extra_cells[i] > 0:
+            extra_gains = compute_stratum_gains(
+                rollup_A, rollup_B, y_price_model, fail_A, fail_B, n_extra_cells[i], rng
+            )
+            cell_gains[i] = np.concatenate([cell_gains[i], extra_gains])
+    cell_means = np.array([gains.mean() for gains in cell_gains])
+    cell_vars = np.array([gains.var(ddof=1) for gains in cell_gains])
+    n_cells = np.array([len(gains) for gains in cell_gains])
+    n_evals = int(n_cells.sum())
+    gain_mean = np.sum(cell_probs * cell_means)
+    gain_mean_var = np.sum(cell_probs**2 * cell_vars / n_cells)
+    # Plain MC variance = within-cell variance + between-cell variance
+    within_var = np.sum(cell_probs * cell_vars)
+    between_var = np.sum(cell_probs * (cell_means - gain_mean) ** 2)
+    plain_mean_var = (within_var + between_var) / n_evals
+    return gain_mean, gain_mean_var, plain_mean_var, n_evals
+
+
+def compute_stratum_gains(
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    fail_outcome_A: int,
+    fail_outcome_B: int,
+    n_cell: int,
+    rng: np.random.Generator,
+) -> NDArray:
+    # Gains of n_cell iters with both failure outcomes fixed
+    uniforms = draw_uniforms(n_cell, rng)
+    return compute_arb_sim_columns_from_draws(
+        rollup_A,
+        rollup_B,
+        y_price_model,
+        np.full(n_cell, fail_outcome_A),
+        np.full(n_cell, fail_outcome_B),
+        rollup_A.get_gas_price_model().gas_prices_from_uniforms(
+            uniforms[:, 2], uniforms[:, 3]
+        ),
+        rollup_B.get_gas_price_model().gas_prices_from_uniforms(
+            uniforms[:, 4], uniforms[:, 5]
+        ),
+        y_price_model.asset_prices_from_uniforms(uniforms[:, 6], uniforms[:, 7]),
+    )["shared_sequencing_gain"]
+
+
+def estimate_control_variate_gain(
+    n_iter: int,
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    y_price_model: AssetPriceModel,
+    external_price: Optional[float],
+    rng: np.random.Generator,
+) -> Tuple[float, float, float]:
+    # Control: liquidity-based shared sequencing diff of the same failure draws,
+    # whose expectation is known in closed form
+    if external_price is None:
+        external_price = (
+            rollup_A.get_arb_pool_price_in_y_units()
+            + rollup_B.get_arb_pool_price_in_y_units()
+        ) / 2
+    uniforms = draw_uniforms(n_iter, rng)
+    arb_sim_columns = compute_arb_sim_columns_from_uniforms(
+        rollup_A, rollup_B, y_price_model, uniforms
+    )
+    gains = arb_sim_columns["shared_sequencing_gain"]
+    controls = compute_liquidity_diffs_control(
+        rollup_A,
+        rollup_B,
+        arb_sim_columns["fail_outcome_A"],
+        arb_sim_columns["fail_outcome_B"],
+        external_price,
+    )
+    expected_control = compute_expected_liquidity_diff(
+        rollup_A, rollup_B, external_price
+    )
+    control_var = controls.var(ddof=1)
+    if control_var > 0:
+        beta = np.cov(gains, controls)[0, 1] / control_var
+    else:
+        beta = 0.0
+    adjusted_gains = gains - beta * (controls - expected_control)
+    gain_mean = adjusted_gains.mean()
+    gain_mean_var = adjusted_gains.var(ddof=1) / n_iter
+    plain_mean_var = gains.var(ddof=1) / n_iter
+    return gain_mean, gain_mean_var, plain_mean_var
+
+
+def compute_liquidity_diffs_control(
+    rollup_A: RollupSpec,
+    rollup_B: RollupSpec,
+    fail_outcomes_A: NDArray,
+    fail_outcomes_B: NDArray,
+    external_price: float,
+) -> NDArray:
+    # Atomic minus non-atomic liquidity change of the arbitrageur, valued in y units
+    trade_sizes_dict = bundle.compute_arb_trade_sizes(rollup_A, rollup_B)
+    delta_x_A = trade_sizes_dict["delta_x_A"]
+    delta_y_A = trade_sizes_dict["delta_y_A"]
+    delta_x_B = trade_sizes_dict["delta_x_B"]
+    delta_y_B = trade_sizes_dict["delta_y_B"]
+    both_succeed = (1 - fail_outcomes_A) * (1 - fail_outcomes_B)
+    liq_diff_x_atomic = (delta_x_B - delta_x_A) * both_succeed
+    liq_diff_y_atomic = (delta_y_A - delta_y_B) * both_succeed
+    liq_diff_x_non_atomic = delta_x_B * (1 - fail_outcomes_B) - delta_x_A * (
+        1 - fail_outcomes_A
+    )
+    liq_diff_y_non_atomic = delta_y_A * (1 - fail_outcomes_A) - delta_y_B * (
+        1 - fail_outcomes_B
+    )
+    liq_diffs = (liq_diff_x_atomic - liq_diff_x_non_atomic) * external_price + (
+        liq_diff_y_atomic - liq_diff_y_non_atomic
+    )
+    return liq_diffs
+
+
+def compute_expected_liquidity_diff(
+    rollup_A: RollupSpec, rollup_B: RollupSpec, external_price: float
+) -> float:
+    # Same closed form as compute_expected_profit_diff in src/extraction.py
+    trade_sizes_dict = bundle.compute_arb_trade_sizes(rollup_A, rollup_B)
+    delta_x_A = trade_sizes_dict["delta_x_A"]
+    delta_y_A = trade_sizes_dict["delta_y_A"]
+    delta_x_B = trade_sizes_dict["delta_x_B"]
+    delta_y_B = trade_sizes_dict["delta_y_B"]
+    # Compute prices experienced by arbitrageur
+    arb_price_A = delta_y_A / delta_x_A
+    arb_price_B = delta_y_B / delta_x_B
+    # Get failure rates
+    fail_rate_A = rollup_A.get_fail_rate()
+    fail_rate_B = rollup_B.get_fail_rate()
+    # compute expected profit diff -> check paper for full derivation
+    profit_diff = delta_x_B * (
+        fail_rate_A * (arb_price_B - external_price)
+        + fail_rate_B * (external_price - arb_price_A)
+        + fail_rate_A * fail_rate_B * (arb_price_A - arb_price_B)
+    )
+    return profit_diff
@@ -0,0 +1,176 @@
+import numpy as np
+from rollup import RollupSpec
+from typing import Dict, List, Tuple, Union
+from numpy.typing import NDArray
+
+# Relative width of the clearing price bracket at which the bisection stops
+CLEARING_PRICE_TOL = 1e-12
+
+
+def get_pool_arrays(rollups: List[RollupSpec]) -> Tuple[NDArray, NDArray, NDArray]:
+    # One entry per pool -> a rollup with several pools is passed as several specs
+    reserve_x = np.array([rollup.get_arb_pool_reserves()[0] for rollup in rollups])
+    reserve_y = np.array([rollup.get_arb_pool_reserves()[1] for rollup in rollups])
+    fee = np.array([rollup.get_arb_pool_fee() for rollup in rollups])
+    return reserve_x.astype(float), reserve_y.astype(float), fee.astype(float)
+
+
+def compute_pair_arb_trade_sizes(
+    x_A: Union[float, NDArray],
+    y_A: Union[float, NDArray],
+    fee_A: Union[float, NDArray],
+    x_B: Union[float, NDArray],
+    y_B: Union[float, NDArray],
+    fee_B: Union[float, NDArray],
+) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+    # Same trade as swap.compute_arb_trade_sizes_from_reserves (pay delta_y_B into B,
+    # sell delta_x_A = delta_x_B into A), but the fees can differ. The y received
+    # from A is K * d / (a + b * d) for d = delta_y_B, so the optimum is
+    # a + b * d = sqrt(K * a). Trade sizes are zero when there is no arbitrage.
+    gamma_A = 1 - fee_A
+    gamma_B = 1 - fee_B
+    K = y_A * x_B * gamma_A * gamma_B
+    a = x_A * y_B
+    b = gamma_B * x_A + gamma_A * gamma_B * x_B
+    delta_y_B = np.where(K > a, (np.sqrt(K * a) - a) / b, 0.0)
+    delta_x_B = (x_B * gamma_B * delta_y_B) / (y_B + gamma_B * delta_y_B)
+    delta_x_A = delta_x_B
+    delta_y_A = (y_A * gamma_A * delta_x_A) / (x_A + gamma_A * delta_x_A)
+    return delta_x_A, delta_y_A, delta_x_B, delta_y_B
+
+
+def scan_arb_pairs(
+    reserve_x: NDArray, reserve_y: NDArray, fee: NDArray
+) -> Dict[str, NDArray]:
+    # All N^2 ordered pairs at once -> entry [i, j] sells X into pool i and buys X
+    # from pool j (i.e. pool i plays rollup A and pool j plays rollup B)
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = compute_pair_arb_trade_sizes(
+        reserve_x[:, None],
+        reserve_y[:, None],
+        fee[:, None],
+        reserve_x[None, :],
+        reserve_y[None, :],
+        fee[None, :],
+    )
+    return {
+        "delta_x_A": delta_x_A,
+        "delta_y_A": delta_y_A,
+        "delta_x_B": delta_x_B,
+        "delta_y_B": delta_y_B,
+        "profit_y": delta_y_A - delta_y_B,
+    }
+
+
+def compute_pool_trades_at_price(
+    reserve_x: NDArray, reserve_y: NDArray, fee: NDArray, price: float
+) -> Tuple[NDArray, NDArray]:
+    # Trades that move the fee-adjusted marginal price of every pool to price.
+    # Returns the X and Y received by the arbitrageur from each pool (negative when
+    # paid into the pool)
+    gamma = 1 - fee
+    # Sell X into pools whose bid (gamma * y / x) is above price
+    x_sold = np.maximum(
+        (np.sqrt(gamma * reserve_x * reserve_y / price) - reserve_x) / gamma, 0.0
+    )
+    y_received = reserve_y * gamma * x_sold / (reserve_x + gamma * x_sold)
+    # Buy X from pools whose ask (y / (gamma * x)) is below price
+    y_paid = np.maximum(
+        (np.sqrt(gamma * reserve_x * reserve_y * price) - reserve_y) / gamma, 0.0
+    )
+    x_received = reserve_x * gamma * y_paid / (reserve_y + gamma * y_paid)
+    return x_received - x_sold, y_received - y_paid
+
+
+def compute_multi_pool_arb(
+    reserve_x: NDArray,
+    reserve_y: NDArray,
+    fee: NDArray,
+    tol: float = CLEARING_PRICE_TOL,
+    max_iter: int = 200,
+) -> Dict[str, Union[float, NDArray]]:
+    # Optimal arbitrage over all pools at once: no closed form, so the clearing price
+    # at which the X bought equals the X sold is found by bisection (the net X
+    # received is increasing in the price)
+    gamma = 1 - fee
+    price_low = np.min(reserve_y / (gamma * reserve_x))  # lowest ask
+    price_high = np.max(gamma * reserve_y / reserve_x)  # highest bid
+    if price_low >= price_high:
+        n_pools = len(reserve_x)
+        return {
+            "clearing_price": np.nan,
+            "delta_x": np.zeros(n_pools),
+            "delta_y": np.zeros(n_pools),
+            "profit_y": 0.0,
+        }
+    for _ in range(max_iter):
+        price = np.sqrt(price_low * price_high)
+        delta_x, _ = compute_pool_trades_at_price(reserve_x, reserve_y, fee, price)
+        if delta_x.sum() > 0:
+            price_high = price
+        else:
+            price_low = price
+        if price_high - price_low <= tol * price:
+            break
+    price = np.sqrt(price_low * price_high)
+    delta_x, delta_y = compute_pool_trades_at_price(reserve_x, reserve_y, fee, price)
+    return {
+        "clearing_price": price,
+        "delta_x": delta_x,
+        "delta_y": delta_y,
+        # -> X left over from the bisection tolerance is valued at the clearing price
+        "profit_y": delta_y.sum() + delta_x.sum() * price,
+    }
+
+
+def find_best_arb_route(
+    rollups: List[RollupSpec], method: str = "pair"
+) -> Dict[str, Union[str, float, NDArray]]:
+    # method="pair": most profitable two-pool arbitrage (closed form, any fees)
+    # method="multi_pool": trade against every mispriced pool at once (bisection)
+    # delta_x / delta_y are the X and Y received from each pool of the route
+    if method not in ["pair", "multi_pool"]:
+        raise AttributeError('method should be "pair" or "multi_pool"')
+    reserve_x, reserve_y, fee = get_pool_arrays(rollups)
+    if method == "pair":
+        arb_pairs = scan_arb_pairs(reserve_x, reserve_y, fee)
+        idx_A, idx_B = np.unravel_index(
+            np.argmax(arb_pairs["profit_y"]), arb_pairs["profit_y"].shape
+        )
+        profit_y = arb_pairs["profit_y"][idx_A, idx_B]
+        if profit_y <= 0:
+            pool_idx = np.array([], dtype=np.int64)
+            delta_x = np.array([])
+            delta_y = np.array([])
+        else:
+            pool_idx = np.array([idx_A, idx_B])
+            delta_x = np.array(
+                [
+                    -arb_pairs["delta_x_A"][idx_A, idx_B],
+                    arb_pairs["delta_x_B"][idx_A, idx_B],
+                ]
+            )
+            delta_y = np.array(
+                [
+                    arb_pairs["delta_y_A"][idx_A, idx_B],
+                    -arb_pairs["delta_y_B"][idx_A, idx_B],
+                ]
+            )
+        return {
+            "method": method,
+            "pool_idx": pool_idx,
+            "delta_x": delta_x,
+            "delta_y": delta_y,
+            "profit_y": max(float(profit_y), 0.0),
+        }
+    elif method == "multi_pool":
+        multi_pool_arb = compute_multi_pool_arb(reserve_x, reserve_y, fee)
+        pool_idx = np.flatnonzero(
+            (multi_pool_arb["delta_x"] != 0) | (multi_pool_arb["delta_y"] != 0)
+        )
+        return {
+            "method": method,
+            "pool_idx": pool_idx,
+            "delta_x": multi_pool_arb["delta_x"][pool_idx],
+            "delta_y": multi_pool_arb["delta_y"][pool_idx],
+            "profit_y": float(multi_pool_arb["profit_y"]),
+        }
@@ -1,41 +1,42 @@
-import math
+from model_v1 import kernels  # shared with the v1 model
 from rollup import RollupSpec
-from typing import Tuple
-
-
-def check_rollup_specs(
-    rollup_A: RollupSpec,
-    rollup_B: RollupSpec,
-) -> None:
-    price_A = rollup_A.get_arb_pool_price_in_y_units()
-    price_B = rollup_B.get_arb_pool_price_in_y_units()
-    if price_A <= price_B:
-        raise Exception(
-            "The pool on rollup A must have a higher price than the pool on rollup B"
-        )
-    if rollup_A.get_arb_pool_fee() != rollup_B.get_arb_pool_fee():
-        raise Exception(
-            "The pools on both rollups must have the same fee. The bundle profit formulae makes this assumption!"
-        )
+from typing import Tuple, Union
+from numpy.typing import NDArray
+from model_v1.pool import (  # pool math cache shared with the v1 model
+    PoolState,
+    check_rollup_specs,
+    check_pool_state,
+    compute_for_pool_state,
+    get_pool_cache_info,
+    clear_pool_cache,
+)
 
 
 def compute_arb_trade_sizes(
     rollup_A: RollupSpec, rollup_B: RollupSpec
 ) -> Tuple[float, float, float, float]:
-    # Raise exceptions if some specs are not correct
-    check_rollup_specs(rollup_A, rollup_B)
-    # Get pool reserves and fee
-    x_A, y_A = rollup_A.get_arb_pool_reserves()
-    x_B, y_B = rollup_B.get_arb_pool_reserves()
-    fee = rollup_A.get_arb_pool_fee()  # should be the same in both rollups!
-    # Compute optimal arbitrage trade sizes -> check paper for full derivation!
-    delta_y_B = ((1 - fee) * math.sqrt(x_A * y_A * x_B * y_B) - x_A * y_B) / (
-        (1 - fee) * x_A + ((1 - fee) ** 2) * x_B
+    return compute_arb_trade_sizes_for_pool_state(
+        PoolState.from_rollups(rollup_A, rollup_B)
     )
-    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
-    delta_x_A = delta_x_B
-    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
-    return delta_x_A, delta_y_A, delta_x_B, delta_y_B
+
+
+def compute_arb_trade_sizes_for_pool_state(
+    pool_state: PoolState,
+) -> Tuple[float, float, float, float]:
+    # Cached per pool state (raises exceptions if some specs are not correct)
+    return compute_for_pool_state(kernels.compute_arb_trade_sizes, pool_state)
+
+
+def compute_arb_trade_sizes_from_reserves(
+    x_A: Union[float, NDArray],
+    y_A: Union[float, NDArray],
+    x_B: Union[float, NDArray],
+    y_B: Union[float, NDArray],
+    fee: Union[float, NDArray],
+) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+    # Reserves and fee can be scalars or broadcastable arrays (i.e. grid of pools)
+    # Compute optimal arbitrage trade sizes -> check paper for full derivation!
+    return kernels.compute_arb_trade_sizes(x_A, y_A, x_B, y_B, fee)
 
 
 def compute_prices_after_arb(
@@ -58,20 +59,46 @@ def compute_prices_after_arb(
     return price_end_A, price_end_B
 
 
+def compute_prices_after_arb_for_pool_state(
+    pool_state: PoolState,
+) -> Tuple[float, float]:
+    # Prices after the optimal arbitrage trade, cached per pool state
+    return compute_for_pool_state(kernels.compute_prices_after_arb, pool_state)
+
+
+def compute_prices_after_arb_from_reserves(
+    x_A: Union[float, NDArray],
+    y_A: Union[float, NDArray],
+    x_B: Union[float, NDArray],
+    y_B: Union[float, NDArray],
+    fee: Union[float, NDArray],
+) -> Tuple[NDArray, NDArray]:
+    # Reserves and fee can be scalars or broadcastable arrays (i.e. grid of pools)
+    return kernels.compute_prices_after_arb(x_A, y_A, x_B, y_B, fee)
+
+
 def compute_arb_opportunity_threshold(
     rollup_A: RollupSpec, rollup_B: RollupSpec
 ) -> float:
-    # Raise exceptions if some specs are not correct
-    check_rollup_specs(rollup_A, rollup_B)
-    # Get pool reserves and fee
-    x_A, y_A = rollup_A.get_arb_pool_reserves()
-    x_B, y_B = rollup_B.get_arb_pool_reserves()
-    fee = rollup_A.get_arb_pool_fee()
-    # Compute threshold
-    thres_num = x_B * y_A * (1 - fee) * (1 - fee)
-    thres_denum = math.sqrt(x_A * y_A * x_B * y_B)
-    threshold = thres_num / thres_denum
-    return threshold
+    return compute_arb_opportunity_threshold_for_pool_state(
+        PoolState.from_rollups(rollup_A, rollup_B)
+    )
+
+
+def compute_arb_opportunity_threshold_for_pool_state(pool_state: PoolState) -> float:
+    # Cached per pool state (raises exceptions if some specs are not correct)
+    return compute_for_pool_state(kernels.compute_arb_opportunity_threshold, pool_state)
+
+
+def compute_arb_opportunity_threshold_from_reserves(
+    x_A: Union[float, NDArray],
+    y_A: Union[float, NDArray],
+    x_B: Union[float, NDArray],
+    y_B: Union[float, NDArray],
+    fee: Union[float, NDArray],
+) -> Union[float, NDArray]:
+    # Reserves and fee can be scalars or broadcastable arrays (i.e. grid of pools)
+    return kernels.compute_arb_opportunity_threshold(x_A, y_A, x_B, y_B, fee)
 
 
 def contains_arb_opportunity(rollup_A: RollupSpec, rollup_B: RollupSpec) -> bool:
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The models are imported from a checkout: the v0 modules by their flat names (as in
+# the notebooks) and the v1 model as the model_v1 package
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "src")
+)
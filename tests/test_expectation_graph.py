@@ -0,0 +1,70 @@
+import numpy as np
+from model_v1 import sweep
+from model_v1.gas import GasPriceModel
+from model_v1.asset import AssetPriceModel
+from model_v1.expectation import (
+    build_expected_profits_graph,
+    compute_expected_profits,
+)
+
+
+def make_histogram(mean, std, n_buckets=50):
+    vals = np.linspace(mean - 4 * std, mean + 4 * std, n_buckets)
+    counts = np.round(1e4 * np.exp(-0.5 * ((vals - mean) / std) ** 2)) + 1
+    return list(zip(vals, counts))
+
+
+def make_table_backed_config(tmp_path):
+    # Empirical models saved as sampling tables -> no histogram in the config
+    gas_table_path = str(tmp_path / "gas.npy")
+    GasPriceModel(
+        model_type="empirical", gas_price_histogram=make_histogram(0.01, 0.001)
+    ).save_sampling_table(gas_table_path)
+    y_table_path = str(tmp_path / "y.npy")
+    AssetPriceModel(
+        "Y", 0.005, model_type="empirical", asset_price_histogram=make_histogram(50, 5)
+    ).save_sampling_table(y_table_path)
+    rollup_config = {
+        "fail_rate": 0.5,
+        "gas_price_model": {"sampling_table_path": gas_table_path},
+        "gas_units_swap": 10.0,
+        "gas_units_fail": 1.0,
+        "arb_pool_reserve_x": 1000.0,
+        "arb_pool_reserve_y": 1050.0,
+        "arb_pool_fee": 0.005,
+    }
+    return {
+        "rollup_A": rollup_config,
+        "rollup_B": dict(rollup_config, arb_pool_reserve_y=1000.0),
+        "y_price_model": {
+            "sampling_table_path": y_table_path,
+            "asset_label": "Y",
+            "fee": 0.005,
+        },
+    }
+
+
+def test_graph_matches_compute_expected_profits_for_table_backed_models(tmp_path):
+    config = make_table_backed_config(tmp_path)
+    rollup_A, rollup_B, y_price_model = sweep.build_simulation_specs(config)
+    expected_profits = compute_expected_profits(rollup_A, rollup_B, y_price_model)
+    graph = build_expected_profits_graph()
+    graph.set_inputs(rollup_A=rollup_A, rollup_B=rollup_B, y_price_model=y_price_model)
+    graph_profits = graph.get("expected_profits")
+    assert np.isfinite(expected_profits["shared_sequencing_gain"])
+    for key, value in expected_profits.items():
+        assert graph_profits[key] == value
+
+
+def test_expected_profits_sweep_matches_per_cell_for_table_backed_models(tmp_path):
+    config = make_table_backed_config(tmp_path)
+    param_grid = {"rollup_A.fail_rate": [0.1, 0.5], "rollup_B.fail_rate": [0.2, 0.9]}
+    sweep_df = sweep.run_expected_profits_sweep(config, param_grid)
+    for row, (_, cell_config) in zip(
+        sweep_df.to_dict("records"), sweep.build_param_grid(config, param_grid)
+    ):
+        expected_profits = compute_expected_profits(
+            *sweep.build_simulation_specs(cell_config)
+        )
+        for key, value in expected_profits.items():
+            assert row[key] == value
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from model_v1 import sweep
+from model_v1.extraction import (
+    CRN_BLOCK_SIZE,
+    draw_common_uniforms,
+    run_arb_profit_simulation,
+)
+
+BASE_CONFIG = {
+    "rollup_A": {
+        "fail_rate": 0.3,
+        "gas_price_model": {
+            "model_type": "gaussian",
+            "gas_price_mean": 0.05,
+            "gas_price_std": 0.01,
+        },
+        "gas_units_swap": 10.0,
+        "gas_units_fail": 1.0,
+        "arb_pool_reserve_x": 1000.0,
+        "arb_pool_reserve_y": 1050.0,
+        "arb_pool_fee": 0.005,
+    },
+    "rollup_B": {
+        "fail_rate": 0.5,
+        "gas_price_model": {"model_type": "constant", "gas_price_mean": 0.02},
+        "gas_units_swap": 10.0,
+        "gas_units_fail": 1.0,
+        "arb_pool_reserve_x": 1000.0,
+        "arb_pool_reserve_y": 1000.0,
+        "arb_pool_fee": 0.005,
+    },
+    "y_price_model": {
+        "asset_label": "Y",
+        "fee": 0.005,
+        "model_type": "gaussian",
+        "asset_price_mean": 50.0,
+        "asset_price_std": 5.0,
+    },
+}
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000, CRN_BLOCK_SIZE - 1, 40_000])
+def test_common_uniforms_do_not_depend_on_chunking(chunk_size):
+    n_iter = 2 * CRN_BLOCK_SIZE + 100
+    iter_offset = CRN_BLOCK_SIZE // 2  # -> chunks straddle the block boundaries
+    uniforms = draw_common_uniforms(n_iter, crn_seed=42, iter_offset=iter_offset)
+    chunked_uniforms = [
+        draw_common_uniforms(n_iter_chunk, crn_seed=42, iter_offset=iter_offset + i)
+        for i, n_iter_chunk in sweep.split_iters_in_chunks(n_iter, chunk_size)
+    ]
+    np.testing.assert_array_equal(np.concatenate(chunked_uniforms), uniforms)
+    assert uniforms.shape == (n_iter, 8)
+    assert 0 < uniforms.min() and uniforms.max() < 1
+    # Other seeds give other streams, and cached blocks can't be changed by callers
+    assert not np.array_equal(
+        draw_common_uniforms(n_iter, crn_seed=43, iter_offset=iter_offset), uniforms
+    )
+    with pytest.raises(ValueError):
+        draw_common_uniforms(10, crn_seed=42)[0, 0] = 0.5
+
+
+def test_common_random_number_runs_do_not_depend_on_chunking():
+    rollup_A, rollup_B, y_price_model = sweep.build_simulation_specs(BASE_CONFIG)
+    n_iter = 3000
+    records = run_arb_profit_simulation(
+        n_iter, rollup_A, rollup_B, y_price_model, as_records=True, crn_seed=7
+    )
+    chunked_records = np.concatenate(
+        [
+            run_arb_profit_simulation(
+                n_iter_chunk,
+                rollup_A,
+                rollup_B,
+                y_price_model,
+                rng=np.random.default_rng(iter_offset),  # -> unused with crn_seed
+                as_records=True,
+                crn_seed=7,
+                iter_offset=iter_offset,
+            )
+            for iter_offset, n_iter_chunk in sweep.split_iters_in_chunks(n_iter, 700)
+        ]
+    )
+    np.testing.assert_array_equal(chunked_records, records)
+    # Same uniforms per iter in every cell of a sweep, whatever the chunk size
+    sweep_dfs = [
+        sweep.run_param_sweep(
+            n_iter,
+            BASE_CONFIG,
+            {"rollup_A.fail_rate": [0.3, 0.6]},
+            n_workers=1,
+            chunk_size=chunk_size,
+            seed=7,
+            common_random_numbers=True,
+        )
+        for chunk_size in [500, n_iter]
+    ]
+    assert sweep_dfs[0].equals(sweep_dfs[1])
+    cell_gas_prices = sweep_dfs[0].pivot(
+        index="iter", columns="cell", values="gas_price_A"
+    )
+    np.testing.assert_array_equal(cell_gas_prices[0], cell_gas_prices[1])
@@ -0,0 +1,46 @@
+import numpy as np
+from model_v1.frontier import refine_zero_contour
+
+
+def test_frontier_finds_circle():
+    center, radius, tol = np.array([0.3, 0.6]), 0.25, 0.002
+
+    def evaluate(a, b):
+        return (a - center[0]) ** 2 + (b - center[1]) ** 2 - radius**2
+
+    frontier = refine_zero_contour(evaluate, {"a": (0, 1), "b": (0, 1)}, tol=tol)
+    assert frontier["param_names"] == ["a", "b"]
+    offsets = frontier["frontier_points"] - center
+    # Crossings are on the circle (up to the interpolation error) ...
+    np.testing.assert_allclose(np.hypot(*offsets.T), radius, atol=tol**2)
+    # ... all around it, without gaps wider than a few cells
+    angles = np.sort(np.arctan2(offsets[:, 1], offsets[:, 0]))
+    gaps = np.diff(np.r_[angles, angles[0] + 2 * np.pi])
+    assert gaps.max() * radius < 2 * tol
+    assert np.all(frontier["cell_size"] <= tol)
+    # Finest cells hold the contour -> one of their corners is on each side
+    for cell in frontier["frontier_cells"]:
+        corners = cell + frontier["cell_size"] * np.array(
+            [[0, 0], [0, 1], [1, 0], [1, 1]]
+        )
+        values = evaluate(corners[:, 0], corners[:, 1])
+        assert values.min() <= 0 <= values.max()
+    assert frontier["n_evals"] < frontier["n_dense_evals"] / 10
+
+
+def test_frontier_finds_plane_in_3d():
+    # Linear function -> the edge interpolation is exact
+    weights = np.array([1.0, 2.0, -0.5])
+
+    def evaluate(x, y, z):
+        return weights[0] * x + weights[1] * y + weights[2] * z - 1.2
+
+    frontier = refine_zero_contour(
+        evaluate,
+        {"x": (0, 1), "y": (0, 1), "z": (-1, 1)},
+        tol={"x": 0.01, "y": 0.01, "z": 0.02},
+    )
+    frontier_points = frontier["frontier_points"]
+    assert len(frontier_points) > 0
+    np.testing.assert_allclose(frontier_points @ weights, 1.2, atol=1e-12)
+    assert frontier["n_evals"] < frontier["n_dense_evals"]
@@ -0,0 +1,204 @@
+import math
+import numpy as np
+import pytest
+import swap
+from rollup import RollupSpec
+from model_v1 import bundle, bundle_full_stable_derivation, kernels
+from model_v1.gas import GasPriceModel
+from model_v1.pool import clear_pool_cache
+from model_v1.rollup import RollupSpec as RollupSpecV1
+
+# Grid of pools with the price on rollup A above the one on rollup B
+RESERVES = [
+    (1000.0, 1050.0, 1000.0, 1000.0),
+    (1000.0, 2000.0, 1500.0, 1400.0),
+    (10.0, 11.0, 1e6, 0.9e6),
+    (5e8, 7e8, 3e3, 2e3),
+]
+FEES = [0.0, 0.003, 0.01, 0.05]
+FEES_STABLE = [0.0, 0.005, 0.02]
+
+
+# Scalar formulae of the baseline swap.py / bundle.py / bundle_full_stable_derivation.py
+def baseline_arb_trade_sizes(x_A, y_A, x_B, y_B, fee):
+    delta_y_B = ((1 - fee) * math.sqrt(x_A * y_A * x_B * y_B) - x_A * y_B) / (
+        (1 - fee) * x_A + ((1 - fee) ** 2) * x_B
+    )
+    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
+    delta_x_A = delta_x_B
+    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
+    return delta_x_A, delta_y_A, delta_x_B, delta_y_B
+
+
+def baseline_prices_after_arb(x_A, y_A, x_B, y_B, fee):
+    delta_x_A, delta_y_A, delta_x_B, delta_y_B = baseline_arb_trade_sizes(
+        x_A, y_A, x_B, y_B, fee
+    )
+    price_end_B = (y_B + (1 - fee) * delta_y_B) / (x_B - delta_x_B)
+    price_end_A = (y_A - delta_y_A) / (x_A + (1 - fee) * delta_x_A)
+    return price_end_A, price_end_B
+
+
+def baseline_arb_opportunity_threshold(x_A, y_A, x_B, y_B, fee):
+    thres_num = x_B * y_A * (1 - fee) * (1 - fee)
+    thres_denum = math.sqrt(x_A * y_A * x_B * y_B)
+    return (thres_num / thres_denum,)
+
+
+def baseline_stable_fee_arb_trade_sizes(x_A, y_A, x_B, y_B, fee, fee_stable):
+    delta_y_B_num = -x_A * y_B * (1 + fee_stable) + (1 - fee) * (
+        1 - fee_stable
+    ) * math.sqrt(x_A * y_A * x_B * y_B)
+    delta_y_B_denum = x_A * (1 + fee_stable) * (1 - fee) + x_B * (1 - fee) * (
+        1 - fee
+    ) * (1 - fee_stable)
+    delta_y_B = delta_y_B_num / delta_y_B_denum
+    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
+    delta_x_A = delta_x_B * ((1 - fee_stable) / (1 + fee_stable))
+    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
+    return delta_x_A, delta_y_A, delta_x_B, delta_y_B
+
+
+def baseline_arb_trade_sizes_v1(x_A, y_A, x_B, y_B, fee):
+    delta_y_B = (math.sqrt(x_A * y_A * x_B * y_B) - x_A * y_B) / (
+        (1 - fee) * x_A + ((1 - fee) ** 2) * x_B
+    )
+    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
+    delta_x_A = delta_x_B
+    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
+    return delta_x_A, delta_y_A, delta_x_B, delta_y_B
+
+
+def baseline_arb_trade_sizes_v2(x_A, y_A, x_B, y_B, fee):
+    price_A = y_A / x_A
+    price_B = y_B / x_B
+    delta_y_B = (math.sqrt(x_A * y_A * x_B * y_B) * (price_A / price_B) - x_A * y_B) / (
+        (1 - fee) * x_A + ((1 - fee) ** 2) * x_B
+    )
+    delta_x_B = (x_B * (1 - fee) * delta_y_B) / (y_B + (1 - fee) * delta_y_B)
+    delta_x_A = delta_x_B * (price_B / price_A)
+    delta_y_A = (y_A * (1 - fee) * delta_x_A) / (x_A + (1 - fee) * delta_x_A)
+    return delta_x_A, delta_y_A, delta_x_B, delta_y_B
+
+
+KERNELS = [
+    (kernels.compute_arb_trade_sizes, baseline_arb_trade_sizes, False),
+    (kernels.compute_prices_after_arb, baseline_prices_after_arb, False),
+    (
+        kernels.compute_arb_opportunity_threshold,
+        baseline_arb_opportunity_threshold,
+        False,
+    ),
+    (
+        kernels.compute_stable_fee_arb_trade_sizes,
+        baseline_stable_fee_arb_trade_sizes,
+        True,
+    ),
+    (kernels.compute_arb_trade_sizes_v1, baseline_arb_trade_sizes_v1, False),
+    (kernels.compute_arb_trade_sizes_v2, baseline_arb_trade_sizes_v2, False),
+]
+
+
+@pytest.fixture(params=["numpy", "numba"])
+def backend(request, monkeypatch):
+    # -> the numpy fallback is forced by hiding numba from the kernels module
+    if request.param == "numba" and kernels.numba is None:
+        pytest.skip("numba is not installed")
+    if request.param == "numpy":
+        monkeypatch.setattr(kernels, "numba", None)
+    clear_pool_cache()
+    yield request.param
+    clear_pool_cache()
+
+
+def get_grid(with_fee_stable):
+    grid = [
+        reserves + (fee,) + ((fee_stable,) if with_fee_stable else ())
+        for reserves in RESERVES
+        for fee in FEES
+        for fee_stable in (FEES_STABLE if with_fee_stable else [None])
+    ]
+    return grid
+
+
+@pytest.mark.parametrize(
+    "kernel,baseline,with_fee_stable",
+    KERNELS,
+    ids=[kernel.__name__ for kernel, _, _ in KERNELS],
+)
+def test_kernel_matches_baseline_formula(backend, kernel, baseline, with_fee_stable):
+    grid = get_grid(with_fee_stable)
+    # Whole grid in one call (arrays) and one pool at a time (python floats)
+    outputs = kernel(*np.array(grid).T)
+    if not isinstance(outputs, tuple):
+        outputs = (outputs,)
+    expected = np.array([baseline(*pool) for pool in grid]).T
+    for output, expected_output in zip(outputs, expected):
+        np.testing.assert_allclose(output, expected_output, rtol=1e-12)
+    for pool, expected_outputs in zip(grid, expected.T):
+        scalar_outputs = kernel(*pool)
+        if not isinstance(scalar_outputs, tuple):
+            scalar_outputs = (scalar_outputs,)
+        np.testing.assert_allclose(scalar_outputs, expected_outputs, rtol=1e-12)
+
+
+def test_rollup_functions_match_baseline_formulae(backend):
+    # swap.py, bundle.py and bundle_full_stable_derivation.py delegate to the kernels
+    gas_price_model = GasPriceModel()
+    for x_A, y_A, x_B, y_B, fee in get_grid(False):
+        rollup_A = RollupSpec(0.1, x_A, y_A, fee)
+        rollup_B = RollupSpec(0.1, x_B, y_B, fee)
+        pool = (x_A, y_A, x_B, y_B, fee)
+        np.testing.assert_allclose(
+            swap.compute_arb_trade_sizes(rollup_A, rollup_B),
+            baseline_arb_trade_sizes(*pool),
+            rtol=1e-12,
+        )
+        np.testing.assert_allclose(
+            swap.compute_prices_after_arb(
+                rollup_A, rollup_B, *swap.compute_arb_trade_sizes(rollup_A, rollup_B)
+            ),
+            baseline_prices_after_arb(*pool),
+            rtol=1e-12,
+        )
+        np.testing.assert_allclose(
+            swap.compute_arb_opportunity_threshold(rollup_A, rollup_B),
+            baseline_arb_opportunity_threshold(*pool)[0],
+            rtol=1e-12,
+        )
+        rollup_A = RollupSpecV1(0.1, gas_price_model, 1.0, 1.0, x_A, y_A, fee)
+        rollup_B = RollupSpecV1(0.1, gas_price_model, 1.0, 1.0, x_B, y_B, fee)
+        for trade_sizes_dict, expected_trade_sizes in [
+            (
+                bundle.compute_arb_trade_sizes(rollup_A, rollup_B),
+                baseline_arb_trade_sizes_v1(*pool),
+            ),
+            (
+                bundle_full_stable_derivation.compute_arb_trade_sizes_v1(
+                    rollup_A, rollup_B
+                ),
+                baseline_arb_trade_sizes_v1(*pool),
+            ),
+            (
+                bundle_full_stable_derivation.compute_arb_trade_sizes_v2(
+                    rollup_A, rollup_B
+                ),
+                baseline_arb_trade_sizes_v2(*pool),
+            ),
+        ] + [
+            (
+                bundle_full_stable_derivation.compute_arb_trade_sizes(
+                    rollup_A, rollup_B, fee_stable
+                ),
+                baseline_stable_fee_arb_trade_sizes(*pool, fee_stable),
+            )
+            for fee_stable in FEES_STABLE
+        ]:
+            np.testing.assert_allclose(
+                [
+                    trade_sizes_dict[key]
+                    for key in ["delta_x_A", "delta_y_A", "delta_x_B", "delta_y_B"]
+                ],
+                expected_trade_sizes,
+                rtol=1e-12,
+            )
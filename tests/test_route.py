@@ -0,0 +1,58 @@
+import numpy as np
+import route
+import swap
+from rollup import RollupSpec
+
+
+def test_pair_arb_matches_swap_with_equal_fees():
+    rng = np.random.default_rng(0)
+    n_pools = 1000
+    x_A, y_A, x_B, y_B = rng.uniform(100.0, 1e6, (4, n_pools))
+    fee = rng.choice([0.0, 0.003, 0.01, 0.05], n_pools)
+    pair_trade_sizes = route.compute_pair_arb_trade_sizes(x_A, y_A, fee, x_B, y_B, fee)
+    swap_trade_sizes = swap.compute_arb_trade_sizes_from_reserves(
+        x_A, y_A, x_B, y_B, fee
+    )
+    has_arb = swap_trade_sizes[3] > 0
+    assert 0 < has_arb.sum() < n_pools
+    for pair_trade_size, swap_trade_size in zip(pair_trade_sizes, swap_trade_sizes):
+        np.testing.assert_allclose(
+            pair_trade_size[has_arb], swap_trade_size[has_arb], rtol=1e-9
+        )
+        # -> no trade without arbitrage (the swap formulae go negative instead)
+        np.testing.assert_array_equal(pair_trade_size[~has_arb], 0.0)
+
+
+def test_multi_pool_arb_clears_every_pool_to_one_price():
+    rng = np.random.default_rng(1)
+    n_pools = 12
+    reserve_x = rng.uniform(1e3, 1e5, n_pools)
+    reserve_y = reserve_x * rng.uniform(0.8, 1.25, n_pools)
+    fee = rng.choice([0.001, 0.003, 0.01], n_pools)
+    multi_pool_arb = route.compute_multi_pool_arb(reserve_x, reserve_y, fee)
+    price = multi_pool_arb["clearing_price"]
+    delta_x = multi_pool_arb["delta_x"]
+    delta_y = multi_pool_arb["delta_y"]
+    # X bought from some pools is sold into the others
+    assert abs(delta_x.sum()) <= 1e-6 * np.abs(delta_x).sum()
+    gamma = 1 - fee
+    sold_into = delta_x < 0
+    bought_from = delta_x > 0
+    assert sold_into.any() and bought_from.any()
+    # Fees are charged on the input -> pools receive gamma times what is paid in
+    new_x = np.where(sold_into, reserve_x - gamma * delta_x, reserve_x - delta_x)
+    new_y = np.where(bought_from, reserve_y - gamma * delta_y, reserve_y - delta_y)
+    new_bid = gamma * new_y / new_x
+    new_ask = new_y / (gamma * new_x)
+    np.testing.assert_allclose(new_bid[sold_into], price, rtol=1e-9)
+    np.testing.assert_allclose(new_ask[bought_from], price, rtol=1e-9)
+    # -> pools left untouched already quote a spread around the clearing price
+    untouched = ~(sold_into | bought_from)
+    assert np.all(new_bid[untouched] <= price * (1 + 1e-9))
+    assert np.all(new_ask[untouched] >= price * (1 - 1e-9))
+    # Trading against every pool at once beats the best single pair
+    rollups = [
+        RollupSpec(0.0, reserve_x[i], reserve_y[i], fee[i]) for i in range(n_pools)
+    ]
+    pair_route = route.find_best_arb_route(rollups, method="pair")
+    assert multi_pool_arb["profit_y"] >= pair_route["profit_y"] > 0
@@ -0,0 +1,50 @@
+import pickle
+import warnings
+import numpy as np
+import pytest
+from model_v1.gas import GasPriceModel
+
+
+def test_single_bucket_histogram_is_a_point_mass():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        gas_price_model = GasPriceModel(
+            model_type="empirical", gas_price_histogram=[(0.01, 10)]
+        )
+        assert gas_price_model.bandwidth == 0.0
+        gas_prices = gas_price_model.generate_gas_prices(
+            100, rng=np.random.default_rng(0)
+        )
+        nodes, weights = gas_price_model.get_gas_price_quadrature(5)
+    np.testing.assert_array_equal(gas_prices, 0.01)
+    np.testing.assert_array_equal(nodes, 0.01)
+    assert np.isclose(weights.sum(), 1)
+
+
+@pytest.mark.parametrize("histogram", [[], [(0.01, 0)], [(0.01, -1), (0.02, 3)]])
+def test_invalid_histogram_raises(histogram):
+    with pytest.raises(Exception, match="histogram"):
+        GasPriceModel(model_type="empirical", gas_price_histogram=histogram)
+
+
+def test_table_backed_model_matches_histogram_model(tmp_path):
+    histogram = [(0.01, 1), (0.02, 3), (0.04, 2)]
+    gas_price_model = GasPriceModel(
+        model_type="empirical", gas_price_histogram=histogram
+    )
+    table_path = str(tmp_path / "gas.npy")
+    gas_price_model.save_sampling_table(table_path)
+    table_model = GasPriceModel.from_sampling_table(table_path)
+    assert table_model.get_model_type() == "empirical"
+    # -> only the table path is pickled, the table is re-mapped when unpickled
+    unpickled_model = pickle.loads(pickle.dumps(table_model))
+    assert "hist_vals" not in unpickled_model.__getstate__()
+    for model in [table_model, unpickled_model]:
+        np.testing.assert_array_equal(
+            model.generate_gas_prices(100, rng=np.random.default_rng(0)),
+            GasPriceModel(
+                model_type="empirical", gas_price_histogram=histogram
+            ).generate_gas_prices(100, rng=np.random.default_rng(0)),
+        )
+    with pytest.raises(AttributeError):
+        GasPriceModel(model_type="gaussian", sampling_table_path=table_path)
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from model_v1.service import FeedService
+
+
+def make_pair_config(arb_pool_fee_B=0.005):
+    rollup_config = {
+        "fail_rate": 0.5,
+        "gas_price_model": {"model_type": "constant", "gas_price_mean": 0.01},
+        "gas_units_swap": 10.0,
+        "gas_units_fail": 1.0,
+        "arb_pool_reserve_x": 1000.0,
+        "arb_pool_reserve_y": 1050.0,
+        "arb_pool_fee": 0.005,
+    }
+    return {
+        "chain_A": "arbitrum",
+        "chain_B": "optimism",
+        "rollup_A": rollup_config,
+        "rollup_B": dict(
+            rollup_config, arb_pool_reserve_y=1000.0, arb_pool_fee=arb_pool_fee_B
+        ),
+        "y_price_model": {"asset_label": "Y", "fee": 0.005, "asset_price_mean": 50.0},
+    }
+
+
+def make_reserves_update(reserve_x, reserve_y):
+    return {
+        "type": "reserves",
+        "pair": "arb-op",
+        "rollup": "A",
+        "reserve_x": reserve_x,
+        "reserve_y": reserve_y,
+    }
+
+
+async def iterate_updates(updates):
+    for update in updates:
+        yield update
+
+
+def run_service(service, updates):
+    results = []
+    stats = asyncio.run(
+        asyncio.wait_for(service.run(updates, results.append), timeout=10)
+    )
+    return stats, results
+
+
+def test_reader_errors_are_raised():
+    async def broken_updates():
+        yield {"type": "gas", "chain": "arbitrum", "gas_price": 0.02}
+        raise ValueError("bad feed line")
+
+    with pytest.raises(ValueError, match="bad feed line"):
+        run_service(FeedService({"arb-op": make_pair_config()}), broken_updates())
+
+
+def test_invalid_updates_are_skipped():
+    updates = [
+        make_reserves_update(0.0, 1050.0),
+        {"type": "gas", "chain": "arbitrum", "gas_price": float("nan")},
+        make_reserves_update(990.0, 1050.0),
+        {"type": "end"},
+    ]
+    stats, results = run_service(
+        FeedService({"arb-op": make_pair_config()}), iterate_updates(updates)
+    )
+    assert stats["n_invalid"] == 2
+    assert stats["n_errors"] == 0
+    assert results[-1]["pair"] == "arb-op"
+    assert results[-1]["expected_shared_sequencing_gain"] != 0
+
+
+def test_pair_errors_are_published(monkeypatch):
+    service = FeedService({"arb-op": make_pair_config(), "op-arb": make_pair_config()})
+    evaluate_pair = service.evaluate_pair
+
+    def failing_evaluate_pair(pair_id):
+        if pair_id == "op-arb":
+            raise ZeroDivisionError("float division by zero")
+        return evaluate_pair(pair_id)
+
+    monkeypatch.setattr(service, "evaluate_pair", failing_evaluate_pair)
+    stats, results = run_service(service, iterate_updates([{"type": "end"}]))
+    results_by_pair = {result["pair"]: result for result in results}
+    assert "error" not in results_by_pair["arb-op"]
+    assert results_by_pair["op-arb"]["error"].startswith("ZeroDivisionError")
+    assert stats["n_errors"] == 1
+
+
+def test_pairs_with_different_fees_are_rejected():
+    with pytest.raises(Exception, match="same fee"):
+        FeedService({"arb-op": make_pair_config(arb_pool_fee_B=0.003)})